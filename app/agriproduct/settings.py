@@ -10,8 +10,12 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+from dotenv import load_dotenv
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -42,6 +46,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.middleware.PerformanceMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -73,13 +78,70 @@ WSGI_APPLICATION = "agriproduct.wsgi.application"
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+#
+# Chosen by the environment (or a .env file next to manage.py). DB_ENGINE is
+# "sqlite" (default) or "postgresql". PostgreSQL reads DB_NAME, DB_USER,
+# DB_PASSWORD, DB_HOST and DB_PORT and keeps each connection open for
+# DB_CONN_MAX_AGE seconds; with DB_POOL=1 connections are borrowed from a
+# psycopg pool of DB_POOL_MIN_SIZE..DB_POOL_MAX_SIZE instead (needs
+# "psycopg[pool]"). SQLite uses SQLITE_TUNED_OPTIONS unless DB_SQLITE_TUNED=0.
+
+load_dotenv(BASE_DIR / ".env")
+
+# Applied to every new SQLite connection: WAL lets reads run alongside a
+# write, synchronous=NORMAL only fsyncs at checkpoints (durable in WAL mode)
+# and reads go through a 256 MB memory map. Writers wait up to "timeout"
+# seconds for the lock (the busy timeout), and IMMEDIATE transactions take
+# it at BEGIN so a waiting writer cannot deadlock on a read-to-write upgrade.
+SQLITE_TUNED_OPTIONS = {
+    "init_command": (
+        "PRAGMA journal_mode=WAL;"
+        "PRAGMA synchronous=NORMAL;"
+        "PRAGMA mmap_size=268435456;"
+        "PRAGMA cache_size=-20000"
+    ),
+    "timeout": 20,
+    "transaction_mode": "IMMEDIATE",
+}
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+DB_ENGINE = os.environ.get("DB_ENGINE", "sqlite").lower()
+
+if DB_ENGINE in ("postgres", "postgresql"):
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.environ.get("DB_NAME", "agriproduct"),
+            "USER": os.environ.get("DB_USER", ""),
+            "PASSWORD": os.environ.get("DB_PASSWORD", ""),
+            "HOST": os.environ.get("DB_HOST", ""),
+            "PORT": os.environ.get("DB_PORT", ""),
+            "CONN_MAX_AGE": int(os.environ.get("DB_CONN_MAX_AGE", "60")),
+            "CONN_HEALTH_CHECKS": True,
+            "OPTIONS": {},
+        }
     }
-}
+    if os.environ.get("DB_POOL", "").lower() in ("1", "true", "yes"):
+        # Django requires persistent connections to be off when pooling
+        DATABASES["default"]["CONN_MAX_AGE"] = 0
+        DATABASES["default"]["OPTIONS"]["pool"] = {
+            "min_size": int(os.environ.get("DB_POOL_MIN_SIZE", "2")),
+            "max_size": int(os.environ.get("DB_POOL_MAX_SIZE", "10")),
+            "timeout": float(os.environ.get("DB_POOL_TIMEOUT", "10")),
+        }
+elif DB_ENGINE == "sqlite":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.environ.get("DB_NAME", BASE_DIR / "db.sqlite3"),
+            "OPTIONS": (
+                dict(SQLITE_TUNED_OPTIONS)
+                if os.environ.get("DB_SQLITE_TUNED", "1").lower() not in ("0", "false", "no")
+                else {}
+            ),
+        }
+    }
+else:
+    raise ImproperlyConfigured(f"Unsupported DB_ENGINE {DB_ENGINE!r}; use sqlite or postgresql")
 
 
 # Password validation
@@ -131,4 +193,111 @@ LOGIN_REDIRECT_URL = 'dashboard'
 LOGOUT_REDIRECT_URL = 'home'
 
 # For development only - in production use a proper email backend
-EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
\ No newline at end of file
+EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+# Model registry (see core/registry.py). Artifacts are loaded lazily on first
+# use; MODEL_MMAP_MODE memory-maps their arrays so forked workers share pages,
+# and the active version is re-checked every MODEL_RELOAD_INTERVAL seconds.
+MODEL_REGISTRY_DIR = BASE_DIR / 'core' / 'models'
+MODEL_MMAP_MODE = 'r'
+MODEL_RELOAD_INTERVAL = 5.0
+
+# Upper bound on rows accepted by a single api/predict/batch/ call
+BATCH_PREDICT_MAX_ROWS = 100_000
+
+# Micro-batching of concurrent single-row predictions (core/batching.py):
+# requests wait up to MICRO_BATCH_MAX_WAIT_MS for others to share one predict call.
+MICRO_BATCH_ENABLED = True
+MICRO_BATCH_MAX_SIZE = 64
+MICRO_BATCH_MAX_WAIT_MS = 5
+
+# Prediction cache keyed on normalized feature vectors + model version
+# (core/prediction_cache.py). BACKEND is 'locmem', 'django' (uses CACHES[ALIAS])
+# or 'file' (Django's file-based cache in LOCATION).
+PREDICTION_CACHE = {
+    'ENABLED': True,
+    'BACKEND': 'locmem',
+    'MAX_ENTRIES': 10000,
+    'TTL': 3600,
+}
+
+# Rows fetched per database round trip by the streaming exporters
+EXPORT_CHUNK_SIZE = 2000
+
+# Columnar historical feature store (core/feature_store.py), filled by
+# "python manage.py ingest_feature_store" from FEATURE_STORE_SOURCE.
+FEATURE_STORE_DIR = BASE_DIR / 'feature_store'
+FEATURE_STORE_SOURCE = BASE_DIR.parent / 'data' / 'enhanced_agricultural_data.csv'
+
+# Dataset used by "python manage.py train_model"
+TRAINING_DATA_PATH = BASE_DIR.parent / 'data' / 'enhanced_agricultural_data.csv'
+
+# Per-request instrumentation (core/middleware.py). Timings are exposed in a
+# Server-Timing header and at metrics/ (staff users or METRICS_ALLOWED_IPS);
+# a SELECT repeated N_PLUS_ONE_THRESHOLD times in one request is logged.
+SERVER_TIMING_HEADER = True
+N_PLUS_ONE_THRESHOLD = 10
+METRICS_ALLOWED_IPS = ['127.0.0.1']
+
+# Largest grid a single api/predict/sweep/ call may score (core/scenarios.py)
+SCENARIO_SWEEP_MAX_POINTS = 100_000
+
+# Background jobs (core/jobs.py), run by "python manage.py run_jobs". A job
+# whose worker stops heart-beating for JOB_STALE_SECONDS is picked up again
+# and resumes from its last completed chunk.
+JOB_RESULTS_DIR = BASE_DIR / 'jobs'
+JOB_CHUNK_ROWS = 20000
+JOB_WORKER_PROCESSES = 2
+JOB_POLL_INTERVAL = 2.0
+JOB_HEARTBEAT_SECONDS = 10
+JOB_STALE_SECONDS = 120
+JOB_MAX_ATTEMPTS = 3
+
+# Bounded thread pool for CPU-bound work started by async views
+# (core/executors.py); None means min(4, CPU count). Calls beyond
+# INFERENCE_EXECUTOR_MAX_PENDING are answered with 503.
+INFERENCE_EXECUTOR_WORKERS = None
+INFERENCE_EXECUTOR_MAX_PENDING = 64
+
+# Cache backends. The default is per process; when several worker processes
+# (or "run_jobs") write predictions, point them at a shared cache so page
+# cache invalidations reach all of them: REDIS_URL (needs the "redis"
+# package) or CACHE_DIR for Django's file-based cache.
+if os.environ.get("REDIS_URL"):
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache",
+                          "LOCATION": os.environ["REDIS_URL"]}}
+elif os.environ.get("CACHE_DIR"):
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                          "LOCATION": os.environ["CACHE_DIR"]}}
+else:
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                          "LOCATION": "agriproduct"}}
+
+# Cached aggregates and rendered fragments of the home, profile and dashboard
+# pages (core/page_cache.py). Keys are versioned per user (and site-wide for
+# the home page) and bumped whenever a prediction is saved or deleted; TTL
+# bounds staleness for processes that do not share the cache.
+PAGE_CACHE = {
+    'ENABLED': True,
+    'ALIAS': 'default',
+    'TTL': 300,
+}
+
+# Rows per page of the dashboard's prediction history (core/history.py)
+HISTORY_PAGE_SIZE = 50
+
+# Per-series forecasts of the FAO history (core/forecasting.py). Fitted on
+# first use or by "python manage.py fit_forecasts", and refitted when
+# FORECAST_SOURCE changes; series are fitted in blocks spread over
+# FORECAST_N_JOBS processes.
+FORECAST_SOURCE = BASE_DIR.parent / 'data' / 'fao_data_cleaned.csv'
+FORECAST_DIR = BASE_DIR / 'forecasts'
+FORECAST_N_JOBS = 1
+FORECAST_MAX_YEARS = 10
+
+# "python manage.py build_dataset" (core/dataset.py): raw FAOSTAT export(s)
+# in long format, the CSV whose climate/price/policy columns are merged in,
+# and the partitioned columnar output. TRAINING_DATA_PATH (or train_model
+# --data) can point at DATASET_DIR once it has been built.
+DATASET_RAW_SOURCE = BASE_DIR.parent / 'data' / 'FAOSTAT_data.csv'
+DATASET_ENRICHMENT_SOURCE = BASE_DIR.parent / 'data' / 'enhanced_agricultural_data.csv'
+DATASET_DIR = BASE_DIR / 'dataset'
@@ -25,13 +25,27 @@ urlpatterns = [
     path('predict/results/<int:pk>/', views.prediction_results, name='prediction_results'),
     path('predict/<int:pk>/', views.prediction_detail, name='prediction_detail'),
     path('predict/<int:pk>/delete/', views.delete_prediction, name='delete_prediction'),
+    path('predict/<int:pk>/sweep/', views.scenario_sweep, name='scenario_sweep'),
     
     # Data export
     path('export/<int:pk>/<str:format>/', views.export_predictions, name='export_prediction'),
     path('export/all/<str:format>/', views.export_predictions, name='export_predictions'),
     
+    # Background jobs
+    path('jobs/submit/', views.submit_job, name='submit_job'),
+    path('jobs/<int:pk>/download/', views.download_job_result, name='download_job_result'),
+
     # API endpoints
     path('api/stats/', views.get_prediction_stats, name='prediction_stats'),
+    path('api/predictions/history/', views.prediction_history, name='prediction_history'),
+    path('api/forecast/', views.forecast, name='forecast'),
+    path('api/predict/batch/', views.predict_batch_api, name='predict_batch'),
+    path('api/predict/sweep/', views.scenario_sweep_api, name='scenario_sweep_api'),
+    path('api/jobs/', views.job_list, name='job_list'),
+    path('api/jobs/<int:pk>/', views.job_detail, name='job_detail'),
+    path('api/autofill/', views.autofill_suggestions, name='autofill'),
+    path('api/model/status/', views.model_status, name='model_status'),
+    path('metrics/', views.metrics, name='metrics'),
 ]
 
 # Error handlers
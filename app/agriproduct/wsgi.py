@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "agriproduct.settings")
 
 application = get_wsgi_application()
+
+# Build the in-memory autofill index once per process, before serving requests.
+from core.autofill import warm_autofill_index  # noqa: E402
+
+warm_autofill_index()
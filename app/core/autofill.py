@@ -0,0 +1,107 @@
+# core/autofill.py
+"""
+In-memory index used to prefill ``AgriculturalDataForm`` from history.
+
+``(country, crop) -> (years, values)`` where ``years`` is a sorted int array
+and ``values`` holds the autofill fields for those years, forward-filled so
+each row carries the latest *known* value of every field. A lookup is one
+dict access and one ``searchsorted``. The index is built once per process
+from the feature store, or straight from the dataset CSV while the store is
+still empty.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+from .features import FIELD_TO_COLUMN
+from .feature_store import get_feature_store
+
+AUTOFILL_FIELDS = [
+    'area_harvested_ha',
+    'production_tonnes',
+    'price_usd_per_tonne',
+    'rainfall_mm',
+    'temperature_c',
+    'transport_cost_usd',
+]
+AUTOFILL_COLUMNS = [FIELD_TO_COLUMN[field] for field in AUTOFILL_FIELDS]
+
+
+def _history_frame():
+    store = get_feature_store()
+    if len(store):
+        return store.to_frame(['Country', 'Crop', 'Year'] + AUTOFILL_COLUMNS)
+    return pd.read_csv(settings.FEATURE_STORE_SOURCE,
+                       usecols=['Country', 'Crop', 'Year'] + AUTOFILL_COLUMNS)
+
+
+def build_index(frame):
+    frame = frame.dropna(subset=['Country', 'Crop', 'Year'])
+    frame = frame.sort_values(['Country', 'Crop', 'Year'], kind='stable')
+    frame[AUTOFILL_COLUMNS] = frame.groupby(['Country', 'Crop'], sort=False)[AUTOFILL_COLUMNS].ffill()
+    years = frame['Year'].to_numpy(dtype=np.int64)
+    values = frame[AUTOFILL_COLUMNS].to_numpy(dtype=np.float64)
+    country = frame['Country'].astype(str).to_numpy()
+    crop = frame['Crop'].astype(str).to_numpy()
+    boundaries = np.flatnonzero((country[1:] != country[:-1]) | (crop[1:] != crop[:-1])) + 1
+    starts = np.concatenate([[0], boundaries]).astype(int)
+    stops = np.concatenate([boundaries, [len(frame)]]).astype(int)
+    return {
+        (country[a], crop[a]): (years[a:b].copy(), values[a:b].copy())
+        for a, b in zip(starts, stops)
+    }
+
+
+class AutofillIndex:
+    def __init__(self, index):
+        self._index = index
+
+    def __len__(self):
+        return len(self._index)
+
+    def suggest(self, country, crop, year=None):
+        """
+        Latest known values for ``country``/``crop`` at or before ``year``.
+        Returns ``None`` for unknown combinations and for years before the
+        first one on record, like ``FeatureStore.lookup``.
+        """
+        entry = self._index.get((country.strip(), crop.strip()))
+        if entry is None:
+            return None
+        years, values = entry
+        if year is None:
+            position = len(years) - 1
+        else:
+            position = int(np.searchsorted(years, year, side='right')) - 1
+            if position < 0:
+                return None
+        row = values[position].tolist()
+        suggestion = {
+            field: (None if value != value else value)  # NaN -> None
+            for field, value in zip(AUTOFILL_FIELDS, row)
+        }
+        suggestion['source_year'] = int(years[position])
+        return suggestion
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_autofill_index():
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = AutofillIndex(build_index(_history_frame()))
+    return _index
+
+
+def warm_autofill_index():
+    """Build the index up front (called from the WSGI/ASGI entry points)."""
+    try:
+        get_autofill_index()
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,200 @@
+# core/batch.py
+"""
+Bulk validation, scoring and persistence of ``AgriculturalDataForm``-shaped rows.
+
+Rows arrive as a DataFrame using either model field names
+(``area_harvested_ha``) or dataset column names (``Area_harvested_ha``).
+Validation applies the form's rules column-wise, the valid rows are scored
+with one ``predict`` call and then saved with ``bulk_create``.
+"""
+import numpy as np
+import pandas as pd
+from asgiref.sync import sync_to_async
+from django.db import transaction
+
+from . import page_cache
+from .executors import run_cpu
+from .features import FIELD_TO_COLUMN, INPUT_FIELDS, build_features, derived_fields
+from .forms import AgriculturalDataForm
+from .inference import apply_predictions, predict_features
+from .instrumentation import timed
+from .models import AgriculturalData
+from .stats import record
+
+COLUMN_TO_FIELD = {column: field for field, column in FIELD_TO_COLUMN.items()}
+TEXT_FIELDS = ['country', 'crop', 'policy_flag']
+NUMERIC_FIELDS = [f for f in INPUT_FIELDS if f not in TEXT_FIELDS]
+OPTIONAL_FIELDS = {'productivity_index': 0.0, 'policy_flag': ''}
+BULK_CREATE_BATCH_SIZE = 1000
+
+
+def _form_bounds():
+    """``field -> (min, max)`` taken from the form's widget attributes."""
+    bounds = {}
+    for field, widget in AgriculturalDataForm.Meta.widgets.items():
+        attrs = getattr(widget, 'attrs', {})
+        if 'min' in attrs or 'max' in attrs:
+            bounds[field] = (attrs.get('min'), attrs.get('max'))
+    return bounds
+
+
+FIELD_BOUNDS = _form_bounds()
+
+
+def normalize_frame(frame):
+    """Rename dataset-style columns to model field names and keep only inputs."""
+    frame = frame.rename(columns=COLUMN_TO_FIELD)
+    return frame[[f for f in INPUT_FIELDS if f in frame.columns]]
+
+
+def validate_frame(frame):
+    """
+    Validate ``frame`` against the ``AgriculturalDataForm`` rules.
+
+    Returns ``(valid, errors)`` where ``valid`` is a DataFrame of cleaned rows
+    (model field names, original index preserved) and ``errors`` is a list of
+    ``{'row': position, 'errors': {field: message}}`` for rejected rows.
+    """
+    frame = normalize_frame(frame)
+    n = len(frame)
+    cleaned = {}
+    failures = {}
+
+    def fail(field, mask, message):
+        if mask.any():
+            failures.setdefault(field, []).append((mask, message))
+
+    for field in INPUT_FIELDS:
+        if field not in frame.columns:
+            if field in OPTIONAL_FIELDS:
+                cleaned[field] = pd.Series(OPTIONAL_FIELDS[field], index=frame.index)
+            else:
+                cleaned[field] = pd.Series(np.nan, index=frame.index)
+                fail(field, np.ones(n, dtype=bool), 'This field is required.')
+            continue
+
+        column = frame[field]
+        if field in TEXT_FIELDS:
+            text = column.where(column.notna(), '').astype(str).str.strip()
+            if field in OPTIONAL_FIELDS:
+                text = text.where(text != '', OPTIONAL_FIELDS[field])
+            else:
+                fail(field, (text == '').to_numpy(), 'This field is required.')
+            max_length = AgriculturalData._meta.get_field(field).max_length
+            fail(field, (text.str.len() > max_length).to_numpy(),
+                 f'Ensure this value has at most {max_length} characters.')
+            cleaned[field] = text
+            continue
+
+        missing = column.isna() | (column.astype(str).str.strip() == '')
+        values = pd.to_numeric(column, errors='coerce')
+        if field in OPTIONAL_FIELDS:
+            values = values.where(~missing, OPTIONAL_FIELDS[field])
+        else:
+            fail(field, missing.to_numpy(), 'This field is required.')
+        fail(field, (values.isna() & ~missing).to_numpy(), 'Enter a number.')
+        arr = values.to_numpy(dtype=np.float64)
+        fail(field, np.isinf(arr), 'Enter a number.')
+        if field == 'year':
+            fail(field, (~np.isnan(arr)) & (arr != np.round(arr)), 'Enter a whole number.')
+        low, high = FIELD_BOUNDS.get(field, (None, None))
+        if field == 'year':
+            # Mirrors AgriculturalDataForm.clean_year
+            fail(field, (arr < low) | (arr > high), f'Year must be between {low} and {high}')
+        else:
+            if low is not None:
+                fail(field, arr < low, f'Ensure this value is greater than or equal to {low}.')
+            if high is not None:
+                fail(field, arr > high, f'Ensure this value is less than or equal to {high}.')
+        cleaned[field] = values
+
+    bad = np.zeros(n, dtype=bool)
+    for checks in failures.values():
+        for mask, _ in checks:
+            bad |= mask
+
+    errors = []
+    if bad.any():
+        for pos in np.flatnonzero(bad):
+            row_errors = {}
+            for field, checks in failures.items():
+                for mask, message in checks:
+                    if mask[pos]:
+                        row_errors.setdefault(field, message)
+            errors.append({'row': int(pos), 'errors': row_errors})
+
+    valid = pd.DataFrame(cleaned, index=frame.index)[~bad]
+    if len(valid):
+        valid = valid.astype({'year': np.int64})
+    return valid, errors
+
+
+def score_frame(valid, loaded=None):
+    """Score validated rows in one model call; returns target -> array."""
+    features = build_features(valid)
+    with timed('inference'):
+        return predict_features(features, loaded=loaded)
+
+
+def build_instances(user, valid, outputs):
+    """
+    Unsaved ``AgriculturalData`` instances for ``valid`` rows with predictions
+    and the stored derived features (which ``bulk_create`` skips ``save()``
+    for) applied.
+    """
+    records = valid.assign(**derived_fields(valid)).to_dict('records')
+    instances = [AgriculturalData(user=user, **record) for record in records]
+    return apply_predictions(instances, outputs)
+
+
+def save_instances(instances, batch_size=BULK_CREATE_BATCH_SIZE):
+    with transaction.atomic():
+        created = AgriculturalData.objects.bulk_create(instances, batch_size=batch_size)
+        # bulk_create sends no post_save signals
+        record(created)
+        page_cache.invalidate_rows(created)
+    return created
+
+
+def validate_and_score(frame, loaded=None):
+    """
+    ``(valid, outputs, errors)`` for ``frame``: the rows that pass the form's
+    validation, their predictions (empty arrays when none do) and the errors.
+    """
+    valid, errors = validate_frame(frame)
+    if not len(valid):
+        empty = np.empty(0, dtype=np.float64)
+        return valid, {'production': empty, 'yield': empty, 'price': empty}, errors
+    return valid, score_frame(valid, loaded=loaded), errors
+
+
+def _persist(user, valid, outputs):
+    return save_instances(build_instances(user, valid, outputs))
+
+
+def predict_batch(user, frame, persist=True, loaded=None):
+    """
+    Validate, score and (optionally) save ``frame`` for ``user``.
+
+    Returns ``(valid, outputs, errors, instances)``; ``instances`` is empty
+    when ``persist`` is false.
+    """
+    valid, outputs, errors = validate_and_score(frame, loaded=loaded)
+    instances = []
+    if persist and len(valid):
+        instances = _persist(user, valid, outputs)
+    return valid, outputs, errors, instances
+
+
+async def apredict_batch(user, frame, persist=True, loaded=None):
+    """
+    Async :func:`predict_batch` for ASGI views.
+
+    Validation and scoring run on the bounded inference executor; the insert
+    goes through ``sync_to_async`` since the ORM has no async transactions.
+    """
+    valid, outputs, errors = await run_cpu(validate_and_score, frame, loaded=loaded)
+    instances = []
+    if persist and len(valid):
+        instances = await sync_to_async(_persist)(user, valid, outputs)
+    return valid, outputs, errors, instances
@@ -0,0 +1,199 @@
+# core/batching.py
+"""
+Micro-batching of concurrent single-row predictions.
+
+Requests hand their feature block to :class:`MicroBatcher`, which holds it
+for at most ``max_wait`` seconds (or until ``max_batch_size`` rows are
+queued), scores everything collected with one ``predict`` call on a worker
+thread and resolves each caller's future with its own slice. Threaded WSGI
+workers block on ``predict()``; ASGI views await ``predict_async()``, so
+requests served by one event loop are coalesced too.
+"""
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import pandas as pd
+from django.conf import settings
+
+from .executors import run_cpu
+from .features import build_features
+from .inference import predict_features
+from .instrumentation import timed
+from .metrics import Histogram
+from .prediction_cache import get_prediction_cache
+from .registry import get_registry
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256, 512]
+QUEUE_WAIT_BUCKETS = [0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1]
+
+
+class MicroBatcher:
+    def __init__(self, max_batch_size=64, max_wait=0.005, predict_fn=None):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._predict_fn = predict_fn or self._predict_with_registry
+        self._queue = queue.SimpleQueue()
+        self._worker = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self.batch_size = Histogram(
+            'prediction_batch_size', BATCH_SIZE_BUCKETS,
+            'Rows scored per coalesced predict call')
+        self.queue_wait = Histogram(
+            'prediction_queue_wait_seconds', QUEUE_WAIT_BUCKETS,
+            'Time a request waited in the micro-batch queue')
+
+    @staticmethod
+    def _predict_with_registry(features):
+        return predict_features(features, loaded=get_registry().get())
+
+    def _ensure_worker(self):
+        # Threads do not survive fork(), so pre-forking servers get a fresh
+        # worker per process.
+        if self._worker is not None and self._pid == os.getpid() and self._worker.is_alive():
+            return
+        with self._start_lock:
+            if self._worker is not None and self._pid == os.getpid() and self._worker.is_alive():
+                return
+            if self._pid != os.getpid():
+                self._queue = queue.SimpleQueue()
+            self._pid = os.getpid()
+            self._worker = threading.Thread(
+                target=self._run, name='prediction-microbatcher', daemon=True)
+            self._worker.start()
+
+    def submit(self, features):
+        """Queue a feature block; returns a ``concurrent.futures.Future``."""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((features, future, time.perf_counter()))
+        return future
+
+    def predict(self, features, timeout=None):
+        """Blocking variant for synchronous (WSGI) views."""
+        return self.submit(features).result(timeout=timeout)
+
+    async def predict_async(self, features):
+        """Awaitable variant for async (ASGI) views."""
+        return await asyncio.wrap_future(self.submit(features))
+
+    def _collect(self):
+        first = self._queue.get()
+        items = [first]
+        rows = len(first[0])
+        deadline = time.perf_counter() + self.max_wait
+        while rows < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            items.append(item)
+            rows += len(item[0])
+        return items
+
+    def _run(self):
+        while True:
+            items = self._collect()
+            started = time.perf_counter()
+            for _, _, enqueued in items:
+                self.queue_wait.observe(started - enqueued)
+            try:
+                frames = [features for features, _, _ in items]
+                combined = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+                outputs = self._predict_fn(combined)
+            except Exception as exc:  # hand the failure to every waiting caller
+                logger.warning('Micro-batch of %d request(s) failed: %r', len(items), exc)
+                for _, future, _ in items:
+                    future.set_exception(exc)
+                continue
+            self.batch_size.observe(len(combined))
+            offset = 0
+            for features, future, _ in items:
+                n = len(features)
+                future.set_result({name: values[offset:offset + n] for name, values in outputs.items()})
+                offset += n
+
+    def metrics(self):
+        return {
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000,
+            'batch_size': self.batch_size.describe(),
+            'queue_wait_seconds': self.queue_wait.describe(),
+        }
+
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher():
+    """Process-wide micro-batcher configured from settings."""
+    global _batcher
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                _batcher = MicroBatcher(
+                    max_batch_size=getattr(settings, 'MICRO_BATCH_MAX_SIZE', 64),
+                    max_wait=getattr(settings, 'MICRO_BATCH_MAX_WAIT_MS', 5) / 1000.0,
+                )
+    return _batcher
+
+
+def _micro_batching_enabled():
+    return getattr(settings, 'MICRO_BATCH_ENABLED', True)
+
+
+def _predict_now(features):
+    with timed('inference'):
+        if _micro_batching_enabled():
+            return get_batcher().predict(features)
+        return predict_features(features)
+
+
+def score_online(rows):
+    """
+    Score request-time rows: answered from the prediction cache where possible,
+    otherwise coalesced with concurrent requests when micro-batching is enabled.
+    """
+    features = build_features(rows)
+    cache = get_prediction_cache()
+    if cache is None:
+        return _predict_now(features)
+    version = get_registry().get().version
+    return cache.cached_predict(features, version, _predict_now)
+
+
+
+async def score_online_async(rows):
+    """:func:`score_online` for async views: awaits the micro-batcher instead of blocking a thread."""
+    features = build_features(rows)
+    cache = get_prediction_cache()
+    if cache is None:
+        keys, cached, missing = None, {}, list(range(len(features)))
+    else:
+        version = (await asyncio.to_thread(get_registry().get)).version
+        keys, cached, missing = cache.lookup(features, version)
+    outputs = None
+    if missing:
+        subset = features if len(missing) == len(features) else features.iloc[missing]
+        started = time.perf_counter()
+        with timed('inference'):
+            if _micro_batching_enabled():
+                outputs = await get_batcher().predict_async(subset)
+            else:
+                outputs = await run_cpu(predict_features, subset)
+        if cache is not None:
+            cache.store(keys, missing, outputs, time.perf_counter() - started)
+    if cache is None:
+        return outputs
+    return cache.assemble(len(features), cached, missing, outputs)
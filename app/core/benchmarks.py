@@ -0,0 +1,332 @@
+# core/benchmarks.py
+"""
+Latency benchmarks for inference and the main views.
+
+Every measurement is summarised as ``{n, mean, p50, p95, p99, min, max}`` in
+seconds so runs can be written to JSON and compared between commits with
+:func:`compare`.
+"""
+import itertools
+import os
+import platform
+import subprocess
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import sklearn
+from django.conf import settings
+
+from .features import INPUT_FIELDS, build_features, derived_fields
+
+DEFAULT_BATCH_SIZES = [1, 10, 100, 1000, 10000, 100000]
+DEFAULT_DB_SIZES = [1000, 100000, 1000000]
+
+
+def summarize(samples):
+    samples = np.asarray(samples, dtype=np.float64)
+    return {
+        'n': int(samples.size),
+        'mean': float(samples.mean()),
+        'p50': float(np.percentile(samples, 50)),
+        'p95': float(np.percentile(samples, 95)),
+        'p99': float(np.percentile(samples, 99)),
+        'min': float(samples.min()),
+        'max': float(samples.max()),
+    }
+
+
+def measure(fn, repeats, warmup=1):
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+def repeats_for(size, budget_rows=200000, low=3, high=50):
+    """Fewer repetitions for big batches so each size costs roughly the same."""
+    return int(min(high, max(low, budget_rows // max(size, 1))))
+
+
+def sample_rows(path, n, seed=0):
+    """``n`` dataset rows (with replacement) that pass the form's validation."""
+    from .batch import validate_frame
+
+    valid, _ = validate_frame(pd.read_csv(path))
+    rng = np.random.default_rng(seed)
+    return valid.iloc[rng.integers(0, len(valid), size=n)].reset_index(drop=True)
+
+
+def run_environment():
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'sklearn': sklearn.__version__,
+        'numpy': np.__version__,
+        'cpu_count': os.cpu_count(),
+        'platform': platform.platform(),
+    }
+
+
+# --------------------------------------------------------------- inference
+def bench_model_predict(loaded, rows, batch_sizes):
+    results = {}
+    for size in batch_sizes:
+        features = build_features(rows.iloc[:size])
+        results[str(size)] = measure(
+            lambda: loaded.estimator.predict(features), repeats_for(size))
+        results[str(size)]['per_row_p50'] = results[str(size)]['p50'] / size
+    return results
+
+
+def bench_feature_building(rows, batch_sizes):
+    from .models import AgriculturalData
+
+    records = rows[INPUT_FIELDS].to_dict('records')
+    results = {}
+    for size in batch_sizes:
+        instances = [AgriculturalData(**record) for record in records[:size]]
+        results[str(size)] = measure(lambda: build_features(instances), repeats_for(size))
+        results[str(size)]['per_row_p50'] = results[str(size)]['p50'] / size
+    return results
+
+
+# -------------------------------------------------------------- end-to-end
+@contextmanager
+def benchmark_database():
+    """A throwaway test database, as used by ``manage.py test``."""
+    from django.test.runner import DiscoverRunner
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment(debug=False)
+    runner = DiscoverRunner(verbosity=0, interactive=False)
+    old_config = runner.setup_databases()
+    try:
+        yield
+    finally:
+        runner.teardown_databases(old_config)
+        teardown_test_environment()
+
+
+def seed_predictions(user, rows, total, chunk_size=20000, seed=0):
+    """Insert ``total`` scored rows for ``user`` (sampled from ``rows``) in bulk."""
+    from . import stats
+    from .models import AgriculturalData
+
+    rng = np.random.default_rng(seed)
+    inputs = rows[INPUT_FIELDS]
+    records = inputs.assign(**derived_fields(inputs)).to_dict('records')
+    created = 0
+    while created < total:
+        n = min(chunk_size, total - created)
+        picks = rng.integers(0, len(records), size=n)
+        predicted = rng.random((n, 3)) * [1e5, 5e3, 1e3]
+        AgriculturalData.objects.bulk_create([
+            AgriculturalData(user=user, predicted_production=p[0], predicted_yield=p[1],
+                             predicted_price=p[2], **records[i])
+            for i, p in zip(picks, predicted)
+        ], batch_size=5000)
+        created += n
+    stats.rebuild(user_ids=[user.pk])
+
+
+def bench_views(rows, db_sizes, repeats=20, export_repeats=3, log=print):
+    from django.contrib.auth.models import User
+    from django.test import Client
+
+    from .models import AgriculturalData
+
+    # Cycle through distinct rows so the prediction cache does not answer every POST
+    post_rows = itertools.cycle(rows[INPUT_FIELDS].iloc[:1000].to_dict('records'))
+    results = {}
+    with benchmark_database():
+        user = User.objects.create_user('benchmark', password='benchmark-password')
+        client = Client()
+        client.force_login(user)
+        seeded = 0
+        for size in sorted(db_sizes):
+            log(f'Seeding database to {size} rows...')
+            seed_predictions(user, rows, size - seeded)
+            seeded = AgriculturalData.objects.filter(user=user).count()
+
+            def post_predict():
+                response = client.post('/predict/', next(post_rows))
+                assert response.status_code == 302, response.status_code
+
+            def get(url):
+                def request():
+                    response = client.get(url)
+                    if getattr(response, 'streaming', False):
+                        for _ in response.streaming_content:
+                            pass
+                    assert response.status_code == 200, (url, response.status_code)
+                return request
+
+            size_results = {
+                'predict_get': measure(get('/predict/'), repeats),
+                'predict_post': measure(post_predict, repeats),
+                'dashboard': measure(get('/dashboard/'), repeats if size < 100000 else export_repeats),
+                'api_stats': measure(get('/api/stats/'), repeats),
+                'export_csv': measure(get('/export/all/csv/'), export_repeats),
+            }
+            results[str(size)] = size_results
+            log(f'  {size}: ' + ', '.join(f'{k} p50={v["p50"] * 1000:.1f}ms'
+                                          for k, v in size_results.items()))
+    return results
+
+
+# ------------------------------------------------------- concurrent writes
+WRITE_MODES = ['sqlite', 'sqlite-tuned', 'postgresql', 'postgresql-persistent', 'postgresql-pool']
+
+
+def default_write_modes():
+    """The modes that apply to the configured ``default`` database's backend."""
+    if settings.DATABASES['default']['ENGINE'].endswith('sqlite3'):
+        return ['sqlite', 'sqlite-tuned']
+    return ['postgresql', 'postgresql-persistent', 'postgresql-pool']
+
+
+def write_mode_settings(mode):
+    """``DATABASES['default']`` keys that put new connections in ``mode``."""
+    configured = settings.DATABASES['default'].get('OPTIONS', {})
+    if mode == 'sqlite':
+        return {'CONN_MAX_AGE': 0, 'OPTIONS': {}}
+    if mode == 'sqlite-tuned':
+        return {'CONN_MAX_AGE': 0, 'OPTIONS': dict(settings.SQLITE_TUNED_OPTIONS)}
+    options = {key: value for key, value in configured.items() if key != 'pool'}
+    if mode == 'postgresql':
+        return {'CONN_MAX_AGE': 0, 'OPTIONS': options}
+    if mode == 'postgresql-persistent':
+        return {'CONN_MAX_AGE': 600, 'OPTIONS': options}
+    if mode == 'postgresql-pool':
+        return {'CONN_MAX_AGE': 0, 'OPTIONS': {**options, 'pool': configured.get('pool') or True}}
+    raise ValueError(f'Unknown write mode {mode!r}')
+
+
+def _run_writers(records, writers, duration):
+    from django.contrib.auth.models import User
+    from django.db import OperationalError, close_old_connections, connection
+
+    from .models import AgriculturalData
+
+    user = User.objects.create_user('writer', password='benchmark-password')
+    latencies, errors = [], Counter()
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def writer(offset):
+        samples, failures = [], Counter()
+        i = offset
+        while time.perf_counter() < deadline:
+            # Each save is one request: the connection is opened (or reused,
+            # or borrowed from the pool) and released as the request cycle would
+            close_old_connections()
+            record = records[i % len(records)]
+            i += writers
+            started = time.perf_counter()
+            try:
+                AgriculturalData(user=user, predicted_production=1.0, predicted_yield=1.0,
+                                 predicted_price=1.0, **record).save()
+                samples.append(time.perf_counter() - started)
+            except OperationalError as exc:
+                failures[str(exc)] += 1
+            finally:
+                close_old_connections()
+        connection.close()
+        with lock:
+            latencies.extend(samples)
+            errors.update(failures)
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(writers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    result = {
+        'writers': writers,
+        'writes': len(latencies),
+        'writes_per_second': len(latencies) / elapsed,
+        'errors': dict(errors),
+    }
+    if latencies:
+        result['latency'] = summarize(latencies)
+    return result
+
+
+def bench_writes(rows, modes, writers=8, duration=5.0, log=print):
+    """
+    Prediction saves per second with ``writers`` threads saving at once, per
+    connection mode (see :func:`write_mode_settings`).
+
+    Every mode gets a fresh throwaway database; SQLite ones are files, since
+    the in-memory test database has no journal or locking to measure.
+    """
+    from django.db import connections
+
+    records = rows[INPUT_FIELDS].to_dict('records')
+    # Connections in every thread are built from this dict, so changing it switches modes
+    default = connections.settings['default']
+    original = {key: default[key] for key in ('CONN_MAX_AGE', 'OPTIONS', 'TEST')}
+    results = {}
+    try:
+        for mode in modes:
+            default.update(write_mode_settings(mode))
+            with tempfile.TemporaryDirectory() as tmp:
+                if default['ENGINE'].endswith('sqlite3'):
+                    default['TEST'] = {**original['TEST'],
+                                       'NAME': os.path.join(tmp, 'writes.sqlite3')}
+                with benchmark_database():
+                    results[mode] = _run_writers(records, writers, duration)
+                if mode == 'postgresql-pool':
+                    connections['default'].close_pool()
+            failed = sum(results[mode]['errors'].values())
+            log(f'  {mode}: {results[mode]["writes_per_second"]:.0f} writes/s '
+                f'with {writers} writers, {failed} failed')
+    finally:
+        connections['default'].close()
+        default.update(original)
+    return results
+
+
+# ------------------------------------------------------------- comparison
+def _flatten(node, prefix=''):
+    if isinstance(node, dict) and 'p50' in node:
+        yield prefix, node
+        return
+    if isinstance(node, dict):
+        for key, value in node.items():
+            yield from _flatten(value, f'{prefix}/{key}' if prefix else key)
+
+
+def compare(baseline, current, tolerance=0.2, metric='p50'):
+    """
+    Compare two result documents; returns a list of
+    ``(name, baseline, current, ratio, regressed)`` for every shared measurement.
+    """
+    base = dict(_flatten(baseline.get('results', {})))
+    rows = []
+    for name, stats in _flatten(current.get('results', {})):
+        if name not in base or not base[name][metric]:
+            continue
+        ratio = stats[metric] / base[name][metric]
+        rows.append((name, base[name][metric], stats[metric], ratio, ratio > 1 + tolerance))
+    return rows
@@ -0,0 +1,348 @@
+# core/compiled.py
+"""
+Array-backed inference for trained tree pipelines.
+
+:func:`compile_pipeline` turns the ``preprocessor`` + RandomForest /
+GradientBoosting (or a TargetBundle of them) pipeline from ``core.training`` into a
+:class:`CompiledModel`: a handful of flat NumPy arrays that are evaluated
+for every (row, tree) pair at once, one tree level per step.
+
+* The ColumnTransformer is reduced to its fitted parameters: median fill,
+  clip bounds and scaler mean/scale per numeric column, applied in one
+  vectorized pass, and a category -> encoded column lookup per categorical
+  column in place of the OneHotEncoder.
+* All trees are concatenated into flat ``feature``/``threshold``/
+  ``children``/``value`` arrays; each step advances only the pairs that
+  have not reached a leaf yet.
+
+Transformed values are cast to float32 before comparison exactly as sklearn's
+trees do, so predictions match the source pipeline to rounding error. The
+object is saved through the model registry like any other estimator; its
+arrays are memory-mapped on load and shared between worker processes.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+from sklearn.dummy import DummyRegressor
+from sklearn.ensemble import GradientBoostingRegressor
+from sklearn.ensemble._forest import ForestRegressor
+from sklearn.impute import SimpleImputer
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+from sklearn.tree import DecisionTreeRegressor
+
+from .multitarget import TargetBundle
+from .transformers import QuantileClipper
+
+# Bound on rows x trees traversed together, to keep the index arrays small
+# (about 8 MB per index array)
+MAX_TRAVERSAL_CELLS = 1 << 20
+# Tree levels between dropping (row, tree) pairs that have reached a leaf
+COMPACT_EVERY = 4
+
+
+class CompileError(ValueError):
+    """The pipeline contains a step the compiler does not know how to fold."""
+
+
+class CompiledModel:
+    """Drop-in replacement for the pipeline's ``predict``."""
+
+    def __init__(self, numeric_columns, numeric_fill, clip_lower, clip_upper, center, scale,
+                 categorical_columns, categorical_fill, categories,
+                 feature, threshold, children, value, roots, depth, tree_weight, offset):
+        self.numeric_columns = list(numeric_columns)
+        self.numeric_fill = numeric_fill
+        self.clip_lower = clip_lower
+        self.clip_upper = clip_upper
+        self.center = center
+        self.scale = scale
+        self.categorical_columns = list(categorical_columns)
+        self.categorical_fill = list(categorical_fill)
+        self.categories = [list(c) for c in categories]
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.value = value
+        self.roots = roots
+        self.depth = int(depth)
+        self.tree_weight = np.atleast_1d(np.asarray(tree_weight, dtype=np.float64))
+        self.offset = offset
+        self._build_lookups()
+
+    def _build_lookups(self):
+        # Category -> column of the encoded matrix, in OneHotEncoder order
+        position = len(self.numeric_columns)
+        self._onehot = []
+        for categories in self.categories:
+            self._onehot.append({c: position + i for i, c in enumerate(categories)})
+            position += len(categories)
+        self.n_encoded = position
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_onehot'], state['n_encoded']
+        return state
+
+    def __setstate__(self, state):
+        # Plain ndarray views over memory-mapped arrays: same shared pages,
+        # without np.memmap's per-operation subclass overhead.
+        self.__dict__.update({k: (np.asarray(v) if isinstance(v, np.memmap) else v)
+                              for k, v in state.items()})
+        self._build_lookups()
+
+    @property
+    def n_outputs(self):
+        return self.value.shape[1]
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    def nbytes(self):
+        arrays = (self.numeric_fill, self.clip_lower, self.clip_upper, self.center, self.scale,
+                  self.feature, self.threshold, self.children, self.value, self.roots,
+                  self.tree_weight, self.offset)
+        return int(sum(a.nbytes for a in arrays))
+
+    def transform(self, frame):
+        """The preprocessor's output as a float32 matrix, the dtype sklearn's trees compare in."""
+        n = len(frame)
+        numeric = np.column_stack([frame[c].to_numpy(dtype=np.float64) for c in self.numeric_columns])
+        missing = np.isnan(numeric)
+        if missing.any():
+            numeric[missing] = np.broadcast_to(self.numeric_fill, numeric.shape)[missing]
+        np.clip(numeric, self.clip_lower, self.clip_upper, out=numeric)
+        numeric -= self.center
+        numeric /= self.scale
+
+        X = np.zeros((n, self.n_encoded), dtype=np.float32)
+        X[:, :numeric.shape[1]] = numeric
+        rows = np.arange(n)
+        for column, fill, lookup in zip(self.categorical_columns, self.categorical_fill, self._onehot):
+            positions = np.fromiter(
+                (lookup.get(fill if v is None or v != v else v, -1)
+                 for v in frame[column].to_numpy(dtype=object)),
+                dtype=np.intp, count=n)
+            known = positions >= 0  # unknown categories encode as all zeros
+            X[rows[known], positions[known]] = 1.0
+        return X
+
+    def _leaf_values(self, X):
+        """Sum over trees of the leaf value each row lands in, shape ``(n, n_outputs)``."""
+        n, width = X.shape
+        n_trees = len(self.roots)
+        flat = X.ravel()
+        node = np.tile(self.roots.astype(np.intp), n)
+        # Cells are (row, tree) pairs; finished ones are dropped every few levels
+        cells = np.arange(node.size)
+        current = node.copy()
+        offsets = np.repeat(np.arange(n, dtype=np.intp) * width, n_trees)
+        for level in range(self.depth):
+            values = flat.take(offsets + self.feature.take(current))
+            current = self.children.take(2 * current + (values > self.threshold.take(current)))
+            if level % COMPACT_EVERY == COMPACT_EVERY - 1:
+                live = self.children.take(2 * current) != current
+                done = ~live
+                node[cells[done]] = current[done]
+                cells, current, offsets = cells[live], current[live], offsets[live]
+                if not cells.size:
+                    break
+        node[cells] = current
+        return self.value[node].reshape(n, n_trees, -1).sum(axis=1)
+
+    def predict(self, frame):
+        chunk = max(1, MAX_TRAVERSAL_CELLS // len(self.roots))
+        raw = np.empty((len(frame), self.n_outputs), dtype=np.float64)
+        for start in range(0, len(frame), chunk):
+            X = self.transform(frame.iloc[start:start + chunk])
+            raw[start:start + len(X)] = self._leaf_values(X)
+        raw = raw * self.tree_weight + self.offset
+        return raw[:, 0] if self.n_outputs == 1 else raw
+
+
+# ------------------------------------------------------------------ compiler
+def _numeric_steps(pipeline, width):
+    fill = np.zeros(width)
+    lower = np.full(width, -np.inf)
+    upper = np.full(width, np.inf)
+    center = np.zeros(width)
+    scale = np.ones(width)
+    order = []
+    for name, step in pipeline.steps:
+        if isinstance(step, SimpleImputer):
+            if order:
+                raise CompileError(f'Imputer {name!r} must come first')
+            fill = np.asarray(step.statistics_, dtype=np.float64)
+        elif isinstance(step, QuantileClipper):
+            if 'scale' in order:
+                raise CompileError(f'Clipper {name!r} after scaling is not supported')
+            lower = np.maximum(lower, step.lower_bounds_)
+            upper = np.minimum(upper, step.upper_bounds_)
+        elif isinstance(step, StandardScaler):
+            if step.with_mean:
+                center = np.asarray(step.mean_, dtype=np.float64)
+            if step.with_std:
+                scale = np.asarray(step.scale_, dtype=np.float64)
+        else:
+            raise CompileError(f'Unsupported numeric step {name!r}: {type(step).__name__}')
+        order.append('scale' if isinstance(step, StandardScaler) else name)
+    return fill, lower, upper, center, scale
+
+
+def _categorical_steps(pipeline, columns):
+    fill = [None] * len(columns)
+    encoder = None
+    for name, step in pipeline.steps:
+        if isinstance(step, SimpleImputer):
+            fill = [str(v) for v in step.statistics_]
+        elif isinstance(step, OneHotEncoder):
+            if step.drop is not None or getattr(step, '_infrequent_enabled', False):
+                raise CompileError('One-hot encoders with drop/infrequent categories are not supported')
+            encoder = step
+        else:
+            raise CompileError(f'Unsupported categorical step {name!r}: {type(step).__name__}')
+    if encoder is None:
+        raise CompileError('Categorical columns must end in a OneHotEncoder')
+    return fill, [[str(c) for c in cats] for cats in encoder.categories_]
+
+
+def _split_preprocessor(preprocessor):
+    numeric = categorical = None
+    for name, transformer, columns in preprocessor.transformers_:
+        if name == 'remainder' or transformer == 'drop':
+            continue
+        if any(isinstance(s, OneHotEncoder) for _, s in getattr(transformer, 'steps', [])):
+            categorical = (name, transformer, list(columns))
+        else:
+            numeric = (name, transformer, list(columns))
+    if numeric is None or categorical is None:
+        raise CompileError('Expected one numeric and one categorical transformer')
+    return numeric, categorical
+
+
+def _tree_regressors(model):
+    """``(trees, per-tree weight, constant offset)`` such that predict = offset + weight * sum(trees)."""
+    if isinstance(model, ForestRegressor):
+        return list(model.estimators_), 1.0 / len(model.estimators_), 0.0
+    if isinstance(model, GradientBoostingRegressor):
+        if model.loss != 'squared_error':
+            raise CompileError(f'Unsupported boosting loss {model.loss!r}')
+        if model.init_ == 'zero':
+            offset = 0.0
+        elif isinstance(model.init_, DummyRegressor):
+            offset = float(np.ravel(model.init_.constant_)[0])
+        else:
+            raise CompileError('Boosting init estimator must be a DummyRegressor')
+        return list(model.estimators_[:, 0]), float(model.learning_rate), offset
+    if isinstance(model, DecisionTreeRegressor):
+        return [model], 1.0, 0.0
+    raise CompileError(f'Unsupported model {type(model).__name__}')
+
+
+def _model_parts(model):
+    """``(estimator, input columns or None)`` per output block; a TargetBundle has one per target."""
+    if isinstance(model, TargetBundle):
+        return list(zip(model.estimators_, model.columns_))
+    return [(model, None)]
+
+
+def compile_pipeline(pipeline):
+    """Compile a fitted ``preprocessor`` + tree ensemble pipeline into a :class:`CompiledModel`."""
+    preprocessor = pipeline.named_steps['preprocessor']
+    model = pipeline.named_steps['model']
+    (num_name, num_pipe, num_columns), (cat_name, cat_pipe, cat_columns) = _split_preprocessor(preprocessor)
+    if (preprocessor.output_indices_[num_name].start != 0
+            or preprocessor.output_indices_[cat_name].start != len(num_columns)):
+        raise CompileError('Numeric columns must precede the one-hot columns')
+    fill, lower, upper, center, scale = _numeric_steps(num_pipe, len(num_columns))
+    cat_fill, categories = _categorical_steps(cat_pipe, cat_columns)
+
+    parts = [(_tree_regressors(estimator), columns) for estimator, columns in _model_parts(model)]
+    n_outputs = sum(trees[0].tree_.n_outputs for (trees, _, _), _ in parts)
+    features, thresholds, children, values, roots = [], [], [], [], []
+    weights, offsets = np.ones(n_outputs), np.zeros(n_outputs)
+    depth, base, output = 0, 0, 0
+    for (trees, weight, offset), columns in parts:
+        width = trees[0].tree_.n_outputs
+        outputs = slice(output, output + width)
+        weights[outputs], offsets[outputs] = weight, offset
+        for tree in trees:
+            t = tree.tree_
+            leaf = t.children_left < 0
+            # Leaves point at themselves behind an infinite threshold, so pairs
+            # that finished early can keep stepping until they are dropped
+            ids = np.arange(t.node_count) + base
+            left = np.where(leaf, ids, t.children_left + base)
+            right = np.where(leaf, ids, t.children_right + base)
+            feature = t.feature if columns is None else np.asarray(columns)[np.maximum(t.feature, 0)]
+            features.append(np.where(leaf, 0, feature))
+            thresholds.append(np.where(leaf, np.inf, t.threshold))
+            children.append(np.stack([left, right], axis=1).ravel())
+            # Each tree only contributes to its own target's output column
+            value = np.zeros((t.node_count, n_outputs))
+            value[:, outputs] = t.value[:, :, 0]
+            values.append(value)
+            roots.append(base)
+            depth = max(depth, t.max_depth)
+            base += t.node_count
+        output += width
+
+    return CompiledModel(
+        numeric_columns=num_columns, numeric_fill=fill, clip_lower=lower, clip_upper=upper,
+        center=center, scale=scale,
+        categorical_columns=cat_columns, categorical_fill=cat_fill, categories=categories,
+        feature=np.concatenate(features).astype(np.int32),
+        threshold=np.concatenate(thresholds).astype(np.float64),
+        children=np.concatenate(children).astype(np.int32),
+        value=np.ascontiguousarray(np.concatenate(values), dtype=np.float64),
+        roots=np.asarray(roots, dtype=np.int32),
+        depth=depth, tree_weight=weights, offset=offsets,
+    )
+
+
+def max_abs_error(pipeline, compiled, features):
+    """Largest absolute difference between the two models' predictions on ``features``."""
+    expected = np.asarray(pipeline.predict(features), dtype=np.float64)
+    actual = np.asarray(compiled.predict(features), dtype=np.float64)
+    return float(np.max(np.abs(expected - actual))) if len(features) else 0.0
+
+
+_FOOTPRINT_SCRIPT = '''
+import json, sys
+import joblib, pandas as pd, sklearn.ensemble, sklearn.pipeline
+import core.compiled, core.transformers
+
+def private_bytes():
+    with open('/proc/self/status') as fh:
+        for line in fh:
+            if line.startswith('RssAnon:'):
+                return int(line.split()[1]) * 1024
+
+features = pd.read_pickle(sys.argv[2])
+before = private_bytes()
+model = joblib.load(sys.argv[1], mmap_mode='r')
+model.predict(features)
+print(json.dumps(private_bytes() - before))
+'''
+
+
+def private_memory_bytes(artifact_path, features, cwd):
+    """
+    Anonymous (per-process, unshared) memory a fresh worker needs to load
+    ``artifact_path`` and score ``features``; None where /proc is unavailable.
+    Memory-mapped arrays live in the shared page cache and are not counted.
+    """
+    if not os.path.exists('/proc/self/status'):
+        return None
+    with tempfile.NamedTemporaryFile(suffix='.pkl') as fh:
+        features.to_pickle(fh.name)
+        result = subprocess.run(
+            [sys.executable, '-c', _FOOTPRINT_SCRIPT, str(artifact_path), fh.name],
+            cwd=cwd, capture_output=True, text=True,
+        )
+    if result.returncode != 0:
+        return None
+    return int(result.stdout.strip().splitlines()[-1])
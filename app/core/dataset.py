@@ -0,0 +1,325 @@
+# core/dataset.py
+"""
+Chunked build of the training dataset from raw FAOSTAT exports, replacing
+``combined_data.ipynb``.
+
+A raw export is FAOSTAT's long table, with one row per Area x Item x Element
+x Year. :func:`build_dataset` reads each input file ``chunk_rows`` rows at a
+time and keeps the area harvested, production and yield elements. It pivots
+each chunk to one row per Country/Crop/Year. A Country/Crop/Year whose
+elements straddle a chunk boundary is combined afterwards, keeping the first
+value of each element like the notebook's ``pivot_table(aggfunc='first')``.
+The climate, price and policy columns of the enrichment CSV are then merged
+on Country/Crop/Year.
+
+Each input file becomes one partition of the output directory::
+
+    manifest.json
+    partitions/<name>.parquet     (.npz without pyarrow)
+
+Storage types are chosen per column:
+
+- Country, Crop and Policy_Flag are categoricals and Year is int16.
+- A float column is float32 when rounding its float32 values to the
+  column's decimal places gives back every original value.
+
+A partition is rebuilt only when the sha256 of its input file or of the
+enrichment file changes, so a rerun over unchanged inputs only hashes them.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from .exporters import parquet_available
+from .feature_store import KEY_COLUMNS, file_sha256
+from .features import CATEGORICAL_FEATURES
+
+RAW_COLUMNS = ['Area', 'Item', 'Element', 'Year', 'Value']
+ELEMENTS = {
+    'Area harvested': 'Area_harvested_ha',
+    'Production': 'Production_tonnes',
+    'Yield': 'Yield_kg_per_ha',
+}
+ENRICHMENT_COLUMNS = ['Rainfall_mm', 'Temperature_C', 'Price_USD_per_tonne', 'Policy_Flag',
+                      'Transport_Cost_USD', 'Demand_Supply_Gap']
+CATEGORY_COLUMNS = CATEGORICAL_FEATURES
+FORMATS = ['parquet', 'npz']
+# Finer float columns are treated as full precision and kept as float64
+MAX_DECIMALS = 4
+DEFAULT_CHUNK_ROWS = 200000
+MANIFEST = 'manifest.json'
+PARTITIONS_DIR = 'partitions'
+
+
+def default_format():
+    return 'parquet' if parquet_available() else 'npz'
+
+
+def is_dataset(path):
+    """Whether ``path`` is a directory written by :func:`build_dataset`."""
+    return os.path.isfile(os.path.join(path, MANIFEST))
+
+
+def input_files(paths):
+    """CSV files of ``paths``, with directories expanded to their ``*.csv`` files in name order."""
+    files = []
+    for path in paths:
+        path = os.path.abspath(path)
+        if os.path.isdir(path):
+            files.extend(os.path.join(path, name) for name in sorted(os.listdir(path))
+                         if name.lower().endswith('.csv'))
+        elif os.path.isfile(path):
+            files.append(path)
+        else:
+            raise FileNotFoundError(f'No such file or directory: {path}')
+    return files
+
+
+# ------------------------------------------------------------------ pipeline
+def pivot_chunk(chunk):
+    """Long FAOSTAT rows -> one row per (Area, Item, Year) with a column per kept element."""
+    chunk = chunk[chunk['Element'].isin(ELEMENTS)]
+    values = pd.to_numeric(chunk['Value'], errors='coerce')
+    return (values.groupby([chunk['Area'].str.strip(), chunk['Item'].str.strip(),
+                            chunk['Year'].astype(np.int64), chunk['Element']], sort=False)
+            .first().unstack('Element'))
+
+
+def pivot_file(path, chunk_rows=DEFAULT_CHUNK_ROWS, progress=None):
+    """The wide Country/Crop/Year table of one raw export, read ``chunk_rows`` rows at a time."""
+    partials, rows = [], 0
+    for chunk in pd.read_csv(path, usecols=RAW_COLUMNS, chunksize=chunk_rows,
+                             dtype={'Area': str, 'Item': str, 'Element': str}):
+        rows += len(chunk)
+        partials.append(pivot_chunk(chunk))
+        if progress:
+            progress(rows)
+    wide = pd.concat(partials) if partials else pd.DataFrame(columns=list(ELEMENTS))
+    if len(partials) > 1:
+        # Rows split across chunks: first non-missing value of each element
+        wide = wide.groupby(level=[0, 1, 2], sort=False).first()
+    wide = wide.reindex(columns=list(ELEMENTS)).rename(columns=ELEMENTS)
+    wide.columns.name = None
+    wide.index.names = KEY_COLUMNS
+    # Keys that only had other elements (e.g. Laying) carry nothing to train on
+    wide = wide.dropna(how='all').reset_index().sort_values(KEY_COLUMNS, ignore_index=True)
+    return wide, rows
+
+
+def read_enrichment(path):
+    """Enrichment columns of ``path`` keyed by Country/Crop/Year (first row per key)."""
+    frame = pd.read_csv(path, usecols=KEY_COLUMNS + ENRICHMENT_COLUMNS, keep_default_na=False,
+                        na_values={c: [''] for c in KEY_COLUMNS + ENRICHMENT_COLUMNS})
+    frame['Country'] = frame['Country'].str.strip()
+    frame['Crop'] = frame['Crop'].str.strip()
+    return frame.drop_duplicates(KEY_COLUMNS, keep='first')
+
+
+def _decimals(values):
+    finite = values[np.isfinite(values)]
+    for decimals in range(MAX_DECIMALS + 1):
+        if np.array_equal(np.round(finite, decimals), finite):
+            return decimals
+    return None
+
+
+def downcast(frame):
+    """
+    ``frame`` with categorical keys, int16 years and float32 wherever it is
+    lossless, and ``{column: decimal places}`` of the float32 columns.
+    """
+    columns, narrowed = {}, {}
+    for column in frame:
+        series = frame[column]
+        if column in CATEGORY_COLUMNS:
+            series = series.astype('category')
+        elif column == 'Year':
+            series = series.astype(np.int16)
+        elif pd.api.types.is_float_dtype(series):
+            values = series.to_numpy(dtype=np.float64)
+            decimals = _decimals(values)
+            narrow = values.astype(np.float32)
+            if decimals is not None and np.array_equal(
+                    np.round(narrow.astype(np.float64), decimals), values, equal_nan=True):
+                series = pd.Series(narrow, index=series.index)
+                narrowed[column] = decimals
+        columns[column] = series
+    return pd.DataFrame(columns), narrowed
+
+
+# ----------------------------------------------------------------- storage
+def write_partition(frame, path, fmt):
+    """Write ``frame`` to ``path`` atomically as zstd Parquet or a compressed ``.npz``."""
+    fd, tmp = tempfile.mkstemp(prefix='.partition-', dir=os.path.dirname(path))
+    os.close(fd)
+    try:
+        if fmt == 'parquet':
+            frame.to_parquet(tmp, engine='pyarrow', compression='zstd', index=False)
+        else:
+            arrays = {'__columns__': np.array(frame.columns, dtype=str)}
+            for column in frame:
+                series = frame[column]
+                if isinstance(series.dtype, pd.CategoricalDtype):
+                    arrays[column] = series.cat.codes.to_numpy()
+                    arrays[f'{column}.categories'] = series.cat.categories.to_numpy(dtype=str)
+                else:
+                    arrays[column] = series.to_numpy()
+            with open(tmp, 'wb') as fh:
+                np.savez_compressed(fh, **arrays)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+
+
+def read_partition(path, columns=None):
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path, columns=columns)
+    with np.load(path, allow_pickle=False) as arrays:
+        names = columns or arrays['__columns__'].tolist()
+        frame = {}
+        for column in names:
+            if f'{column}.categories' in arrays.files:
+                frame[column] = pd.Categorical.from_codes(arrays[column], arrays[f'{column}.categories'])
+            else:
+                frame[column] = arrays[column]
+    return pd.DataFrame(frame)
+
+
+def read_manifest(root):
+    try:
+        with open(os.path.join(root, MANIFEST)) as fh:
+            return json.load(fh)
+    except FileNotFoundError:
+        return {'partitions': []}
+
+
+def _write_manifest(root, manifest):
+    fd, tmp = tempfile.mkstemp(prefix='.manifest-', dir=root)
+    with os.fdopen(fd, 'w') as fh:
+        json.dump(manifest, fh, indent=2)
+    os.replace(tmp, os.path.join(root, MANIFEST))
+
+
+def read_dataset(root, columns=None, exact=False):
+    """
+    Every partition of the dataset at ``root`` as one DataFrame with
+    categorical Country/Crop/Policy_Flag. Where partitions share a
+    Country/Crop/Year the one listed first wins. With ``exact`` float32
+    columns are widened and rounded back to the values of the source.
+    """
+    manifest = read_manifest(root)
+    frames = []
+    for partition in manifest['partitions']:
+        frame = read_partition(os.path.join(root, PARTITIONS_DIR, partition['file']), columns)
+        if exact:
+            frame = frame.astype({c: np.float64 for c in partition['float32'] if c in frame})
+            frame = frame.round({c: d for c, d in partition['float32'].items() if c in frame})
+        frames.append(frame)
+    if not frames:
+        return pd.DataFrame(columns=columns or [])
+    frame = pd.concat(frames, ignore_index=True)
+    if len(frames) > 1:
+        if set(KEY_COLUMNS) <= set(frame.columns):
+            frame = frame.drop_duplicates(KEY_COLUMNS, keep='first', ignore_index=True)
+        # Partitions have their own categories; concatenating them falls back to object
+        frame = frame.astype({c: 'category' for c in CATEGORY_COLUMNS if c in frame})
+    return frame
+
+
+def dataset_sha256(root):
+    """Hash of a dataset's inputs (sources and enrichment), independent of the storage format."""
+    manifest = read_manifest(root)
+    inputs = [[p['sha256'], p['enrichment_sha256']] for p in manifest['partitions']]
+    return hashlib.sha256(json.dumps(inputs).encode()).hexdigest()
+
+
+# ------------------------------------------------------------------- build
+def build_dataset(paths, root, enrichment=None, chunk_rows=DEFAULT_CHUNK_ROWS, fmt=None,
+                  force=False, log=print):
+    """
+    Build or update the dataset at ``root`` from the raw exports ``paths``.
+
+    Partitions whose input and enrichment hashes are unchanged are kept as
+    they are; partitions of inputs no longer listed are removed. Returns a
+    summary of what was built, skipped and removed.
+    """
+    fmt = fmt or default_format()
+    if fmt not in FORMATS:
+        raise ValueError(f'Unknown format {fmt!r}; expected one of {", ".join(FORMATS)}')
+    if fmt == 'parquet' and not parquet_available():
+        raise ValueError('Parquet output requires the pyarrow package')
+    started = time.perf_counter()
+    sources = input_files(paths)
+    os.makedirs(os.path.join(root, PARTITIONS_DIR), exist_ok=True)
+    previous = {p['source']: p for p in read_manifest(root)['partitions']}
+    enrichment_sha256 = file_sha256(enrichment) if enrichment else None
+    enrichment_frame = None
+
+    partitions, built, skipped, raw_rows = [], 0, 0, 0
+    for source in sources:
+        digest = file_sha256(source)
+        name = hashlib.sha1(source.encode()).hexdigest()[:16]
+        entry = previous.get(source)
+        if (not force and entry and entry['sha256'] == digest
+                and entry['enrichment_sha256'] == enrichment_sha256 and entry['format'] == fmt
+                and os.path.exists(os.path.join(root, PARTITIONS_DIR, entry['file']))):
+            log(f'{source}: unchanged, {entry["rows"]:,} rows')
+            partitions.append(entry)
+            skipped += 1
+            continue
+
+        part_started = time.perf_counter()
+        wide, rows = pivot_file(source, chunk_rows,
+                                progress=lambda n: log(f'{source}: {n:,} raw rows read'))
+        if enrichment:
+            if enrichment_frame is None:
+                enrichment_frame = read_enrichment(enrichment)
+            wide = wide.merge(enrichment_frame, on=KEY_COLUMNS, how='left')
+        wide, narrowed = downcast(wide)
+        filename = f'{name}.{fmt}'
+        write_partition(wide, os.path.join(root, PARTITIONS_DIR, filename), fmt)
+        entry = {
+            'source': source,
+            'sha256': digest,
+            'enrichment_sha256': enrichment_sha256,
+            'format': fmt,
+            'file': filename,
+            'raw_rows': rows,
+            'rows': len(wide),
+            'dtypes': {column: str(dtype) for column, dtype in wide.dtypes.items()},
+            'float32': narrowed,
+            'seconds': round(time.perf_counter() - part_started, 3),
+        }
+        log(f'{source}: {rows:,} raw rows -> {len(wide):,} rows in {entry["seconds"]:.2f}s')
+        partitions.append(entry)
+        raw_rows += rows
+        built += 1
+
+    kept = {p['file'] for p in partitions}
+    removed = [p['source'] for p in previous.values() if p['source'] not in sources]
+    _write_manifest(root, {
+        'partitions': partitions,
+        'enrichment': os.path.abspath(enrichment) if enrichment else None,
+        'built_at': datetime.now(timezone.utc).isoformat(),
+    })
+    # Files of removed or rebuilt-under-another-format partitions
+    for filename in os.listdir(os.path.join(root, PARTITIONS_DIR)):
+        if filename not in kept and not filename.startswith('.'):
+            os.unlink(os.path.join(root, PARTITIONS_DIR, filename))
+    return {
+        'partitions': len(partitions),
+        'built': built,
+        'skipped': skipped,
+        'removed': len(removed),
+        'raw_rows': raw_rows,
+        'rows': sum(p['rows'] for p in partitions),
+        'bytes': sum(os.path.getsize(os.path.join(root, PARTITIONS_DIR, p['file'])) for p in partitions),
+        'seconds': round(time.perf_counter() - started, 3),
+    }
@@ -0,0 +1,67 @@
+# core/executors.py
+"""
+Bounded executor for CPU-bound work started from async views.
+
+Parsing an upload, validating it and running ``predict`` must not happen on
+the event loop: a large batch would stall every other connection the process
+is serving. :func:`run_cpu` runs such calls on a fixed pool of
+``INFERENCE_EXECUTOR_WORKERS`` threads (numpy, pandas and sklearn release the
+GIL for most of that work, and the memory-mapped model is shared instead of
+loaded per process). At most ``INFERENCE_EXECUTOR_MAX_PENDING`` calls may be
+queued or running; beyond that :class:`ExecutorBusy` is raised so an
+overloaded process answers 503 instead of queueing without limit.
+"""
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+
+class ExecutorBusy(RuntimeError):
+    """More CPU-bound calls are pending than ``INFERENCE_EXECUTOR_MAX_PENDING``."""
+
+
+_executor = None
+_slots = None
+_pid = None
+_lock = threading.Lock()
+
+
+def _workers():
+    return getattr(settings, 'INFERENCE_EXECUTOR_WORKERS', None) or min(4, os.cpu_count() or 1)
+
+
+def get_executor():
+    """Process-wide inference pool (recreated after fork, like the micro-batcher's thread)."""
+    global _executor, _slots, _pid
+    if _executor is None or _pid != os.getpid():
+        with _lock:
+            if _executor is None or _pid != os.getpid():
+                _executor = ThreadPoolExecutor(max_workers=_workers(),
+                                               thread_name_prefix='inference')
+                _slots = threading.Semaphore(
+                    getattr(settings, 'INFERENCE_EXECUTOR_MAX_PENDING', 64))
+                _pid = os.getpid()
+    return _executor
+
+
+async def run_cpu(fn, *args, **kwargs):
+    """Await ``fn(*args, **kwargs)`` run on the inference pool."""
+    executor = get_executor()
+    slots = _slots
+    if not slots.acquire(blocking=False):
+        raise ExecutorBusy('Too many inference calls pending')
+    # Copy the context so request instrumentation (timed sections) still applies
+    call = functools.partial(contextvars.copy_context().run, fn, *args, **kwargs)
+    try:
+        future = executor.submit(call)
+    except BaseException:
+        slots.release()
+        raise
+    # Free the slot when the work finishes, not when a disconnected caller stops waiting
+    future.add_done_callback(lambda _: slots.release())
+    return await asyncio.wrap_future(future)
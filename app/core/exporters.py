@@ -0,0 +1,159 @@
+# core/exporters.py
+"""
+Streaming exporters for prediction history.
+
+Each exporter takes a queryset and yields ``bytes`` chunks, reading rows with
+``values_list().iterator(chunk_size=...)`` so memory use stays constant no
+matter how many predictions a user has. Any exporter can be wrapped with
+:func:`gzip_stream`.
+"""
+import csv
+import io
+import json
+import zlib
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+EXPORT_FIELDS = [
+    'crop', 'country', 'year', 'area_harvested_ha',
+    'rainfall_mm', 'temperature_c', 'policy_flag',
+    'transport_cost_usd', 'demand_supply_gap',
+    'predicted_production', 'predicted_yield', 'predicted_price',
+    'created_at'
+]
+
+CSV_HEADER = [
+    'Crop', 'Country', 'Year', 'Area Harvested (ha)',
+    'Rainfall (mm)', 'Temperature (C)', 'Policy Flag',
+    'Transport Cost (USD)', 'Demand Supply Gap',
+    'Predicted Production', 'Predicted Yield', 'Predicted Price',
+    'Date Created'
+]
+
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def _chunks(queryset, chunk_size):
+    rows = queryset.values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def stream_csv(queryset, chunk_size=DEFAULT_CHUNK_SIZE):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_HEADER)
+    yield buffer.getvalue().encode()
+    for chunk in _chunks(queryset, chunk_size):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(
+            row[:-1] + (row[-1].strftime("%Y-%m-%d %H:%M:%S"),) for row in chunk
+        )
+        yield buffer.getvalue().encode()
+
+
+def _json_rows(chunk):
+    return [dict(zip(EXPORT_FIELDS, row)) for row in chunk]
+
+
+def stream_json(queryset, chunk_size=DEFAULT_CHUNK_SIZE):
+    """A single JSON array, written incrementally."""
+    yield b'['
+    first = True
+    for chunk in _chunks(queryset, chunk_size):
+        body = json.dumps(_json_rows(chunk), cls=DjangoJSONEncoder)[1:-1]
+        yield (body if first else ',' + body).encode()
+        first = False
+    yield b']'
+
+
+def stream_ndjson(queryset, chunk_size=DEFAULT_CHUNK_SIZE):
+    """One JSON object per line."""
+    encoder = DjangoJSONEncoder()
+    for chunk in _chunks(queryset, chunk_size):
+        yield ''.join(encoder.encode(row) + '\n' for row in _json_rows(chunk)).encode()
+
+
+class _DrainableSink(io.RawIOBase):
+    """Write-only file object whose buffered bytes can be drained between row groups."""
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def stream_parquet(queryset, chunk_size=DEFAULT_CHUNK_SIZE):
+    """One Parquet row group per chunk; needs the optional ``pyarrow`` package."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ('crop', pa.string()), ('country', pa.string()), ('year', pa.int32()),
+        ('area_harvested_ha', pa.float64()), ('rainfall_mm', pa.float64()),
+        ('temperature_c', pa.float64()), ('policy_flag', pa.string()),
+        ('transport_cost_usd', pa.float64()), ('demand_supply_gap', pa.float64()),
+        ('predicted_production', pa.float64()), ('predicted_yield', pa.float64()),
+        ('predicted_price', pa.float64()), ('created_at', pa.timestamp('us', tz='UTC')),
+    ])
+    sink = _DrainableSink()
+    writer = pq.ParquetWriter(sink, schema, compression='snappy')
+    try:
+        for chunk in _chunks(queryset, chunk_size):
+            columns = list(zip(*chunk))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                schema=schema,
+            ))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def gzip_stream(chunks, level=6):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+EXPORTERS = {
+    # format: (stream function, content type, file extension)
+    'csv': (stream_csv, 'text/csv', 'csv'),
+    'json': (stream_json, 'application/json', 'json'),
+    'ndjson': (stream_ndjson, 'application/x-ndjson', 'ndjson'),
+    'parquet': (stream_parquet, 'application/vnd.apache.parquet', 'parquet'),
+}
+
+
+def parquet_available():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
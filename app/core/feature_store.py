@@ -0,0 +1,296 @@
+# core/feature_store.py
+"""
+Columnar, memory-mapped store of historical features.
+
+Layout under ``settings.FEATURE_STORE_DIR``::
+
+    manifest.json
+    segments/<n>/<column>.npy
+
+Every ingest appends one segment holding only rows whose
+(Country, Crop, Year) key is not stored yet, sorted so each Country/Crop
+partition is a contiguous run ordered by year. Text columns are fixed-width
+unicode arrays, so every column of every segment is opened with
+``np.load(mmap_mode='r')`` and shared between processes through the page
+cache. Derived features are computed with ``core.features.derive_features``
+and therefore match ``AgriculturalData``'s properties exactly.
+
+On first lookup an in-memory index ``(country, crop) -> year-sorted rows`` is
+built over all segments, so :meth:`FeatureStore.lookup` is a dict access plus
+a ``searchsorted``.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+from .features import (CATEGORICAL_FEATURES, INPUT_COLUMNS, MODEL_FEATURES,
+                       build_features)
+
+TARGET_COLUMN = 'Yield_kg_per_ha'
+STORE_COLUMNS = MODEL_FEATURES + [TARGET_COLUMN]
+TEXT_COLUMNS = CATEGORICAL_FEATURES
+KEY_COLUMNS = ['Country', 'Crop', 'Year']
+MANIFEST = 'manifest.json'
+SEGMENTS_DIR = 'segments'
+
+
+def file_sha256(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def frame_to_store_columns(frame):
+    """Dataset-shaped rows -> dict of store columns (inputs, derived features, target)."""
+    features = build_features(frame)
+    columns = {name: features[name].to_numpy() for name in MODEL_FEATURES}
+    for name in TEXT_COLUMNS:
+        columns[name] = columns[name].astype(str)
+    # Keep missing inputs visible in the store instead of the zeros the model sees
+    for name in INPUT_COLUMNS:
+        if name not in TEXT_COLUMNS and name in frame:
+            raw = pd.to_numeric(frame[name], errors='coerce').to_numpy(dtype=np.float64)
+            columns[name] = np.where(np.isnan(raw), np.nan, columns[name])
+    target = frame[TARGET_COLUMN] if TARGET_COLUMN in frame else pd.Series(np.nan, index=frame.index)
+    columns[TARGET_COLUMN] = pd.to_numeric(target, errors='coerce').to_numpy(dtype=np.float64)
+    return columns
+
+
+class FeatureStore:
+    def __init__(self, root, reload_interval=5.0):
+        self.root = str(root)
+        self.reload_interval = reload_interval
+        self._segments = None
+        self._index = None
+        self._manifest_mtime = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------- manifest
+    def _manifest_path(self):
+        return os.path.join(self.root, MANIFEST)
+
+    def read_manifest(self):
+        try:
+            with open(self._manifest_path()) as fh:
+                return json.load(fh)
+        except FileNotFoundError:
+            return {'segments': [], 'sources': {}}
+
+    def _write_manifest(self, manifest):
+        fd, tmp = tempfile.mkstemp(prefix='.manifest-', dir=self.root)
+        with os.fdopen(fd, 'w') as fh:
+            json.dump(manifest, fh, indent=2)
+        os.replace(tmp, self._manifest_path())
+
+    # -------------------------------------------------------------- loading
+    def _load_segment(self, name):
+        base = os.path.join(self.root, SEGMENTS_DIR, name)
+        return {column: np.load(os.path.join(base, f'{column}.npy'), mmap_mode='r')
+                for column in STORE_COLUMNS}
+
+    def _ensure_loaded(self):
+        now = time.monotonic()
+        if self._index is not None and now - self._checked_at < self.reload_interval:
+            return
+        with self._lock:
+            self._checked_at = time.monotonic()
+            try:
+                mtime = os.stat(self._manifest_path()).st_mtime_ns
+            except FileNotFoundError:
+                mtime = None
+            if self._index is not None and mtime == self._manifest_mtime:
+                return
+            manifest = self.read_manifest()
+            segments = [self._load_segment(s['name']) for s in manifest['segments']]
+            self._index = self._build_index(segments)
+            self._segments = segments
+            self._manifest_mtime = mtime
+
+    @staticmethod
+    def _build_index(segments):
+        if not segments:
+            return {}
+        country = np.concatenate([s['Country'] for s in segments])
+        crop = np.concatenate([s['Crop'] for s in segments])
+        year = np.concatenate([np.asarray(s['Year']) for s in segments])
+        seg_ids = np.concatenate([np.full(len(s['Year']), i, dtype=np.int32)
+                                  for i, s in enumerate(segments)])
+        row_ids = np.concatenate([np.arange(len(s['Year']), dtype=np.int64) for s in segments])
+
+        order = np.lexsort((year, crop, country))
+        country, crop, year = country[order], crop[order], year[order]
+        seg_ids, row_ids = seg_ids[order], row_ids[order]
+        boundaries = np.flatnonzero((country[1:] != country[:-1]) | (crop[1:] != crop[:-1])) + 1
+        starts = np.concatenate([[0], boundaries])
+        stops = np.concatenate([boundaries, [len(order)]])
+        return {
+            (str(country[a]), str(crop[a])): (year[a:b], seg_ids[a:b], row_ids[a:b])
+            for a, b in zip(starts, stops)
+        }
+
+    def reload(self):
+        self._checked_at = 0.0
+        self._manifest_mtime = None
+        self._ensure_loaded()
+
+    # --------------------------------------------------------------- lookup
+    def keys(self):
+        self._ensure_loaded()
+        return self._index.keys()
+
+    def _row(self, seg_id, row_id):
+        segment = self._segments[seg_id]
+        row = {
+            column: (str(segment[column][row_id]) if column in TEXT_COLUMNS
+                     else float(segment[column][row_id]))
+            for column in STORE_COLUMNS
+        }
+        row['Year'] = int(row['Year'])
+        return row
+
+    def lookup(self, country, crop, year=None):
+        """
+        Latest stored row for ``country``/``crop`` at or before ``year``
+        (or the latest overall when ``year`` is None); ``None`` if unknown.
+        """
+        self._ensure_loaded()
+        entry = self._index.get((country.strip(), crop.strip()))
+        if entry is None:
+            return None
+        years, seg_ids, row_ids = entry
+        if year is None:
+            position = len(years) - 1
+        else:
+            position = int(np.searchsorted(years, year, side='right')) - 1
+            if position < 0:
+                return None
+        return self._row(int(seg_ids[position]), int(row_ids[position]))
+
+    def history(self, country, crop, columns=None):
+        """All stored years for a partition as ``{column: array}`` ordered by year."""
+        self._ensure_loaded()
+        entry = self._index.get((country.strip(), crop.strip()))
+        columns = columns or STORE_COLUMNS
+        if entry is None:
+            return {column: np.empty(0) for column in columns}
+        _, seg_ids, row_ids = entry
+        return {
+            column: np.array([self._segments[s][column][r] for s, r in zip(seg_ids, row_ids)])
+            for column in columns
+        }
+
+    def to_frame(self, columns=None):
+        """Every stored row as one DataFrame (segment order, not sorted)."""
+        self._ensure_loaded()
+        columns = columns or STORE_COLUMNS
+        return pd.DataFrame({
+            column: np.concatenate([np.asarray(s[column]) for s in self._segments])
+            if self._segments else np.empty(0)
+            for column in columns
+        })
+
+    def __len__(self):
+        self._ensure_loaded()
+        return sum(len(s['Year']) for s in self._segments)
+
+    # --------------------------------------------------------------- ingest
+    def _existing_keys(self):
+        self._ensure_loaded()
+        return {
+            (country, crop, int(year))
+            for (country, crop), (years, _, _) in self._index.items()
+            for year in years
+        }
+
+    def ingest_csv(self, path, chunksize=50000):
+        """
+        Append rows of ``path`` that are not stored yet. Returns the number of
+        new rows; an unchanged source file is skipped via its content hash.
+        """
+        os.makedirs(os.path.join(self.root, SEGMENTS_DIR), exist_ok=True)
+        manifest = self.read_manifest()
+        source = os.path.abspath(path)
+        digest = file_sha256(source)
+        if manifest['sources'].get(source) == digest:
+            return 0
+
+        existing = self._existing_keys()
+        parts = []
+        for frame in pd.read_csv(source, chunksize=chunksize):
+            frame = frame.dropna(subset=KEY_COLUMNS)
+            keys = zip(frame['Country'].astype(str), frame['Crop'].astype(str),
+                       frame['Year'].astype(int))
+            fresh = np.fromiter((key not in existing for key in keys), dtype=bool, count=len(frame))
+            frame = frame[fresh].drop_duplicates(subset=KEY_COLUMNS, keep='last')
+            existing.update(zip(frame['Country'].astype(str), frame['Crop'].astype(str),
+                                frame['Year'].astype(int)))
+            if len(frame):
+                parts.append(frame_to_store_columns(frame))
+
+        added = 0
+        if parts:
+            columns = {c: np.concatenate([p[c] for p in parts]) for c in STORE_COLUMNS}
+            added = len(columns['Year'])
+            name = f'{len(manifest["segments"]):05d}'
+            self._write_segment(name, columns)
+            manifest['segments'].append({'name': name, 'rows': added, 'source': source})
+        manifest['sources'][source] = digest
+        self._write_manifest(manifest)
+        self.reload()
+        return added
+
+    def _write_segment(self, name, columns):
+        order = np.lexsort((columns['Year'], columns['Crop'], columns['Country']))
+        staging = tempfile.mkdtemp(prefix=f'.{name}-', dir=os.path.join(self.root, SEGMENTS_DIR))
+        for column in STORE_COLUMNS:
+            values = columns[column][order]
+            if column in TEXT_COLUMNS:
+                values = values.astype(str)
+            elif column == 'Year':
+                values = values.astype(np.int32)
+            else:
+                values = values.astype(np.float64)
+            np.save(os.path.join(staging, f'{column}.npy'), values)
+        os.rename(staging, os.path.join(self.root, SEGMENTS_DIR, name))
+
+    def compact(self):
+        """Merge all segments into one (keeps sources so unchanged files stay skipped)."""
+        manifest = self.read_manifest()
+        if len(manifest['segments']) < 2:
+            return
+        self._ensure_loaded()
+        columns = {c: np.concatenate([np.asarray(s[c]) for s in self._segments]) for c in STORE_COLUMNS}
+        name = f'{int(manifest["segments"][-1]["name"]) + 1:05d}'
+        self._write_segment(name, columns)
+        old = [s['name'] for s in manifest['segments']]
+        manifest['segments'] = [{'name': name, 'rows': len(columns['Year']), 'source': 'compacted'}]
+        self._write_manifest(manifest)
+        self.reload()
+        for segment in old:
+            shutil.rmtree(os.path.join(self.root, SEGMENTS_DIR, segment), ignore_errors=True)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_feature_store():
+    """Process-wide feature store configured from settings."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = FeatureStore(
+                    getattr(settings, 'FEATURE_STORE_DIR', settings.BASE_DIR / 'feature_store'))
+    return _store
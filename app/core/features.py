@@ -0,0 +1,215 @@
+# core/features.py
+"""
+Feature builder shared by online and batch inference.
+
+Everything funnels through :func:`build_features`, which accepts model
+instances, querysets, dicts (e.g. form ``cleaned_data``) or DataFrames and
+returns a single DataFrame whose columns are exactly ``MODEL_FEATURES`` in
+order. Derived features are computed column-wise with NumPy, so scoring one
+row and scoring 100k rows run the same code. They are also stored on every
+``AgriculturalData`` row (``DERIVED_FIELD_TO_COLUMN``), so a queryset's
+features are read with a single ``values_list()`` query.
+"""
+import numpy as np
+import pandas as pd
+from django.db.models import QuerySet
+
+# Constants for model features
+MODEL_FEATURES = [
+    'Country',
+    'Crop',
+    'Year',
+    'Area_harvested_ha',
+    'Rainfall_mm',
+    'Temperature_C',
+    'Policy_Flag',
+    'Transport_Cost_USD',
+    'Demand_Supply_Gap',
+    'Rainfall_Temp_interaction',
+    'Price_to_Yield_ratio',
+    'Production_tonnes',
+    'log_Area_harvested_ha',
+    'Demand_Supply_balance',
+    'log_Transport_Cost_USD',
+    'Price_USD_per_tonne',
+    'Productivity_index',
+    'log_Production_tonnes'
+]
+
+CATEGORICAL_FEATURES = ['Country', 'Crop', 'Policy_Flag']
+NUMERIC_FEATURES = [f for f in MODEL_FEATURES if f not in CATEGORICAL_FEATURES]
+
+# AgriculturalData field -> dataset column for the user-entered inputs
+FIELD_TO_COLUMN = {
+    'country': 'Country',
+    'crop': 'Crop',
+    'year': 'Year',
+    'area_harvested_ha': 'Area_harvested_ha',
+    'production_tonnes': 'Production_tonnes',
+    'rainfall_mm': 'Rainfall_mm',
+    'temperature_c': 'Temperature_C',
+    'price_usd_per_tonne': 'Price_USD_per_tonne',
+    'policy_flag': 'Policy_Flag',
+    'transport_cost_usd': 'Transport_Cost_USD',
+    'demand_supply_gap': 'Demand_Supply_Gap',
+    'productivity_index': 'Productivity_index',
+}
+INPUT_FIELDS = list(FIELD_TO_COLUMN)
+INPUT_COLUMNS = list(FIELD_TO_COLUMN.values())
+
+# AgriculturalData field -> dataset column for the derived features stored on
+# each row (set by AgriculturalData.save and core.batch.build_instances)
+DERIVED_FIELD_TO_COLUMN = {
+    'rainfall_temp_interaction': 'Rainfall_Temp_interaction',
+    'price_to_yield_ratio': 'Price_to_Yield_ratio',
+    'demand_supply_balance': 'Demand_Supply_balance',
+    'log_production_tonnes': 'log_Production_tonnes',
+    'log_area_harvested_ha': 'log_Area_harvested_ha',
+    'log_transport_cost_usd': 'log_Transport_Cost_USD',
+}
+DERIVED_FIELDS = list(DERIVED_FIELD_TO_COLUMN)
+DERIVED_COLUMNS = list(DERIVED_FIELD_TO_COLUMN.values())
+
+DEFAULT_POLICY_FLAG = 'None'
+
+
+def _safe_log(values):
+    out = np.zeros_like(values)
+    np.log(values, out=out, where=values > 0)
+    return out
+
+
+def _safe_divide(numerator, denominator, where):
+    out = np.zeros_like(numerator)
+    np.divide(numerator, denominator, out=out, where=where)
+    return out
+
+
+def derive_features(columns):
+    """
+    Add the derived features to ``columns`` (dict of column name -> array).
+
+    Zero is returned wherever a ratio's denominator or a log's argument is
+    not positive.
+    """
+    area = columns['Area_harvested_ha']
+    production = columns['Production_tonnes']
+    price = columns['Price_USD_per_tonne']
+
+    columns['Rainfall_Temp_interaction'] = columns['Rainfall_mm'] * columns['Temperature_C']
+    tonnes_per_ha = _safe_divide(production, area, area > 0)
+    columns['Price_to_Yield_ratio'] = _safe_divide(price, tonnes_per_ha, tonnes_per_ha != 0)
+    columns['Demand_Supply_balance'] = _safe_divide(
+        columns['Demand_Supply_Gap'], production, production > 0
+    )
+    columns['log_Production_tonnes'] = _safe_log(production)
+    columns['log_Area_harvested_ha'] = _safe_log(area)
+    columns['log_Transport_Cost_USD'] = _safe_log(columns['Transport_Cost_USD'])
+    return columns
+
+
+def _columns_from_records(records, getter):
+    columns = {}
+    for field, column in FIELD_TO_COLUMN.items():
+        values = [getter(record, field) for record in records]
+        if column in CATEGORICAL_FEATURES:
+            columns[column] = np.array(values, dtype=object)
+        else:
+            columns[column] = np.array(
+                [np.nan if v is None else v for v in values], dtype=np.float64
+            )
+    return columns
+
+
+def _columns_from_queryset(queryset):
+    # Stored derived features come back with the inputs in the same query
+    names = INPUT_COLUMNS + DERIVED_COLUMNS
+    rows = list(queryset.values_list(*INPUT_FIELDS, *DERIVED_FIELDS))
+    if not rows:
+        return {column: np.empty(0, dtype=object if column in CATEGORICAL_FEATURES else np.float64)
+                for column in names}
+    transposed = list(zip(*rows))
+    columns = {}
+    for column, values in zip(names, transposed):
+        if column in CATEGORICAL_FEATURES:
+            columns[column] = np.array(values, dtype=object)
+        else:
+            columns[column] = np.array(values, dtype=np.float64)
+    return columns
+
+
+def _columns_from_frame(frame):
+    frame = frame.rename(columns=FIELD_TO_COLUMN)
+    columns = {}
+    for column in INPUT_COLUMNS:
+        if column not in frame:
+            continue
+        if column in CATEGORICAL_FEATURES:
+            columns[column] = frame[column].to_numpy(dtype=object)
+        else:
+            columns[column] = pd.to_numeric(frame[column], errors='coerce').to_numpy(dtype=np.float64)
+    if 'Productivity_index' not in columns and {'Production_tonnes', 'Area_harvested_ha'} <= columns.keys():
+        area = columns['Area_harvested_ha']
+        columns['Productivity_index'] = _safe_divide(columns['Production_tonnes'], area, area > 0)
+    missing = [c for c in INPUT_COLUMNS if c not in columns]
+    if missing:
+        raise ValueError(f'Missing input columns: {", ".join(missing)}')
+    return columns
+
+
+def input_columns(rows):
+    """
+    Return the raw input columns of ``rows`` as a dict of NumPy arrays
+    (plus the stored derived columns for a queryset).
+    """
+    if isinstance(rows, pd.DataFrame):
+        return _columns_from_frame(rows)
+    if isinstance(rows, QuerySet):
+        return _columns_from_queryset(rows)
+    if isinstance(rows, dict):
+        rows = [rows]
+    rows = list(rows)
+    if rows and isinstance(rows[0], dict):
+        return _columns_from_records(rows, lambda record, field: record.get(field))
+    return _columns_from_records(rows, getattr)
+
+
+def build_features(rows):
+    """
+    Build the model input block for ``rows``.
+
+    ``rows`` may be a single instance or dict, an iterable of either, a
+    queryset, or a DataFrame using model field names or dataset column
+    names. Returns a DataFrame with columns ``MODEL_FEATURES``: categorical
+    columns as ``object`` and everything else as ``float64``.
+    """
+    if not isinstance(rows, (pd.DataFrame, QuerySet, dict, list, tuple)) and hasattr(rows, 'pk'):
+        rows = [rows]
+    columns = _clean_inputs(input_columns(rows))
+    if not all(column in columns for column in DERIVED_COLUMNS):
+        derive_features(columns)
+    return pd.DataFrame({column: columns[column] for column in MODEL_FEATURES}, copy=False)
+
+
+def _clean_inputs(columns):
+    for column in NUMERIC_FEATURES:
+        if column in columns:
+            columns[column] = np.nan_to_num(columns[column], nan=0.0, posinf=0.0, neginf=0.0)
+    policy = columns['Policy_Flag']
+    empty = (policy == None) | (policy == '')  # noqa: E711 - element-wise comparison
+    if empty.any():
+        policy = policy.copy()
+        policy[empty] = DEFAULT_POLICY_FLAG
+        columns['Policy_Flag'] = policy
+    return columns
+
+
+def derived_fields(rows):
+    """
+    The derived features of ``rows`` (anything :func:`build_features`
+    accepts) as ``field name -> array``, for storing on ``AgriculturalData``.
+    """
+    if not isinstance(rows, (pd.DataFrame, QuerySet, dict, list, tuple)) and hasattr(rows, 'pk'):
+        rows = [rows]
+    columns = derive_features(_clean_inputs(input_columns(rows)))
+    return {field: columns[column] for field, column in DERIVED_FIELD_TO_COLUMN.items()}
@@ -0,0 +1,404 @@
+# core/forecasting.py
+"""
+Per-series forecasts of harvested area, production and yield from the FAO
+history in ``FORECAST_SOURCE`` (``data/fao_data_cleaned.csv``).
+
+Every Country/Crop series is one row of a ``series x year`` matrix per
+metric, with NaN for missing years. Each model is fitted to all rows at once
+with array operations; only the handful of years is looped over:
+
+``trend``
+    least-squares line through the observed years
+``holt``
+    Holt's linear exponential smoothing, with alpha and beta picked per
+    series from a grid (beta = 0 is simple exponential smoothing)
+``ar1``
+    ``y[t] = c + phi * y[t-1]``, reverting to ``c / (1 - phi)``
+``naive``
+    the last observed value, for series too short for anything else
+
+Each series keeps the model with the smallest error when its last observed
+year is held out and forecast from the earlier ones. Fitted parameters and
+the history matrices are written as ``.npy`` files under ``FORECAST_DIR``,
+memory-mapped on load. Only ``python manage.py fit_forecasts`` fits them:
+requests raise :class:`ForecastsNotAvailable` until it has run, and again
+once the source file's hash no longer matches the fit. Series are fitted in
+blocks of ``BLOCK_SERIES``, which bounds memory and lets joblib spread the
+blocks over ``FORECAST_N_JOBS`` processes.
+"""
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from joblib import Parallel, delayed
+
+from .feature_store import file_sha256
+
+METRICS = {
+    'area': 'Area_harvested_ha',
+    'production': 'Production_tonnes',
+    'yield': 'Yield_kg_per_ha',
+}
+MODELS = ['naive', 'trend', 'holt', 'ar1']
+NAIVE, TREND, HOLT, AR1 = range(len(MODELS))
+# Observed years each model needs to be fitted
+MIN_POINTS = {'naive': 1, 'trend': 2, 'holt': 2, 'ar1': 3}
+ALPHAS = np.linspace(0.1, 1.0, 10)
+BETAS = np.linspace(0.0, 0.9, 10)
+PARAMS = ['model', 'level', 'slope', 'phi', 'mean', 'lag', 'error']
+BLOCK_SERIES = 10000
+MANIFEST = 'manifest.json'
+FITS_DIR = 'fits'
+
+
+# ------------------------------------------------------------------ stacking
+def stack_series(frame):
+    """``(countries, crops, years, {metric: series x year matrix})`` from dataset rows."""
+    codes, series = pd.factorize(pd.MultiIndex.from_frame(frame[['Country', 'Crop']].astype(str)))
+    years = np.sort(frame['Year'].unique()).astype(np.int64)
+    columns = np.searchsorted(years, frame['Year'].to_numpy())
+    matrices = {}
+    for metric, column in METRICS.items():
+        matrix = np.full((len(series), len(years)), np.nan)
+        matrix[codes, columns] = pd.to_numeric(frame[column], errors='coerce').to_numpy(dtype=np.float64)
+        matrices[metric] = matrix
+    countries = series.get_level_values(0).to_numpy(dtype=str)
+    crops = series.get_level_values(1).to_numpy(dtype=str)
+    return countries, crops, years, matrices
+
+
+# ------------------------------------------------------------------- fitting
+def _last_observed(Y):
+    """Column of each row's last observed value (-1 if none) and the value."""
+    observed = ~np.isnan(Y)
+    last = Y.shape[1] - 1 - np.argmax(observed[:, ::-1], axis=1)
+    last = np.where(observed.any(axis=1), last, -1)
+    return last, Y[np.arange(len(Y)), np.maximum(last, 0)]
+
+
+def _params(Y, level, slope=None, phi=None, mean=None, lag=None):
+    n = len(Y)
+    return {
+        'level': level,
+        'slope': np.zeros(n) if slope is None else slope,
+        'phi': np.zeros(n) if phi is None else phi,
+        'mean': np.full(n, np.nan) if mean is None else mean,
+        'lag': np.zeros(n, dtype=np.int64) if lag is None else lag,
+    }
+
+
+def fit_naive(Y):
+    return _params(Y, _last_observed(Y)[1])
+
+
+def fit_trend(Y):
+    T = Y.shape[1]
+    observed = ~np.isnan(Y)
+    n = observed.sum(axis=1)
+    t = np.where(observed, np.arange(T, dtype=np.float64), 0.0)
+    y = np.where(observed, Y, 0.0)
+    st, sy = t.sum(axis=1), y.sum(axis=1)
+    den = n * (t * t).sum(axis=1) - st * st
+    slope = np.divide(n * (t * y).sum(axis=1) - st * sy, den, out=np.zeros(len(Y)), where=den > 0)
+    intercept = np.divide(sy - slope * st, n, out=np.full(len(Y), np.nan), where=n > 0)
+    # Level at the last column, so every model forecasts h years ahead of it
+    return _params(Y, intercept + slope * (T - 1), slope=slope)
+
+
+def fit_holt(Y, alphas=ALPHAS, betas=BETAS):
+    alpha, beta = (grid.ravel()[:, None] for grid in np.meshgrid(alphas, betas, indexing='ij'))
+    shape = (len(alpha), len(Y))
+    level = np.full(shape, np.nan)
+    trend = np.zeros(shape)
+    sse = np.zeros(shape)
+    for t in range(Y.shape[1]):
+        y = Y[:, t]
+        observed = ~np.isnan(y)
+        started = ~np.isnan(level)
+        forecast = level + trend
+        scored = observed & started
+        sse += np.where(scored, (y - forecast) ** 2, 0.0)
+        # A missing year carries the forecast forward as the level
+        new_level = np.where(observed, np.where(started, alpha * y + (1 - alpha) * forecast, y), forecast)
+        trend = np.where(scored, beta * (new_level - level) + (1 - beta) * trend, trend)
+        level = new_level
+    best = np.argmin(sse, axis=0)
+    rows = np.arange(len(Y))
+    return _params(Y, level[best, rows], slope=trend[best, rows])
+
+
+def fit_ar1(Y):
+    x, z = Y[:, :-1], Y[:, 1:]
+    pair = ~np.isnan(x) & ~np.isnan(z)
+    n = pair.sum(axis=1)
+    safe_n = np.maximum(n, 1)
+    mx = np.where(pair, x, 0.0).sum(axis=1) / safe_n
+    mz = np.where(pair, z, 0.0).sum(axis=1) / safe_n
+    dx = np.where(pair, x - mx[:, None], 0.0)
+    dz = np.where(pair, z - mz[:, None], 0.0)
+    var = (dx * dx).sum(axis=1)
+    valid = (n >= 2) & (var > 0)
+    # Clipped to keep every forecast stationary
+    phi = np.clip(np.divide((dx * dz).sum(axis=1), var, out=np.zeros(len(Y)), where=valid), -0.99, 0.99)
+    mean = np.where(valid, (mz - phi * mx) / (1 - phi), np.nan)
+    last, value = _last_observed(Y)
+    return _params(Y, value, phi=phi, mean=mean, lag=Y.shape[1] - 1 - last)
+
+
+FITTERS = {'naive': fit_naive, 'trend': fit_trend, 'holt': fit_holt, 'ar1': fit_ar1}
+
+
+def project(params, h):
+    """
+    Forecast ``h`` years after the last column; ``h`` is per series (shape
+    ``(n,)``) or a row of horizons (shape ``(1, H)``, giving ``(n, H)``).
+    """
+    def column(name):
+        return params[name] if np.ndim(h) < 2 else params[name][:, None]
+
+    linear = column('level') + column('slope') * h
+    # Only rows of other models (whose lag is 0) can have negative steps; their AR value is discarded
+    steps = np.maximum(column('lag') + h, 0)
+    with np.errstate(invalid='ignore'):
+        ar = column('mean') + column('phi') ** steps * (column('level') - column('mean'))
+    forecast = np.where(column('model') == AR1, ar, linear)
+    # Area, production and yield cannot go negative
+    return np.maximum(forecast, 0.0)
+
+
+def select_models(Y):
+    """Per series, the model with the smallest error on its held-out last year, and that relative error."""
+    last, target = _last_observed(Y)
+    has = last >= 0
+    train = Y.copy()
+    train[np.flatnonzero(has), last[has]] = np.nan
+    n_train = (~np.isnan(train)).sum(axis=1)
+    h = last - (Y.shape[1] - 1)
+    errors = np.full((len(Y), len(MODELS)), np.inf)
+    for k, name in enumerate(MODELS):
+        params = FITTERS[name](train)
+        params['model'] = np.full(len(Y), k)
+        error = np.abs(project(params, h) - target)
+        usable = (n_train >= MIN_POINTS[name]) & np.isfinite(error)
+        errors[usable, k] = error[usable]
+    best = np.argmin(errors, axis=1)
+    untested = ~np.isfinite(errors).any(axis=1)
+    n = (~np.isnan(Y)).sum(axis=1)
+    best[untested] = np.where(n[untested] >= MIN_POINTS['trend'], TREND, NAIVE)
+    error = errors[np.arange(len(Y)), best]
+    relative = np.divide(error, np.abs(target), out=np.full(len(Y), np.nan),
+                         where=np.isfinite(error) & (target != 0))
+    return best, relative
+
+
+def fit_series(Y):
+    """Fit and select a model for every row of ``Y``; returns ``PARAMS`` arrays."""
+    best, error = select_models(Y)
+    fitted = [FITTERS[name](Y) for name in MODELS]
+    rows = np.arange(len(Y))
+    params = {key: np.stack([f[key] for f in fitted], axis=1)[rows, best]
+              for key in ('level', 'slope', 'phi', 'mean', 'lag')}
+    params['model'] = best.astype(np.int8)
+    params['error'] = error
+    return params
+
+
+def fit_matrix(Y, n_jobs=1, block_size=BLOCK_SERIES):
+    """:func:`fit_series` over blocks of ``block_size`` series, in ``n_jobs`` processes."""
+    blocks = [Y[start:start + block_size] for start in range(0, len(Y), block_size)] or [Y]
+    if n_jobs == 1 or len(blocks) == 1:
+        results = [fit_series(block) for block in blocks]
+    else:
+        results = Parallel(n_jobs=n_jobs)(delayed(fit_series)(block) for block in blocks)
+    return {key: np.concatenate([r[key] for r in results]) for key in PARAMS}
+
+
+def _clean(value, digits=2):
+    return None if value is None or not np.isfinite(value) else round(float(value), digits)
+
+
+# ------------------------------------------------------------------- serving
+class ForecastsNotAvailable(Exception):
+    """No fit has been published, or the source history changed since the last one."""
+
+
+class Forecaster:
+    def __init__(self, root, source, n_jobs=1, reload_interval=5.0):
+        self.root = str(root)
+        self.source = str(source)
+        self.n_jobs = n_jobs
+        self.reload_interval = reload_interval
+        # (fit arrays, {(country, crop): row}) of the loaded fit, swapped as one
+        self._loaded = None
+        self._manifest_mtime = None
+        self._source_key = None
+        self._source_digest = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _manifest_path(self):
+        return os.path.join(self.root, MANIFEST)
+
+    def read_manifest(self):
+        try:
+            with open(self._manifest_path()) as fh:
+                return json.load(fh)
+        except FileNotFoundError:
+            return None
+
+    # -------------------------------------------------------------- fitting
+    def fit(self, source=None, n_jobs=None):
+        """Refit every series of ``source`` and publish the parameters; returns the manifest."""
+        source = str(source or self.source)
+        n_jobs = n_jobs or self.n_jobs
+        started = time.perf_counter()
+        frame = pd.read_csv(source, usecols=['Country', 'Crop', 'Year', *METRICS.values()])
+        countries, crops, years, matrices = stack_series(frame)
+        fit_started = time.perf_counter()
+        params = {metric: fit_matrix(matrix, n_jobs=n_jobs) for metric, matrix in matrices.items()}
+        fit_seconds = time.perf_counter() - fit_started
+
+        fits = os.path.join(self.root, FITS_DIR)
+        os.makedirs(fits, exist_ok=True)
+        name = str(time.time_ns())
+        staging = tempfile.mkdtemp(prefix=f'.{name}-', dir=fits)
+        arrays = {'countries': countries, 'crops': crops, 'years': years}
+        for metric in METRICS:
+            arrays[f'{metric}.history'] = matrices[metric]
+            arrays.update({f'{metric}.{key}': value for key, value in params[metric].items()})
+        for key, value in arrays.items():
+            np.save(os.path.join(staging, f'{key}.npy'), value)
+        os.rename(staging, os.path.join(fits, name))
+
+        manifest = {
+            'fit': name,
+            'source': os.path.abspath(source),
+            'source_sha256': file_sha256(source),
+            'series': int(len(countries)),
+            'years': [int(years[0]), int(years[-1])],
+            'models': {metric: {model: int((params[metric]['model'] == k).sum())
+                                for k, model in enumerate(MODELS)} for metric in METRICS},
+            'n_jobs': n_jobs,
+            'fit_seconds': round(fit_seconds, 3),
+            'wall_seconds': round(time.perf_counter() - started, 3),
+            'fitted_at': datetime.now(timezone.utc).isoformat(),
+        }
+        fd, tmp = tempfile.mkstemp(prefix='.manifest-', dir=self.root)
+        with os.fdopen(fd, 'w') as fh:
+            json.dump(manifest, fh, indent=2)
+        os.replace(tmp, self._manifest_path())
+        # Older fits are unreachable now; processes still mapping them keep their pages
+        current = self.read_manifest()['fit']
+        for old in os.listdir(fits):
+            if not old.startswith('.') and old < current:
+                shutil.rmtree(os.path.join(fits, old), ignore_errors=True)
+        self.reload()
+        return manifest
+
+    # -------------------------------------------------------------- loading
+    def reload(self):
+        self._manifest_mtime = None
+        self._checked_at = 0.0
+
+    def _load_fit(self, name):
+        base = os.path.join(self.root, FITS_DIR, name)
+        names = ['countries', 'crops', 'years'] + [f'{metric}.{key}' for metric in METRICS
+                                                   for key in ['history', *PARAMS]]
+        return {key: np.load(os.path.join(base, f'{key}.npy'), mmap_mode='r') for key in names}
+
+    def _source_sha256(self):
+        # Rehashed only when the source's size or mtime changes
+        stat = os.stat(self.source)
+        key = (stat.st_mtime_ns, stat.st_size)
+        if self._source_key != key:
+            self._source_digest = file_sha256(self.source)
+            self._source_key = key
+        return self._source_digest
+
+    def _ensure_loaded(self):
+        now = time.monotonic()
+        loaded = self._loaded
+        if loaded is not None and now - self._checked_at < self.reload_interval:
+            return loaded
+        with self._lock:
+            self._checked_at = time.monotonic()
+            try:
+                mtime = os.stat(self._manifest_path()).st_mtime_ns
+            except FileNotFoundError:
+                mtime = None
+            manifest = self.read_manifest() if mtime is not None else None
+            if manifest is None:
+                self._loaded = None
+                raise ForecastsNotAvailable('Forecasts have not been fitted; run "python manage.py fit_forecasts"')
+            try:
+                current = self._source_sha256()
+            except FileNotFoundError:
+                current = None
+            if manifest['source_sha256'] != current:
+                # Requests never refit; fit_forecasts publishes a fit for the new history
+                self._loaded = None
+                raise ForecastsNotAvailable(
+                    f'Forecasts are out of date with {self.source}; run "python manage.py fit_forecasts"')
+            if self._loaded is not None and mtime == self._manifest_mtime:
+                return self._loaded
+            fit = self._load_fit(manifest['fit'])
+            index = {key: row for row, key in enumerate(zip(fit['countries'].tolist(),
+                                                            fit['crops'].tolist()))}
+            self._loaded = fit, index
+            self._manifest_mtime = mtime
+            return self._loaded
+
+    def options(self):
+        """Sorted countries and crops that have a series."""
+        fit, _ = self._ensure_loaded()
+        return sorted(set(fit['countries'].tolist())), sorted(set(fit['crops'].tolist()))
+
+    def forecast(self, country, crop, years=5):
+        """History and the next ``years`` years of one series, or None if there is no such series."""
+        fit, index = self._ensure_loaded()
+        row = index.get((country, crop))
+        if row is None:
+            return None
+        history_years = fit['years'].tolist()
+        horizons = np.arange(1, years + 1)[None, :]
+        result = {'country': country, 'crop': crop, 'history': [], 'forecast': [],
+                  'models': {}, 'backtest_error': {}}
+        values, projected = {}, {}
+        for metric in METRICS:
+            params = {key: fit[f'{metric}.{key}'][row:row + 1] for key in PARAMS}
+            values[metric] = fit[f'{metric}.history'][row]
+            projected[metric] = project(params, horizons)[0]
+            result['models'][metric] = MODELS[int(params['model'][0])]
+            result['backtest_error'][metric] = _clean(params['error'][0], 4)
+        for i, year in enumerate(history_years):
+            if any(np.isfinite(values[metric][i]) for metric in METRICS):
+                result['history'].append({'year': year, **{m: _clean(values[m][i]) for m in METRICS}})
+        for i in range(years):
+            result['forecast'].append({'year': history_years[-1] + i + 1,
+                                       **{m: _clean(projected[m][i]) for m in METRICS}})
+        return result
+
+
+_forecaster = None
+_forecaster_lock = threading.Lock()
+
+
+def get_forecaster():
+    """Process-wide forecaster configured from settings."""
+    global _forecaster
+    if _forecaster is None:
+        with _forecaster_lock:
+            if _forecaster is None:
+                _forecaster = Forecaster(
+                    getattr(settings, 'FORECAST_DIR', settings.BASE_DIR / 'forecasts'),
+                    getattr(settings, 'FORECAST_SOURCE', settings.BASE_DIR.parent / 'data' / 'fao_data_cleaned.csv'),
+                    n_jobs=getattr(settings, 'FORECAST_N_JOBS', 1),
+                )
+    return _forecaster
@@ -0,0 +1,88 @@
+# core/history.py
+"""
+Keyset pagination of a user's prediction history.
+
+Rows are ordered newest first on ``(created_at, id)``, which the
+``agridata_user_created_id_idx`` index covers (``agridata_user_crop_created_idx``
+when filtering by crop), and a page continues from an
+opaque cursor holding the last row's key instead of an OFFSET. Fetching a
+page therefore reads only its own rows however long the history is. Only the
+columns the dashboard table shows are selected.
+"""
+import base64
+import binascii
+from datetime import datetime
+
+from django.db.models import Q
+
+from .models import AgriculturalData
+
+HISTORY_FIELDS = [
+    'id', 'crop', 'country', 'year', 'area_harvested_ha',
+    'predicted_production', 'predicted_yield', 'predicted_price', 'created_at',
+]
+MAX_PAGE_SIZE = 200
+
+
+class HistoryQueryError(ValueError):
+    """A malformed cursor or filter."""
+
+
+def encode_cursor(row):
+    key = f'{row["created_at"].isoformat()}|{row["id"]}'
+    return base64.urlsafe_b64encode(key.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, pk = base64.urlsafe_b64decode(padded).decode().rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HistoryQueryError('Invalid cursor')
+
+
+def _year(params, name):
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise HistoryQueryError(f'{name} must be an integer')
+
+
+def parse_filters(params):
+    """``crop``, ``country``, ``year_min`` and ``year_max`` from a query dict; blanks are ignored."""
+    filters = {}
+    if params.get('crop'):
+        filters['crop'] = params['crop'].strip()
+    if params.get('country'):
+        filters['country__iexact'] = params['country'].strip()
+    year_min, year_max = _year(params, 'year_min'), _year(params, 'year_max')
+    if year_min is not None:
+        filters['year__gte'] = year_min
+    if year_max is not None:
+        filters['year__lte'] = year_max
+    return filters
+
+
+def history_queryset(user, filters=None, cursor=None, limit=50):
+    """
+    The next ``limit + 1`` rows (as dicts) after ``cursor``; the extra row
+    only tells :func:`paginate` whether another page follows.
+    """
+    rows = AgriculturalData.objects.filter(user=user, **(filters or {}))
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        rows = rows.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+    return rows.order_by('-created_at', '-id').values(*HISTORY_FIELDS)[:limit + 1]
+
+
+def paginate(rows, limit):
+    """``(page, next_cursor)`` from the ``limit + 1`` rows fetched by :func:`history_queryset`."""
+    rows = list(rows)
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    return page, encode_cursor(page[-1])
@@ -0,0 +1,151 @@
+# core/importer.py
+"""
+Chunked import of spreadsheets of ``AgriculturalDataForm`` rows.
+
+Files shaped like ``data/enhanced_agricultural_data.csv`` (CSV, or Excel
+with the optional ``openpyxl`` package) are read ``chunk_rows`` rows at a
+time. Each chunk is validated and scored column-wise by :mod:`core.batch`
+and its valid rows are saved with ``bulk_create`` in one transaction, so
+memory use depends on the chunk size rather than the file size. Rejected rows
+are reported by their 0-based position among the file's data rows.
+"""
+import os
+import time
+
+import pandas as pd
+from django.conf import settings
+
+from .batch import build_instances, save_instances, validate_and_score
+
+FILE_FORMATS = {
+    '.csv': 'csv',
+    '.xlsx': 'xlsx',
+    '.xlsm': 'xlsx',
+}
+MAX_REPORTED_ERRORS = 100
+
+
+def excel_available():
+    try:
+        import openpyxl  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def file_format(name):
+    """``'csv'`` or ``'xlsx'`` from a file name; raises ``ValueError`` for anything else."""
+    extension = os.path.splitext(name)[1].lower()
+    if extension not in FILE_FORMATS:
+        raise ValueError(f'Unsupported file type {extension or name!r}; upload a CSV or Excel (.xlsx) file')
+    fmt = FILE_FORMATS[extension]
+    if fmt == 'xlsx' and not excel_available():
+        raise ValueError('Reading Excel files needs the optional openpyxl package')
+    return fmt
+
+
+def default_chunk_rows():
+    return getattr(settings, 'JOB_CHUNK_ROWS', 20000)
+
+
+def _excel_chunks(path, chunk_rows):
+    from openpyxl import load_workbook
+
+    # read_only streams rows from the sheet XML instead of building the workbook
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(name).strip() if name is not None else f'column_{i}'
+                   for i, name in enumerate(header)]
+        offset, buffer = 0, []
+        for row in rows:
+            if all(value is None for value in row):
+                continue
+            buffer.append(row)
+            if len(buffer) == chunk_rows:
+                yield pd.DataFrame(buffer, columns=columns, index=range(offset, offset + len(buffer)))
+                offset += len(buffer)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=columns, index=range(offset, offset + len(buffer)))
+    finally:
+        workbook.close()
+
+
+def read_chunks(path, chunk_rows=None, fmt=None):
+    """
+    Yield DataFrames of at most ``chunk_rows`` rows from ``path``.
+
+    The index keeps counting across chunks, so it is the row's position in
+    the file.
+    """
+    chunk_rows = chunk_rows or default_chunk_rows()
+    fmt = fmt or file_format(path)
+    if fmt == 'xlsx':
+        return _excel_chunks(path, chunk_rows)
+    return pd.read_csv(path, chunksize=chunk_rows)
+
+
+def count_rows(path, fmt=None):
+    """
+    Data rows in ``path``, for progress reporting.
+
+    CSV lines are counted without parsing (quoted newlines count twice); for
+    Excel the sheet's recorded dimensions are used, or 0 when it has none.
+    """
+    fmt = fmt or file_format(path)
+    if fmt == 'xlsx':
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(path, read_only=True)
+        try:
+            return max((workbook.worksheets[0].max_row or 1) - 1, 0)
+        finally:
+            workbook.close()
+    lines, last = 0, b'\n'
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(1 << 20), b''):
+            lines += block.count(b'\n')
+            last = block[-1:]
+    if last != b'\n':
+        lines += 1
+    return max(lines - 1, 0)
+
+
+def summarize(rows, imported, errors, rejected, seconds):
+    return {
+        'rows': rows,
+        'imported': imported,
+        'rejected': rejected,
+        'errors': errors[:MAX_REPORTED_ERRORS],
+        'seconds': round(seconds, 3),
+        'rows_per_second': round(rows / seconds, 1) if seconds else None,
+    }
+
+
+def import_file(user, path, chunk_rows=None, loaded=None, persist=True, progress=None):
+    """
+    Validate, score and save every row of ``path`` for ``user``.
+
+    ``progress(summary)`` is called after each chunk with the running totals.
+    Returns the final summary: rows read, imported and rejected, the first
+    rejected rows' errors, and the throughput in rows per second.
+    """
+    started = time.perf_counter()
+    rows = imported = rejected = 0
+    errors = []
+    for chunk in read_chunks(path, chunk_rows):
+        valid, outputs, chunk_errors = validate_and_score(chunk, loaded=loaded)
+        if persist and len(valid):
+            save_instances(build_instances(user, valid, outputs))
+        for error in chunk_errors[:MAX_REPORTED_ERRORS - len(errors)]:
+            errors.append({**error, 'row': int(chunk.index[error['row']])})
+        rows += len(chunk)
+        imported += len(valid)
+        rejected += len(chunk_errors)
+        if progress:
+            progress(summarize(rows, imported, errors, rejected, time.perf_counter() - started))
+    return summarize(rows, imported, errors, rejected, time.perf_counter() - started)
@@ -0,0 +1,244 @@
+# core/incremental.py
+"""
+Incremental retraining from the predictions users have saved since a model
+version was published.
+
+Every ``AgriculturalData`` row carries its own labels: production and price
+are inputs, and yield is production per hectare. :func:`train_incremental`
+reads only the rows after the base version's watermark. That is the row id
+recorded by the previous incremental run, or the version's creation time
+for a fully trained model. It reuses the base pipeline's fitted
+preprocessor and updates the model in one of two ways:
+
+``warm_start``
+    Grow the ensemble: ``new_estimators`` extra trees (random forest) or
+    boosting stages (gradient boosting) fitted on the new rows only.
+``reservoir``
+    Refit the model step on a uniform sample of at most ``reservoir_size``
+    rows of the training CSV and every row seen by incremental runs. Every
+    run updates the sample and stores it with its version as
+    ``reservoir.joblib``.
+
+``auto`` grows the ensemble until it would exceed ``max_estimators`` and
+then falls back to a reservoir refit, which resets it to the base size.
+Either way the cost depends on the new rows or the reservoir size, not on
+the full history. A fifth of the new rows is held out to compare the base
+and the updated model before anything is published.
+"""
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+from django.db.models import Max
+from sklearn.base import clone
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+from sklearn.model_selection import train_test_split
+
+from .features import FIELD_TO_COLUMN, INPUT_FIELDS
+from .models import AgriculturalData
+from .multitarget import TargetBundle
+from .registry import get_registry
+from .training import (RANDOM_STATE, TARGET_COLUMNS, features_and_targets, load_training_data,
+                       regression_metrics)
+
+STRATEGIES = ['auto', 'warm_start', 'reservoir']
+RESERVOIR_NAME = 'reservoir.joblib'
+DEFAULT_NEW_ESTIMATORS = 20
+DEFAULT_MAX_ESTIMATORS = 300
+DEFAULT_RESERVOIR_SIZE = 50000
+DEFAULT_MIN_ROWS = 200
+HOLDOUT_SIZE = 0.2
+# Base metadata carried over to the new version unchanged
+INHERITED_METADATA = ['targets', 'target_column', 'target_columns', 'model_type', 'best_params',
+                      'data_path', 'data_sha256']
+
+
+class IncrementalTrainingError(ValueError):
+    """The base version cannot be updated, or there is too little new data."""
+
+
+def new_rows(metadata):
+    """``AgriculturalData`` rows a model with ``metadata`` has not been trained on."""
+    rows = AgriculturalData.objects.all()
+    if metadata.get('rows_through_pk') is not None:
+        return rows.filter(pk__gt=metadata['rows_through_pk'])
+    if metadata.get('created_at'):
+        return rows.filter(created_at__gt=datetime.fromisoformat(metadata['created_at']))
+    return rows
+
+
+def labelled_rows(queryset, targets):
+    """Features and targets of ``queryset``, cleaned like the training CSV."""
+    frame = pd.DataFrame.from_records(list(queryset.values_list(*INPUT_FIELDS)),
+                                      columns=[FIELD_TO_COLUMN[f] for f in INPUT_FIELDS])
+    area = frame['Area_harvested_ha'].to_numpy(dtype=np.float64)
+    production = frame['Production_tonnes'].to_numpy(dtype=np.float64)
+    yield_ = np.full_like(area, np.nan)
+    np.divide(production * 1000.0, area, out=yield_, where=area > 0)  # tonnes/ha -> kg/ha
+    frame[TARGET_COLUMNS['yield']] = yield_
+    return features_and_targets(frame, targets)
+
+
+def _ensemble(model):
+    """The fitted tree ensembles of a pipeline's model step, one per target."""
+    estimators = model.estimators_ if isinstance(model, TargetBundle) else [model]
+    for estimator in estimators:
+        if not isinstance(estimator, (RandomForestRegressor, GradientBoostingRegressor)):
+            raise IncrementalTrainingError(
+                f'{type(estimator).__name__} models cannot be updated incrementally')
+    return estimators
+
+
+def _columns(model, X):
+    if isinstance(model, TargetBundle):
+        return [X[:, columns] for columns in model.columns_]
+    return [X]
+
+
+def grow(model, X, y, new_estimators):
+    """Add ``new_estimators`` trees or stages per target, fitted on ``X``/``y`` only."""
+    y = y[:, None] if y.ndim == 1 else y
+    for j, (estimator, X_j) in enumerate(zip(_ensemble(model), _columns(model, X))):
+        estimator.set_params(warm_start=True, n_estimators=estimator.n_estimators + new_estimators)
+        estimator.fit(X_j, y[:, j])
+        estimator.set_params(warm_start=False)
+    return model
+
+
+def refit(model, X, y, n_estimators):
+    """A fresh copy of ``model`` with ``n_estimators`` per target, fitted on ``X``/``y``."""
+    fresh = clone(model)
+    name = 'estimator__n_estimators' if isinstance(model, TargetBundle) else 'n_estimators'
+    fresh.set_params(**{name: n_estimators})
+    return fresh.fit(X, y)
+
+
+def update_reservoir(reservoir, X, y, size, seed=RANDOM_STATE):
+    """
+    Add ``X``/``y`` to a uniform sample of at most ``size`` rows (algorithm R,
+    vectorised). ``reservoir`` is ``{'X', 'y', 'seen'}`` or None to start one.
+    """
+    if reservoir is None:
+        reservoir = {'X': X.iloc[:0], 'y': y[:0], 'seen': 0}
+    sample_X, sample_y, seen = reservoir['X'], reservoir['y'], reservoir['seen']
+    fill = max(min(size - len(sample_X), len(X)), 0)
+    if fill:
+        sample_X = pd.concat([sample_X, X.iloc[:fill]], ignore_index=True)
+        sample_y = np.concatenate([sample_y, y[:fill]])
+    else:
+        sample_X, sample_y = sample_X.copy(), sample_y.copy()
+    rest = np.arange(fill, len(X))
+    if len(rest):
+        # Row number i of the whole stream replaces a random slot with probability size / (i + 1)
+        slots = np.random.default_rng(seed + seen).integers(0, seen + rest + 1)
+        keep = slots < size
+        rows, slots = rest[keep], slots[keep]
+        # When two new rows draw the same slot the later one wins, as it would sequentially
+        _, last = np.unique(slots[::-1], return_index=True)
+        rows, slots = rows[::-1][last], slots[::-1][last]
+        for column in sample_X.columns:
+            values = sample_X[column].to_numpy(copy=True)
+            values[slots] = X[column].to_numpy()[rows]
+            sample_X[column] = values
+        sample_y[slots] = y[rows]
+    return {'X': sample_X, 'y': sample_y, 'seen': seen + len(X)}
+
+
+def _seed_reservoir(metadata, targets, size, log):
+    # First reservoir refit after a full training run: sample its training CSV once
+    if metadata.get('data_path'):
+        log(f'Seeding the reservoir from {metadata["data_path"]}')
+        X, y = load_training_data(metadata['data_path'], targets)
+        order = np.random.default_rng(RANDOM_STATE).permutation(len(X))
+        return update_reservoir(None, X.iloc[order].reset_index(drop=True), y[order], size)
+    return None
+
+
+def _evaluate(pipeline, X, y, targets):
+    predicted = pipeline.predict(X)
+    if len(targets) == 1:
+        return regression_metrics(y, np.ravel(predicted))
+    return {t: regression_metrics(y[:, j], predicted[:, j]) for j, t in enumerate(targets)}
+
+
+def train_incremental(base_version=None, strategy='auto', new_estimators=DEFAULT_NEW_ESTIMATORS,
+                      max_estimators=DEFAULT_MAX_ESTIMATORS, reservoir_size=DEFAULT_RESERVOIR_SIZE,
+                      min_rows=DEFAULT_MIN_ROWS, log=print):
+    """
+    Update ``base_version`` (default: the active one) with the rows saved since.
+
+    Returns ``(pipeline, metadata, attachments)`` ready for
+    ``ModelRegistry.publish``; ``metadata['rows_through_pk']`` is the
+    watermark the next incremental run starts after.
+    """
+    if strategy not in STRATEGIES:
+        raise IncrementalTrainingError(f'Unknown strategy {strategy!r}')
+    started = time.perf_counter()
+    registry = get_registry()
+    base_version = base_version or registry.get().version
+    base_metadata = registry.read_metadata(base_version)
+    if base_metadata.get('compiled_from'):
+        raise IncrementalTrainingError(
+            f'{base_version} is a compiled model; update {base_metadata["compiled_from"]} and compile the result')
+    targets = list(base_metadata.get('targets') or ['yield'])
+    pipeline = registry.read_estimator(base_version)
+    model = pipeline.named_steps['model']
+    ensemble = _ensemble(model)
+
+    rows = new_rows(base_metadata)
+    through = rows.aggregate(last=Max('pk'))['last']
+    if through is None:
+        raise IncrementalTrainingError(f'No rows saved since {base_version}')
+    X, y = labelled_rows(rows.filter(pk__lte=through), targets)
+    if len(X) < min_rows:
+        raise IncrementalTrainingError(f'Only {len(X)} usable new rows since {base_version} (need {min_rows})')
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=HOLDOUT_SIZE, random_state=RANDOM_STATE)
+    log(f'{len(X)} new rows since {base_version} ({len(X_train)} train / {len(X_test)} holdout)')
+    base_holdout = _evaluate(pipeline, X_test, y_test, targets)
+
+    # The preprocessor stays as fitted on the base version's data
+    transformed = pipeline.named_steps['preprocessor'].transform(X_train)
+    current = max(estimator.n_estimators for estimator in ensemble)
+    if strategy == 'auto':
+        strategy = 'warm_start' if current + new_estimators <= max_estimators else 'reservoir'
+    # Kept up to date on every run so a later reservoir refit sees all the data
+    reservoir = registry.read_attachment(base_version, RESERVOIR_NAME)
+    if reservoir is None:
+        reservoir = _seed_reservoir(base_metadata, targets, reservoir_size, log)
+    reservoir = update_reservoir(reservoir, X_train.reset_index(drop=True), y_train, reservoir_size)
+
+    fit_started = time.perf_counter()
+    if strategy == 'warm_start':
+        log(f'Growing {current} -> {current + new_estimators} estimators per target')
+        grow(model, transformed, y_train, new_estimators)
+    else:
+        n_estimators = base_metadata.get('best_params', {}).get('model__n_estimators') or current
+        log(f'Refitting {n_estimators} estimators per target on a {len(reservoir["X"])}-row reservoir '
+            f'({reservoir["seen"]} rows seen)')
+        model = refit(model, pipeline.named_steps['preprocessor'].transform(reservoir['X']),
+                      reservoir['y'], n_estimators)
+        pipeline.steps[-1] = ('model', model)
+    fit_seconds = time.perf_counter() - fit_started
+
+    metadata = {key: base_metadata[key] for key in INHERITED_METADATA if key in base_metadata}
+    metadata.update({
+        'test_metrics': _evaluate(pipeline, X_test, y_test, targets),
+        'base_test_metrics': base_holdout,
+        'training_rows': int(len(X_train)),
+        'test_rows': int(len(X_test)),
+        'rows_through_pk': int(through),
+        'incremental': {
+            'base_version': base_version,
+            'strategy': strategy,
+            'new_rows': int(len(X)),
+            'n_estimators': max(e.n_estimators for e in _ensemble(model)),
+            'reservoir_rows': int(len(reservoir['X'])),
+            'reservoir_seen': int(reservoir['seen']),
+            'fit_seconds': round(fit_seconds, 3),
+        },
+        'wall_seconds': round(time.perf_counter() - started, 3),
+        'trained_at': datetime.now(timezone.utc).isoformat(),
+    })
+    return pipeline, metadata, {RESERVOIR_NAME: reservoir}
@@ -0,0 +1,66 @@
+# core/inference.py
+"""
+Scoring helpers shared by the predict view and batch paths.
+
+The trained pipeline predicts ``Yield_kg_per_ha`` unless its registry
+metadata lists other ``targets`` (``train_model --targets`` fits one model
+per target behind a shared preprocessor, returned as one column each); any
+of production/yield/price the model does not output is derived from the
+ones it does.
+"""
+import numpy as np
+
+from .features import build_features
+from .registry import get_registry
+
+TARGETS = ('production', 'yield', 'price')
+DEFAULT_MODEL_TARGETS = ['yield']
+
+
+def model_targets(loaded):
+    return list(loaded.metadata.get('targets') or DEFAULT_MODEL_TARGETS)
+
+
+def complete_targets(outputs, features):
+    """Fill in the targets the model did not predict directly."""
+    area = features['Area_harvested_ha'].to_numpy(dtype=np.float64)
+    if 'yield' in outputs and 'production' not in outputs:
+        # kg/ha * ha -> tonnes
+        outputs['production'] = outputs['yield'] * area / 1000.0
+    elif 'production' in outputs and 'yield' not in outputs:
+        outputs['yield'] = np.divide(
+            outputs['production'] * 1000.0, area,
+            out=np.zeros_like(area), where=area > 0,
+        )
+    if 'price' not in outputs:
+        price = features['Price_USD_per_tonne'].to_numpy(dtype=np.float64)
+        gap = features['Demand_Supply_Gap'].to_numpy(dtype=np.float64)
+        outputs['price'] = price * (1 + gap / 100)
+    return outputs
+
+
+def predict_features(features, loaded=None):
+    """Run one ``predict`` call over a feature block; returns target -> array."""
+    loaded = loaded or get_registry().get()
+    raw = np.asarray(loaded.estimator.predict(features), dtype=np.float64)
+    if raw.ndim == 1:
+        raw = raw[:, None]
+    outputs = {name: raw[:, i] for i, name in enumerate(model_targets(loaded))}
+    return complete_targets(outputs, features)
+
+
+def score(rows, loaded=None):
+    """Build features for ``rows`` and score them in a single model call."""
+    return predict_features(build_features(rows), loaded=loaded)
+
+
+def apply_predictions(instances, outputs):
+    """Copy scored targets onto ``AgriculturalData`` instances (no save)."""
+    production = outputs['production'].tolist()
+    yield_ = outputs['yield'].tolist()
+    price = outputs['price'].tolist()
+    for i, instance in enumerate(instances):
+        instance.predicted_production = production[i]
+        instance.predicted_yield = yield_[i]
+        instance.predicted_price = price[i]
+    return instances
@@ -0,0 +1,159 @@
+# core/instrumentation.py
+"""
+Per-request performance accounting.
+
+``PerformanceMiddleware`` (core/middleware.py) opens a :class:`RequestMetrics`
+in a context variable for each request. Database time is collected by an
+execute wrapper installed on every connection, template time by wrapping the
+Django template backend's ``render``, and inference time by the
+:func:`timed` blocks in the scoring paths. Context variables follow the
+request into ``sync_to_async`` threads, so async views are covered too.
+"""
+import contextvars
+import functools
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.db.backends.signals import connection_created
+
+from .metrics import LabeledCounter, LabeledHistogram
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+QUERY_BUCKETS = [0, 1, 2, 5, 10, 20, 50, 100, 200, 500]
+
+REQUEST_SECONDS = LabeledHistogram(
+    'agri_request_duration_seconds', LATENCY_BUCKETS, ['view'],
+    'Wall time per view')
+DB_SECONDS = LabeledHistogram(
+    'agri_db_duration_seconds', LATENCY_BUCKETS, ['view'],
+    'Database time per request')
+DB_QUERIES = LabeledHistogram(
+    'agri_db_queries', QUERY_BUCKETS, ['view'],
+    'Database queries per request')
+TEMPLATE_SECONDS = LabeledHistogram(
+    'agri_template_duration_seconds', LATENCY_BUCKETS, ['view'],
+    'Template render time per request')
+INFERENCE_SECONDS = LabeledHistogram(
+    'agri_inference_duration_seconds', LATENCY_BUCKETS, ['view'],
+    'Model inference time per request')
+N_PLUS_ONE = LabeledCounter(
+    'agri_n_plus_one_total', ['view'],
+    'Requests that repeated the same SELECT at least N_PLUS_ONE_THRESHOLD times')
+
+REQUEST_METRICS = [REQUEST_SECONDS, DB_SECONDS, DB_QUERIES, TEMPLATE_SECONDS,
+                   INFERENCE_SECONDS, N_PLUS_ONE]
+
+
+class RequestMetrics:
+    __slots__ = ('started', 'view', 'db_seconds', 'db_queries', 'template_seconds',
+                 'inference_seconds', 'statements', '_template_depth')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view = None
+        self.db_seconds = 0.0
+        self.db_queries = 0
+        self.template_seconds = 0.0
+        self.inference_seconds = 0.0
+        self.statements = Counter()
+        self._template_depth = 0
+
+    def repeated_select(self, threshold):
+        """``(sql, count)`` of the most repeated SELECT if it reaches ``threshold``."""
+        if not self.statements:
+            return None
+        sql, count = self.statements.most_common(1)[0]
+        return (sql, count) if count >= threshold else None
+
+
+def current():
+    return _current.get()
+
+
+def begin():
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def end(token):
+    _current.reset(token)
+
+
+@contextmanager
+def timed(section):
+    """Add the block's duration to ``<section>_seconds`` of the current request, if any."""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        attr = f'{section}_seconds'
+        setattr(metrics, attr, getattr(metrics, attr) + time.perf_counter() - started)
+
+
+# ------------------------------------------------------------------ database
+def _execute_wrapper(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_seconds += time.perf_counter() - started
+        metrics.db_queries += 1
+        if sql.lstrip()[:6].upper() == 'SELECT':
+            # Parameters are passed separately, so equal SQL means the same query shape
+            metrics.statements[sql] += 1
+
+
+def _install_wrapper(connection):
+    if _execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_execute_wrapper)
+
+
+def _on_connection_created(sender, connection, **kwargs):
+    _install_wrapper(connection)
+
+
+# ------------------------------------------------------------------ templates
+def _wrap_template_render(render):
+    @functools.wraps(render)
+    def wrapper(self, *args, **kwargs):
+        metrics = _current.get()
+        if metrics is None or metrics._template_depth:
+            return render(self, *args, **kwargs)
+        metrics._template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            metrics._template_depth -= 1
+            metrics.template_seconds += time.perf_counter() - started
+    wrapper._instrumented = True
+    return wrapper
+
+
+_installed = False
+
+
+def install():
+    """Hook database and template timing (idempotent)."""
+    global _installed
+    if _installed:
+        return
+    from django.db import connections
+    from django.template.backends.django import Template
+
+    connection_created.connect(_on_connection_created, dispatch_uid='core.instrumentation')
+    for connection in connections.all(initialized_only=True):
+        _install_wrapper(connection)
+    if not getattr(Template.render, '_instrumented', False):
+        Template.render = _wrap_template_render(Template.render)
+    _installed = True
@@ -0,0 +1,36 @@
+# core/job_tasks.py
+"""
+Functions executed in the job worker's process pool.
+
+Pool processes are started with ``spawn``, so this module must be
+importable before Django is set up: everything Django-related is imported
+inside the functions, after :func:`init_worker` has run.
+"""
+import os
+
+_models = {}
+
+
+def init_worker(settings_module):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+
+def _loaded(version):
+    # Each pool process loads (memory-maps) the job's pinned version once
+    if version not in _models:
+        from .registry import get_registry
+        _models[version] = get_registry().load(version)
+    return _models[version]
+
+
+def score_chunk(chunk, version, offset):
+    """Validate and score one chunk of uploaded rows; rejected row numbers are file-relative."""
+    from .batch import score_frame, validate_frame
+
+    valid, errors = validate_frame(chunk)
+    for error in errors:
+        error['row'] += offset
+    outputs = score_frame(valid, loaded=_loaded(version)) if len(valid) else None
+    return valid, outputs, errors
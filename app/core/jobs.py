@@ -0,0 +1,452 @@
+# core/jobs.py
+"""
+Database-backed background jobs.
+
+Views :func:`submit` a :class:`~core.models.Job`; ``python manage.py
+run_jobs`` claims queued jobs with a conditional UPDATE (so several workers
+can share one database without a broker), runs them and stores the result
+as a file under ``JOB_RESULTS_DIR/<job id>/`` for download.
+
+Batch predictions and imports are read in chunks and scored by a process
+pool. Each finished chunk's rows and chunk number are saved in one
+transaction (batch predictions also write the chunk to its own part file). A job whose worker dies stops
+heart-beating, is claimed again after ``JOB_STALE_SECONDS`` and continues
+with the chunks that are not recorded yet. Exports and training are short
+enough to simply start over.
+"""
+import gzip
+import json
+import logging
+import os
+import shutil
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import timedelta
+from multiprocessing import get_context
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import job_tasks
+from .batch import build_instances, save_instances
+from .exporters import EXPORTERS, gzip_stream
+from .importer import MAX_REPORTED_ERRORS, count_rows, file_format, read_chunks, summarize
+from .inference import TARGETS
+from .models import AgriculturalData, Job
+from .registry import get_registry
+
+logger = logging.getLogger(__name__)
+
+JOB_HANDLERS = {}
+
+
+def job_handler(kind):
+    def register(fn):
+        JOB_HANDLERS[kind] = fn
+        return fn
+    return register
+
+
+class LostOwnership(RuntimeError):
+    """The job was reclaimed by another worker (e.g. after a missed heartbeat)."""
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def results_root():
+    return str(_setting('JOB_RESULTS_DIR', settings.BASE_DIR / 'jobs'))
+
+
+def job_dir(job):
+    return os.path.join(results_root(), str(job.pk))
+
+
+def result_path(job):
+    return os.path.join(job_dir(job), job.result_file) if job.result_file else None
+
+
+def _atomic_write(path, chunks):
+    tmp = f'{path}.tmp'
+    with open(tmp, 'wb') as fh:
+        for chunk in chunks:
+            fh.write(chunk)
+    os.replace(tmp, path)
+
+
+# ---------------------------------------------------------------- submitting
+def submit(user, kind, params=None, upload=None):
+    """
+    Queue a job; ``upload`` (an uploaded CSV or Excel file) is stored as the
+    job's ``input.csv`` or ``input.xlsx``.
+    """
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f'Unknown job kind {kind!r}')
+    params = dict(params or {})
+    if upload is not None:
+        params['input_file'] = f'input.{file_format(upload.name)}'
+    # The row only becomes visible to workers once the input file is in place
+    with transaction.atomic():
+        job = Job.objects.create(user=user, kind=kind, params=params)
+        os.makedirs(job_dir(job), exist_ok=True)
+        if upload is not None:
+            _atomic_write(os.path.join(job_dir(job), params['input_file']), upload.chunks())
+    return job
+
+
+def describe(job):
+    return {
+        'id': job.pk,
+        'kind': job.kind,
+        'status': job.status,
+        'progress_done': job.progress_done,
+        'progress_total': job.progress_total,
+        'progress_percent': job.progress_percent,
+        'result': job.result,
+        'error': job.error,
+        'created_at': job.created_at,
+        'finished_at': job.finished_at,
+        'download': bool(job.result_file) and job.status == 'done',
+    }
+
+
+# ------------------------------------------------------------------ claiming
+def _claimable():
+    stale = timezone.now() - timedelta(seconds=_setting('JOB_STALE_SECONDS', 120))
+    return Q(status='queued') | Q(status='running', heartbeat_at__lt=stale)
+
+
+def claim_next(worker_id, kinds=None):
+    """Atomically take the oldest queued (or abandoned) job, or return None."""
+    candidates = Job.objects.filter(_claimable())
+    if kinds:
+        candidates = candidates.filter(kind__in=kinds)
+    max_attempts = _setting('JOB_MAX_ATTEMPTS', 3)
+    for pk in candidates.order_by('created_at').values_list('pk', flat=True)[:20]:
+        now = timezone.now()
+        claimed = Job.objects.filter(_claimable(), pk=pk).update(
+            status='running', worker=worker_id, heartbeat_at=now, attempts=F('attempts') + 1)
+        if not claimed:
+            continue  # another worker got there first
+        job = Job.objects.get(pk=pk)
+        if job.attempts > max_attempts:
+            _finish(job, 'failed', error=f'Gave up after {max_attempts} attempts')
+            continue
+        if job.started_at is None:
+            Job.objects.filter(pk=pk).update(started_at=now)
+        return job
+    return None
+
+
+class Heartbeat(threading.Thread):
+    """Keeps ``heartbeat_at`` fresh while a job runs so it is not reclaimed."""
+
+    def __init__(self, job, interval):
+        super().__init__(name=f'job-{job.pk}-heartbeat', daemon=True)
+        self.job = job
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self.stopped.wait(self.interval):
+                try:
+                    Job.objects.filter(pk=self.job.pk, worker=self.job.worker).update(
+                        heartbeat_at=timezone.now())
+                except OperationalError as exc:
+                    logger.warning('Heartbeat for job %s failed: %s', self.job.pk, exc)
+        finally:
+            connection.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+# ------------------------------------------------------------------- running
+class JobContext:
+    def __init__(self, job, processes=1):
+        self.job = job
+        self.processes = processes
+        self.dir = job_dir(job)
+        os.makedirs(self.dir, exist_ok=True)
+
+    def path(self, name):
+        return os.path.join(self.dir, name)
+
+    def progress(self, done, total=None):
+        fields = {'progress_done': done, 'heartbeat_at': timezone.now()}
+        if total is not None:
+            fields['progress_total'] = total
+            self.job.progress_total = total
+        self.job.progress_done = done
+        _update_owned(self.job, **fields)
+
+    def save_params(self):
+        _update_owned(self.job, params=self.job.params)
+
+
+def _update_owned(job, **fields):
+    """Update the job's row only while this worker still owns it, else raise LostOwnership."""
+    if not Job.objects.filter(pk=job.pk, worker=job.worker).update(**fields):
+        raise LostOwnership(f'Job {job.pk} was claimed by another worker')
+
+
+def _finish(job, status, result=None, result_file='', error=''):
+    """Record the outcome; returns False (recording nothing) if another worker owns the job."""
+    try:
+        _update_owned(job, status=status, result=result or {}, result_file=result_file, error=error,
+                      finished_at=timezone.now(), heartbeat_at=timezone.now())
+    except LostOwnership as exc:
+        logger.warning('%s; discarding its %s outcome', exc, status)
+        return False
+    return True
+
+
+def worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def run_job(job, processes=1):
+    """Run a claimed job to completion and record its outcome."""
+    heartbeat = Heartbeat(job, _setting('JOB_HEARTBEAT_SECONDS', 10))
+    heartbeat.start()
+    try:
+        result, result_file = JOB_HANDLERS[job.kind](JobContext(job, processes))
+    except LostOwnership as exc:
+        # The new owner carries on from the chunks recorded so far
+        logger.warning('%s; stopping', exc)
+    except KeyboardInterrupt:
+        # Hand the job back; completed chunks are kept for the next worker
+        Job.objects.filter(pk=job.pk, worker=job.worker).update(status='queued', worker='')
+        raise
+    except Exception:
+        logger.exception('Job %s failed', job.pk)
+        _finish(job, 'failed', error=traceback.format_exc(limit=5))
+    else:
+        _finish(job, 'done', result=result, result_file=result_file)
+    finally:
+        heartbeat.stop()
+    job.refresh_from_db()
+    return job
+
+
+# ------------------------------------------------------------------ handlers
+def _part_name(index):
+    return f'part-{index:05d}.csv'
+
+
+def _errors_name(index):
+    return f'errors-{index:05d}.json'
+
+
+def _pinned_version(ctx):
+    params = ctx.job.params
+    if 'model_version' not in params:
+        # Pin the version so a resumed job scores every chunk with the same model
+        params['model_version'] = get_registry().get().version
+        ctx.save_params()
+    return params['model_version']
+
+
+def _score_chunks(ctx, input_path, chunk_rows, version, completed, record):
+    """
+    Score the chunks of ``input_path`` not in ``completed`` in a process pool,
+    passing each result to ``record(index, offset, result)`` in this process.
+    Returns the number of chunks in the file.
+    """
+    n_chunks = 0
+    in_flight = {}
+    pool = ProcessPoolExecutor(
+        max_workers=ctx.processes, mp_context=get_context('spawn'),
+        initializer=job_tasks.init_worker, initargs=(os.environ['DJANGO_SETTINGS_MODULE'],))
+    try:
+        for index, chunk in enumerate(read_chunks(input_path, chunk_rows)):
+            n_chunks = index + 1
+            if index in completed:
+                continue
+            offset = index * chunk_rows
+            future = pool.submit(job_tasks.score_chunk, chunk, version, offset)
+            in_flight[future] = (index, offset)
+            # Bound the chunks held in memory while the pool is busy
+            if len(in_flight) >= 2 * ctx.processes:
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    record(*in_flight.pop(future), future.result())
+        for future in list(in_flight):
+            record(*in_flight.pop(future), future.result())
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+    return n_chunks
+
+
+def _complete_chunk(job, completed, index):
+    # Inside the chunk's transaction, so a worker that lost the job rolls its rows back
+    _update_owned(job, completed_chunks=sorted(completed | {index}))
+    completed.add(index)
+    job.completed_chunks = sorted(completed)
+
+
+def _chunk_errors(ctx, n_chunks):
+    """``(rows, rejected, first errors)`` from the per-chunk error files."""
+    rows = rejected = 0
+    errors = []
+    for index in range(n_chunks):
+        with open(ctx.path(_errors_name(index))) as fh:
+            summary = json.load(fh)
+        rows += summary['rows']
+        rejected += len(summary['errors'])
+        errors.extend(summary['errors'][:MAX_REPORTED_ERRORS - len(errors)])
+    return rows, rejected, errors
+
+
+@job_handler('batch_predict')
+def run_batch_predict(ctx):
+    job, params = ctx.job, ctx.job.params
+    version = _pinned_version(ctx)
+    persist = params.get('persist', True)
+    chunk_rows = params.get('chunk_rows') or _setting('JOB_CHUNK_ROWS', 20000)
+
+    input_path = ctx.path(params.get('input_file', 'input.csv'))
+    rows = count_rows(input_path)
+    completed = set(job.completed_chunks)
+    ctx.progress(min(len(completed) * chunk_rows, rows), rows)
+
+    def record(index, offset, result):
+        valid, outputs, errors = result
+        frame = valid.copy()
+        # read_chunks keeps counting the index across chunks, so it is the file row
+        frame.insert(0, 'row', frame.index.to_numpy())
+        for name in TARGETS:
+            frame[f'predicted_{name}'] = outputs[name] if outputs is not None else []
+        _atomic_write(ctx.path(_part_name(index)), [frame.to_csv(index=False).encode()])
+        with open(ctx.path(_errors_name(index)), 'w') as fh:
+            json.dump({'rows': len(valid) + len(errors), 'errors': errors}, fh)
+        with transaction.atomic():
+            if persist and len(valid):
+                save_instances(build_instances(job.user, valid, outputs))
+            _complete_chunk(job, completed, index)
+        ctx.progress(min(len(completed) * chunk_rows, rows))
+
+    n_chunks = _score_chunks(ctx, input_path, chunk_rows, version, completed, record)
+
+    # Stitch the parts together in row order
+    result_file = 'predictions.csv.gz'
+    with gzip.open(ctx.path(result_file + '.tmp'), 'wb') as out:
+        for index in range(n_chunks):
+            with open(ctx.path(_part_name(index)), 'rb') as part:
+                if index:
+                    part.readline()  # header
+                shutil.copyfileobj(part, out)
+    os.replace(ctx.path(result_file + '.tmp'), ctx.path(result_file))
+    total, rejected, errors = _chunk_errors(ctx, n_chunks)
+    ctx.progress(rows)
+    return {
+        'rows': total, 'scored': total - rejected, 'rejected': rejected, 'errors': errors,
+        'model_version': version, 'persisted': persist,
+    }, result_file
+
+
+@job_handler('import')
+def run_import(ctx):
+    """Save every valid row of the upload, with predictions, to the user's history."""
+    job, params = ctx.job, ctx.job.params
+    version = _pinned_version(ctx)
+    chunk_rows = params.get('chunk_rows') or _setting('JOB_CHUNK_ROWS', 20000)
+
+    input_path = ctx.path(params['input_file'])
+    rows = count_rows(input_path)
+    completed = set(job.completed_chunks)
+    ctx.progress(min(len(completed) * chunk_rows, rows), rows)
+    started = time.perf_counter()
+    scored = 0
+
+    def record(index, offset, result):
+        nonlocal scored
+        valid, outputs, errors = result
+        with open(ctx.path(_errors_name(index)), 'w') as fh:
+            json.dump({'rows': len(valid) + len(errors), 'errors': errors}, fh)
+        with transaction.atomic():
+            if len(valid):
+                save_instances(build_instances(job.user, valid, outputs))
+            _complete_chunk(job, completed, index)
+        scored += len(valid) + len(errors)
+        ctx.progress(min(len(completed) * chunk_rows, rows))
+
+    n_chunks = _score_chunks(ctx, input_path, chunk_rows, version, completed, record)
+    total, rejected, errors = _chunk_errors(ctx, n_chunks)
+    ctx.progress(rows)
+    # Throughput covers this attempt only; a resumed job skips finished chunks
+    summary = summarize(total, total - rejected, errors, rejected, time.perf_counter() - started)
+    summary['rows_per_second'] = round(scored / summary['seconds'], 1) if summary['seconds'] else None
+    return {**summary, 'model_version': version}, ''
+
+
+@job_handler('export')
+def run_export(ctx):
+    fmt = ctx.job.params.get('format', 'csv')
+    if fmt not in EXPORTERS:
+        raise ValueError(f'Unknown export format {fmt!r}')
+    stream, _content_type, extension = EXPORTERS[fmt]
+    chunk_size = _setting('EXPORT_CHUNK_SIZE', 2000)
+    queryset = AgriculturalData.objects.filter(user=ctx.job.user).order_by('-created_at', '-id')
+    total = queryset.count()
+    ctx.progress(0, total)
+
+    def tracked(chunks):
+        # Every chunk after the first (header) covers up to chunk_size rows
+        done = 0
+        for i, data in enumerate(chunks):
+            yield data
+            if i and done < total:
+                done = min(done + chunk_size, total)
+                ctx.progress(done)
+
+    chunks = tracked(stream(queryset, chunk_size=chunk_size))
+    result_file = f'agricultural_predictions.{extension}'
+    if ctx.job.params.get('gzip'):
+        chunks = gzip_stream(chunks)
+        result_file += '.gz'
+    _atomic_write(ctx.path(result_file), chunks)
+    ctx.progress(total)
+    return {'rows': total, 'format': fmt}, result_file
+
+
+@job_handler('train')
+def run_training(ctx):
+    from .incremental import train_incremental
+    from .training import train
+
+    params = ctx.job.params
+    ctx.progress(0, 1)
+    attachments = {}
+    if params.get('incremental'):
+        # Only the predictions saved since the base version are read
+        pipeline, metadata, attachments = train_incremental(
+            params.get('base_version'), strategy=params.get('strategy', 'auto'), log=logger.info)
+    else:
+        pipeline, metadata = train(
+            params.get('data_path') or str(settings.TRAINING_DATA_PATH),
+            n_jobs=ctx.processes,
+            quick=params.get('quick', True),
+            targets=params.get('targets') or ['yield'],
+            log=logger.info,
+        )
+    activate = params.get('activate', False)
+    version = get_registry().publish(pipeline, metadata, activate=activate, attachments=attachments)
+    metadata['version'] = version
+    result_file = 'metadata.json'
+    _atomic_write(ctx.path(result_file), [json.dumps(metadata, indent=2, default=str).encode()])
+    ctx.progress(1)
+    result = {'version': version, 'active': activate, 'test_metrics': metadata['test_metrics']}
+    if not activate:
+        result['note'] = f'Not serving yet: run "python manage.py model_registry --activate {version}"'
+    if 'incremental' in metadata:
+        result['incremental'] = metadata['incremental']
+    return result, result_file
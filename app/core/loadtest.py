@@ -0,0 +1,125 @@
+# core/loadtest.py
+"""
+Closed-loop HTTP load generator for comparing deployments (WSGI vs ASGI).
+
+Each simulated client is an asyncio connection speaking HTTP/1.1 with
+``Connection: close`` and issuing its next request as soon as the previous
+one finishes, so hundreds of clients fit in one process without extra
+dependencies. *Slow* clients send every request in pieces spread over
+``slow_seconds``, like a phone on a poor link: a threaded WSGI server keeps a
+worker thread busy for the whole upload, an ASGI server only a coroutine.
+Latencies of normal and slow clients are summarised separately with
+:func:`core.benchmarks.summarize`.
+"""
+import asyncio
+import time
+from collections import Counter
+from dataclasses import dataclass
+from importlib import import_module
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.utils.crypto import get_random_string
+
+from .benchmarks import summarize
+
+SLOW_PIECES = 8
+
+
+@dataclass
+class Target:
+    name: str
+    path: str
+    method: str = 'GET'
+    body: bytes = b''
+    content_type: str = ''
+
+
+def login_headers(user):
+    """Session and CSRF headers that authenticate as ``user`` against a server on the same database."""
+    session = import_module(settings.SESSION_ENGINE).SessionStore()
+    session[SESSION_KEY] = str(user.pk)
+    session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.save()
+    csrf = get_random_string(32)
+    return {
+        'Cookie': f'{settings.SESSION_COOKIE_NAME}={session.session_key}; '
+                  f'{settings.CSRF_COOKIE_NAME}={csrf}',
+        'X-CSRFToken': csrf,
+    }
+
+
+def _encode(host, target, headers):
+    lines = [f'{target.method} {target.path} HTTP/1.1', f'Host: {host}', 'Connection: close']
+    lines += [f'{name}: {value}' for name, value in headers.items()]
+    if target.body:
+        lines += [f'Content-Type: {target.content_type}', f'Content-Length: {len(target.body)}']
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode() + target.body
+
+
+async def request(host, port, payload, slow_seconds=0.0):
+    """Send one request; returns its HTTP status (0 if the connection failed)."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        if slow_seconds:
+            step = -(-len(payload) // SLOW_PIECES)
+            for start in range(0, len(payload), step):
+                writer.write(payload[start:start + step])
+                await writer.drain()
+                await asyncio.sleep(slow_seconds / SLOW_PIECES)
+        else:
+            writer.write(payload)
+            await writer.drain()
+        status_line = await reader.readline()
+        while await reader.read(65536):
+            pass
+    finally:
+        writer.close()
+    parts = status_line.split()
+    return int(parts[1]) if len(parts) > 1 else 0
+
+
+async def _client(host, port, payload, deadline, timeout, slow_seconds, latencies, statuses):
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            status = await asyncio.wait_for(request(host, port, payload, slow_seconds), timeout)
+        except asyncio.TimeoutError:
+            status = 'timeout'
+        except OSError:
+            status = 'error'
+        statuses[status] += 1
+        if status == 200:
+            latencies.append(time.perf_counter() - started)
+
+
+async def run_level(url, target, headers, concurrency, duration, slow_clients=0,
+                    slow_seconds=2.0, timeout=30.0):
+    """Run ``concurrency`` normal plus ``slow_clients`` slow clients against ``target`` for ``duration`` seconds."""
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    payload = _encode(parts.netloc, target, headers)
+    deadline = time.perf_counter() + duration
+    fast, slow = [], []
+    statuses = Counter()
+    started = time.perf_counter()
+    await asyncio.gather(
+        *[_client(host, port, payload, deadline, timeout, 0.0, fast, statuses)
+          for _ in range(concurrency)],
+        *[_client(host, port, payload, deadline, timeout, slow_seconds, slow, statuses)
+          for _ in range(slow_clients)],
+    )
+    elapsed = time.perf_counter() - started
+    result = {
+        'concurrency': concurrency,
+        'slow_clients': slow_clients,
+        'seconds': elapsed,
+        'requests_per_second': len(fast) / elapsed,
+        'statuses': {str(status): n for status, n in sorted(statuses.items(), key=str)},
+        'latency': summarize(fast) if fast else None,
+    }
+    if slow_clients:
+        result['slow_latency'] = summarize(slow) if slow else None
+    return result
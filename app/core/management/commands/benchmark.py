@@ -0,0 +1,99 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import benchmarks
+from core.registry import ModelNotAvailable, get_registry
+
+
+def _int_list(value):
+    return [int(v) for v in value.split(',') if v]
+
+
+class Command(BaseCommand):
+    help = ('Benchmark model.predict, feature building, end-to-end view latency and '
+            'concurrent prediction writes, and write p50/p95/p99 results as JSON.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', '-o', help='Write results JSON here (default: stdout).')
+        parser.add_argument('--data', default=str(settings.TRAINING_DATA_PATH),
+                            help='CSV to sample benchmark rows from.')
+        parser.add_argument('--batch-sizes', type=_int_list,
+                            default=benchmarks.DEFAULT_BATCH_SIZES,
+                            help='Comma-separated batch sizes for predict/feature benchmarks.')
+        parser.add_argument('--db-sizes', type=_int_list, default=benchmarks.DEFAULT_DB_SIZES,
+                            help='Comma-separated seeded row counts for view benchmarks.')
+        parser.add_argument('--repeats', type=int, default=20,
+                            help='Requests per view per database size.')
+        parser.add_argument('--skip', action='append', default=[],
+                            choices=['predict', 'features', 'views', 'writes'],
+                            help='Skip a benchmark group (repeatable).')
+        parser.add_argument('--writers', type=int, default=8,
+                            help='Concurrent threads saving predictions in the write benchmark.')
+        parser.add_argument('--write-seconds', type=float, default=5.0,
+                            help='Duration of the write benchmark per connection mode.')
+        parser.add_argument('--write-modes', type=lambda v: [m for m in v.split(',') if m],
+                            help='Comma-separated connection modes to compare: '
+                                 + ', '.join(benchmarks.WRITE_MODES)
+                                 + ' (default: those for the configured database).')
+        parser.add_argument('--compare', metavar='BASELINE_JSON',
+                            help='Compare against a previous run and fail on regressions.')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='Allowed p50 slowdown versus the baseline (0.2 = 20%%).')
+
+    def handle(self, *args, **options):
+        log = self.stderr.write
+        rows = benchmarks.sample_rows(options['data'], max(options['batch_sizes'] + [1000]))
+        document = {'environment': benchmarks.run_environment(), 'results': {}}
+        results = document['results']
+
+        if 'predict' not in options['skip']:
+            try:
+                loaded = get_registry().get()
+            except ModelNotAvailable as exc:
+                raise CommandError(str(exc))
+            document['environment']['model_version'] = loaded.version
+            log('Benchmarking model.predict...')
+            results['model_predict'] = benchmarks.bench_model_predict(
+                loaded, rows, options['batch_sizes'])
+
+        if 'features' not in options['skip']:
+            log('Benchmarking feature building...')
+            results['feature_building'] = benchmarks.bench_feature_building(
+                rows, options['batch_sizes'])
+
+        if 'views' not in options['skip']:
+            log('Benchmarking views...')
+            results['views'] = benchmarks.bench_views(
+                rows, options['db_sizes'], repeats=options['repeats'], log=log)
+
+        if 'writes' not in options['skip']:
+            modes = options['write_modes'] or benchmarks.default_write_modes()
+            unknown = sorted(set(modes) - set(benchmarks.WRITE_MODES))
+            if unknown:
+                raise CommandError(f'Unknown write mode(s): {", ".join(unknown)}')
+            log('Benchmarking concurrent prediction writes...')
+            results['writes'] = benchmarks.bench_writes(
+                rows, modes, writers=options['writers'], duration=options['write_seconds'], log=log)
+
+        text = json.dumps(document, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                fh.write(text)
+            log(f"Wrote {options['output']}")
+        else:
+            self.stdout.write(text)
+
+        if options['compare']:
+            with open(options['compare']) as fh:
+                baseline = json.load(fh)
+            regressions = 0
+            for name, before, after, ratio, regressed in benchmarks.compare(
+                    baseline, document, tolerance=options['tolerance']):
+                flag = '  REGRESSION' if regressed else ''
+                regressions += regressed
+                log(f'{name}: {before * 1000:.3f}ms -> {after * 1000:.3f}ms ({ratio:.2f}x){flag}')
+            if regressions:
+                raise CommandError(f'{regressions} measurement(s) regressed by more than '
+                                   f'{options["tolerance"]:.0%}')
@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.dataset import DEFAULT_CHUNK_ROWS, FORMATS, build_dataset, default_format, read_dataset
+
+
+class Command(BaseCommand):
+    help = ('Build the training dataset from raw FAOSTAT exports: pivot them in chunks, merge the '
+            'enrichment columns and write compressed columnar partitions, skipping unchanged inputs.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*',
+                            help='Raw FAOSTAT CSVs or directories of them (default: settings.DATASET_RAW_SOURCE).')
+        parser.add_argument('--output', default=str(settings.DATASET_DIR),
+                            help='Dataset directory (default: settings.DATASET_DIR).')
+        parser.add_argument('--enrichment', default=str(settings.DATASET_ENRICHMENT_SOURCE),
+                            help='CSV with the climate, price and policy columns '
+                                 '(default: settings.DATASET_ENRICHMENT_SOURCE).')
+        parser.add_argument('--no-enrichment', action='store_true',
+                            help='Only pivot the FAO elements (like data/fao_data_cleaned.csv).')
+        parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS,
+                            help='Raw rows read and pivoted at a time.')
+        parser.add_argument('--format', choices=FORMATS,
+                            help='Partition format (default: parquet if pyarrow is installed, else npz).')
+        parser.add_argument('--force', action='store_true', help='Rebuild unchanged partitions too.')
+        parser.add_argument('--csv', help='Also write the whole dataset to this CSV.')
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or [settings.DATASET_RAW_SOURCE]
+        try:
+            summary = build_dataset(
+                paths, options['output'],
+                enrichment=None if options['no_enrichment'] else options['enrichment'],
+                chunk_rows=options['chunk_rows'], fmt=options['format'] or default_format(),
+                force=options['force'], log=self.stderr.write)
+        except (FileNotFoundError, ValueError) as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(
+            f'{summary["partitions"]} partition(s) at {options["output"]}: {summary["built"]} built '
+            f'from {summary["raw_rows"]:,} raw rows, {summary["skipped"]} unchanged, '
+            f'{summary["removed"]} removed; {summary["rows"]:,} rows in {summary["bytes"] / 1e6:.1f} MB, '
+            f'{summary["seconds"]:.2f}s'))
+        if options['csv']:
+            read_dataset(options['output'], exact=True).to_csv(options['csv'], index=False)
+            self.stdout.write(f'Wrote {options["csv"]}')
@@ -0,0 +1,83 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmarks import measure, sample_rows
+from core.compiled import CompileError, compile_pipeline, max_abs_error, private_memory_bytes
+from core.features import build_features
+from core.registry import ModelNotAvailable, get_registry
+
+
+class Command(BaseCommand):
+    help = ('Compile a trained pipeline into an array-backed model, check it against the '
+            'original and publish it to the model registry.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', metavar='VERSION',
+                            help='Version to compile (default: the active one).')
+        parser.add_argument('--model-version',
+                            help='Version name for the compiled model (default: <source>-compiled).')
+        parser.add_argument('--data', default=str(settings.TRAINING_DATA_PATH),
+                            help='CSV to draw verification rows from.')
+        parser.add_argument('--check-rows', type=int, default=5000,
+                            help='Rows scored by both models to verify the compiled one.')
+        parser.add_argument('--tolerance', type=float, default=1e-6,
+                            help='Largest accepted relative difference from the original predictions.')
+        parser.add_argument('--no-activate', action='store_true',
+                            help='Publish without switching the active version.')
+
+    def handle(self, *args, **options):
+        registry = get_registry()
+        try:
+            source = registry.load(options['source']) if options['source'] else registry.get()
+        except (ModelNotAvailable, ValueError) as exc:
+            raise CommandError(str(exc))
+        if source.metadata.get('compiled_from'):
+            raise CommandError(f'{source.version} is already a compiled model')
+
+        try:
+            compiled = compile_pipeline(source.estimator)
+        except (CompileError, KeyError, AttributeError) as exc:
+            raise CommandError(f'Cannot compile {source.version}: {exc}')
+        self.stdout.write(f'Compiled {source.version}: {compiled.n_nodes} nodes, depth '
+                          f'{compiled.depth}, {compiled.nbytes() / 2 ** 20:.1f} MiB of arrays')
+
+        features = build_features(sample_rows(options['data'], options['check_rows']))
+        error = max_abs_error(source.estimator, compiled, features)
+        scale = float(abs(source.estimator.predict(features)).max()) or 1.0
+        if error > options['tolerance'] * scale:
+            raise CommandError(f'Compiled predictions differ by up to {error:g}; not publishing')
+
+        one = features.iloc[:1]
+        latency = {
+            'source_p50': measure(lambda: source.estimator.predict(one), 200)['p50'],
+            'compiled_p50': measure(lambda: compiled.predict(one), 200)['p50'],
+        }
+
+        metadata = {k: v for k, v in source.metadata.items() if k not in ('version', 'created_at')}
+        metadata.update({
+            'compiled_from': source.version,
+            'compiled_nodes': compiled.n_nodes,
+            'compiled_bytes': compiled.nbytes(),
+            'max_abs_error': error,
+            'single_row_latency': latency,
+        })
+        version = registry.publish(
+            compiled, metadata,
+            version=options['model_version'] or f'{source.version}-compiled',
+            activate=not options['no_activate'],
+        )
+
+        compiled_path = registry.load(version).path
+        footprint = {
+            'source': private_memory_bytes(source.path, one, settings.BASE_DIR),
+            'compiled': private_memory_bytes(compiled_path, one, settings.BASE_DIR),
+        }
+        self.stdout.write(json.dumps({
+            'max_abs_error': error,
+            'single_row_p50_ms': {k: round(v * 1000, 3) for k, v in latency.items()},
+            'speedup': round(latency['source_p50'] / latency['compiled_p50'], 1),
+            'private_memory_bytes': footprint,
+        }, indent=2))
+        self.stdout.write(self.style.SUCCESS(f'Published model version {version}'))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.forecasting import METRICS, get_forecaster
+
+
+class Command(BaseCommand):
+    help = ('Fit the per-series forecasting models to every country/crop series of the FAO history '
+            'and cache their parameters for the forecast API.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', help='FAO history CSV (default: settings.FORECAST_SOURCE).')
+        parser.add_argument('--n-jobs', type=int,
+                            help='Processes to fit blocks of series in (default: settings.FORECAST_N_JOBS).')
+
+    def handle(self, *args, **options):
+        forecaster = get_forecaster()
+        try:
+            manifest = forecaster.fit(options['source'], n_jobs=options['n_jobs'])
+        except FileNotFoundError as exc:
+            raise CommandError(str(exc))
+        for metric in METRICS:
+            counts = ', '.join(f'{model} {count}' for model, count in manifest['models'][metric].items())
+            self.stdout.write(f'{metric}: {counts}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Fitted {manifest["series"]:,} series ({manifest["years"][0]}-{manifest["years"][1]}) '
+            f'in {manifest["fit_seconds"]:.2f}s ({manifest["wall_seconds"]:.2f}s with reading and saving) '
+            f'into {forecaster.root}'))
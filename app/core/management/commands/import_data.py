@@ -0,0 +1,65 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importer import default_chunk_rows, file_format, import_file
+from core.registry import ModelNotAvailable, get_registry
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Command(BaseCommand):
+    help = ('Import a CSV or Excel file of AgriculturalDataForm rows for a user: validate and '
+            'score it in chunks and bulk-insert the valid rows, reporting rows per second.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or .xlsx file shaped like data/enhanced_agricultural_data.csv.')
+        parser.add_argument('--user', required=True, help='Username that will own the imported rows.')
+        parser.add_argument('--chunk-rows', type=int, default=default_chunk_rows(),
+                            help='Rows read, scored and inserted per transaction (default: JOB_CHUNK_ROWS).')
+        parser.add_argument('--model-version', help='Registry version to score with (default: active).')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Validate and score without saving anything.')
+        parser.add_argument('--json', action='store_true', help='Print the summary as JSON.')
+
+    def handle(self, *args, **options):
+        try:
+            file_format(options['path'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        try:
+            user = get_user_model().objects.get(username=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'No user named {options["user"]!r}')
+        try:
+            registry = get_registry()
+            loaded = registry.load(options['model_version']) if options['model_version'] else registry.get()
+        except (ModelNotAvailable, ValueError) as exc:
+            raise CommandError(str(exc))
+
+        def progress(summary):
+            self.stderr.write(
+                f'{summary["rows"]:>10,} rows  {summary["imported"]:>10,} valid  '
+                f'{summary["rejected"]:>8,} rejected  {summary["rows_per_second"] or 0:>10,.0f} rows/s')
+
+        summary = import_file(user, options['path'], chunk_rows=options['chunk_rows'],
+                              loaded=loaded, persist=not options['dry_run'], progress=progress)
+        summary['model_version'] = loaded.version
+        summary['peak_rss_mb'] = _peak_rss_mb()
+        if options['json']:
+            self.stdout.write(json.dumps(summary, indent=2))
+            return
+        for error in summary['errors'][:10]:
+            self.stderr.write(f'row {error["row"]}: {error["errors"]}')
+        verb = 'Validated' if options['dry_run'] else 'Imported'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {summary["imported"]:,} of {summary["rows"]:,} rows ({summary["rejected"]:,} rejected) '
+            f'in {summary["seconds"]:.1f}s: {summary["rows_per_second"] or 0:,.0f} rows/s'))
@@ -0,0 +1,33 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.feature_store import get_feature_store
+
+
+class Command(BaseCommand):
+    help = 'Append new rows from the historical dataset CSV(s) to the columnar feature store.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*',
+                            help='CSV files to ingest (default: settings.FEATURE_STORE_SOURCE).')
+        parser.add_argument('--chunksize', type=int, default=50000)
+        parser.add_argument('--compact', action='store_true',
+                            help='Merge all segments into one after ingesting.')
+
+    def handle(self, *args, **options):
+        store = get_feature_store()
+        paths = options['paths'] or [settings.FEATURE_STORE_SOURCE]
+        for path in paths:
+            started = time.perf_counter()
+            try:
+                added = store.ingest_csv(path, chunksize=options['chunksize'])
+            except FileNotFoundError as exc:
+                raise CommandError(str(exc))
+            self.stdout.write(f'{path}: {added} new row(s) in {time.perf_counter() - started:.2f}s')
+        if options['compact']:
+            store.compact()
+        self.stdout.write(self.style.SUCCESS(
+            f'Feature store at {store.root} holds {len(store)} row(s) '
+            f'in {len(store.keys())} country/crop partition(s)'))
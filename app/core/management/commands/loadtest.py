@@ -0,0 +1,99 @@
+import asyncio
+import json
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core import benchmarks, loadtest
+from core.models import AgriculturalData
+
+TARGET_NAMES = ['dashboard', 'stats', 'detail', 'batch']
+
+
+def _int_list(value):
+    return [int(v) for v in value.split(',') if v]
+
+
+def _name_list(value):
+    names = [v for v in value.split(',') if v]
+    unknown = sorted(set(names) - set(TARGET_NAMES))
+    if unknown:
+        raise ValueError(f'unknown target(s): {", ".join(unknown)}')
+    return names
+
+
+class Command(BaseCommand):
+    help = ('Load-test a running server (runserver, gunicorn or uvicorn) with concurrent '
+            'and optionally slow clients, reporting throughput and p50/p95/p99 per endpoint.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000',
+                            help='Base URL of the server; it must use this project\'s database.')
+        parser.add_argument('--user', required=True,
+                            help='Username the clients are logged in as.')
+        parser.add_argument('--targets', type=_name_list, default=TARGET_NAMES,
+                            help='Comma-separated endpoints: ' + ', '.join(TARGET_NAMES) + '.')
+        parser.add_argument('--concurrency', type=_int_list, default=[1, 16, 64, 256],
+                            help='Comma-separated numbers of concurrent clients.')
+        parser.add_argument('--duration', type=float, default=10.0,
+                            help='Seconds per endpoint and concurrency level.')
+        parser.add_argument('--slow-clients', type=int, default=0,
+                            help='Extra clients that trickle each request over --slow-seconds.')
+        parser.add_argument('--slow-seconds', type=float, default=2.0)
+        parser.add_argument('--batch-rows', type=int, default=100,
+                            help='Rows per api/predict/batch/ request (scored, not saved).')
+        parser.add_argument('--timeout', type=float, default=30.0)
+        parser.add_argument('--label', help='Name of the deployment under test, stored in the output.')
+        parser.add_argument('--output', '-o', help='Write results JSON here (default: stdout).')
+
+    def _targets(self, user, names, batch_rows):
+        targets = {
+            'dashboard': loadtest.Target('dashboard', '/dashboard/'),
+            'stats': loadtest.Target('stats', '/api/stats/'),
+        }
+        if 'detail' in names:
+            latest = AgriculturalData.objects.filter(user=user).order_by('-pk').values_list('pk', flat=True).first()
+            if latest is None:
+                raise CommandError(f'{user} has no predictions to fetch for the detail target')
+            targets['detail'] = loadtest.Target('detail', f'/predict/{latest}/')
+        if 'batch' in names:
+            rows = benchmarks.sample_rows(settings.TRAINING_DATA_PATH, batch_rows)
+            targets['batch'] = loadtest.Target(
+                'batch', '/api/predict/batch/?persist=0', method='POST',
+                body=rows.to_csv(index=False).encode(), content_type='text/csv')
+        return [targets[name] for name in names]
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(username=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'No user named {options["user"]!r}')
+        headers = loadtest.login_headers(user)
+        targets = self._targets(user, options['targets'], options['batch_rows'])
+
+        document = {
+            'environment': {**benchmarks.run_environment(), 'label': options['label'],
+                            'url': options['url']},
+            'results': {},
+        }
+        for target in targets:
+            levels = document['results'][target.name] = []
+            for concurrency in options['concurrency']:
+                result = asyncio.run(loadtest.run_level(
+                    options['url'], target, headers, concurrency, options['duration'],
+                    slow_clients=options['slow_clients'], slow_seconds=options['slow_seconds'],
+                    timeout=options['timeout']))
+                levels.append(result)
+                latency = result['latency'] or {}
+                self.stderr.write(
+                    f'{target.name:<10} c={concurrency:<4} {result["requests_per_second"]:8.1f} req/s  '
+                    f'p50 {latency.get("p50", float("nan")) * 1000:8.1f}ms  '
+                    f'p99 {latency.get("p99", float("nan")) * 1000:8.1f}ms  {result["statuses"]}')
+
+        text = json.dumps(document, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                fh.write(text + '\n')
+        else:
+            self.stdout.write(text)
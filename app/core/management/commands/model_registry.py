@@ -0,0 +1,42 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.registry import ModelNotAvailable, get_registry
+
+
+class Command(BaseCommand):
+    help = 'List, inspect and activate versions in the model registry.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--activate', metavar='VERSION',
+                            help='Atomically switch the active model version.')
+        parser.add_argument('--load', action='store_true',
+                            help='Load the active version and report load time and resident size.')
+
+    def handle(self, *args, **options):
+        registry = get_registry()
+
+        if options['activate']:
+            try:
+                registry.activate(options['activate'])
+            except ValueError as exc:
+                raise CommandError(str(exc))
+            self.stdout.write(self.style.SUCCESS(f"Activated {options['activate']}"))
+
+        pointer_version = registry._read_pointer()[0]
+        versions = registry.versions()
+        if not versions:
+            self.stdout.write(f'No versions under {registry.root}')
+        for version in versions:
+            marker = '*' if version == pointer_version else ' '
+            meta = registry.read_metadata(version)
+            targets = ','.join(meta.get('targets') or ['yield'])
+            self.stdout.write(f"{marker} {version}  {meta.get('created_at', '')}  [{targets}]")
+
+        if options['load']:
+            try:
+                loaded = registry.get()
+            except ModelNotAvailable as exc:
+                raise CommandError(str(exc))
+            self.stdout.write(json.dumps(loaded.describe(), indent=2, default=str))
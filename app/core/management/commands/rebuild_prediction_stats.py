@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from core.stats import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized per-user prediction statistics from AgriculturalData.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids',
+                            help='Only rebuild these user ids (repeatable).')
+
+    def handle(self, *args, **options):
+        users = rebuild(user_ids=options['user_ids'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt prediction statistics for {users} user(s)'))
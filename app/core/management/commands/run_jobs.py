@@ -0,0 +1,41 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.jobs import JOB_HANDLERS, claim_next, run_job, worker_id
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (batch predictions, exports, training).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int,
+                            default=getattr(settings, 'JOB_WORKER_PROCESSES', os.cpu_count() or 1),
+                            help='Process pool size for chunked work.')
+        parser.add_argument('--kinds', nargs='+', choices=sorted(JOB_HANDLERS),
+                            help='Only run these job kinds.')
+        parser.add_argument('--poll', type=float, default=getattr(settings, 'JOB_POLL_INTERVAL', 2.0),
+                            help='Seconds to wait when the queue is empty.')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit when the queue is empty instead of polling.')
+
+    def handle(self, *args, **options):
+        me = worker_id()
+        self.stdout.write(f'Job worker {me} started ({options["processes"]} processes)')
+        try:
+            while True:
+                job = claim_next(me, kinds=options['kinds'])
+                if job is None:
+                    if options['once']:
+                        return
+                    time.sleep(options['poll'])
+                    continue
+                self.stdout.write(f'Running {job} (attempt {job.attempts})')
+                started = time.perf_counter()
+                job = run_job(job, processes=options['processes'])
+                style = self.style.SUCCESS if job.status == 'done' else self.style.ERROR
+                self.stdout.write(style(f'{job} in {time.perf_counter() - started:.1f}s'))
+        except KeyboardInterrupt:
+            self.stdout.write('Stopped; the running job was returned to the queue')
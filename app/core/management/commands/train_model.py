@@ -0,0 +1,92 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import incremental
+from core.registry import ModelNotAvailable, get_registry
+from core.training import TARGET_COLUMNS, train
+
+
+class Command(BaseCommand):
+    help = 'Train the yield model (grid search over RandomForest/GradientBoosting) and publish it to the model registry.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--data', default=str(settings.TRAINING_DATA_PATH),
+                            help='Training CSV (default: settings.TRAINING_DATA_PATH).')
+        parser.add_argument('--n-jobs', type=int, default=-1,
+                            help='Worker processes for the search (-1 = all cores).')
+        parser.add_argument('--cv', type=int, default=3, help='Cross-validation folds.')
+        parser.add_argument('--quick', action='store_true', help='Use a small parameter grid.')
+        parser.add_argument('--cache-dir',
+                            help='Keep fitted-preprocessor cache here instead of a temp dir.')
+        parser.add_argument('--targets', default='yield',
+                            help=f'Comma-separated targets to predict in one model ({", ".join(TARGET_COLUMNS)}).')
+        parser.add_argument('--model-version', help='Version name (default: UTC timestamp).')
+        parser.add_argument('--no-activate', action='store_true',
+                            help='Publish without switching the active version.')
+        group = parser.add_argument_group('incremental training')
+        group.add_argument('--incremental', action='store_true',
+                           help='Update an existing version with the predictions saved since it '
+                                'was published instead of training from --data.')
+        group.add_argument('--base', help='Version to update (default: active).')
+        group.add_argument('--strategy', choices=incremental.STRATEGIES, default='auto',
+                           help='warm_start grows the ensemble, reservoir refits on a bounded sample, '
+                                'auto grows until --max-estimators.')
+        group.add_argument('--new-estimators', type=int, default=incremental.DEFAULT_NEW_ESTIMATORS,
+                           help='Trees or boosting stages added per target by warm_start.')
+        group.add_argument('--max-estimators', type=int, default=incremental.DEFAULT_MAX_ESTIMATORS)
+        group.add_argument('--reservoir-size', type=int, default=incremental.DEFAULT_RESERVOIR_SIZE)
+        group.add_argument('--min-rows', type=int, default=incremental.DEFAULT_MIN_ROWS,
+                           help='Refuse to publish from fewer new rows.')
+
+    def handle(self, *args, **options):
+        if options['incremental']:
+            return self.handle_incremental(options)
+        targets = [t.strip() for t in options['targets'].split(',') if t.strip()]
+        unknown = [t for t in targets if t not in TARGET_COLUMNS]
+        if unknown or not targets:
+            raise CommandError(f'Unknown target(s): {", ".join(unknown) or "(none)"}')
+        pipeline, metadata = train(
+            options['data'],
+            n_jobs=options['n_jobs'],
+            cv=options['cv'],
+            quick=options['quick'],
+            cache_dir=options['cache_dir'],
+            targets=targets,
+            log=self.stdout.write,
+        )
+        version = get_registry().publish(
+            pipeline, metadata,
+            version=options['model_version'],
+            activate=not options['no_activate'],
+        )
+        summary = {key: metadata[key] for key in (
+            'model_type', 'best_params', 'cv_r2', 'test_metrics',
+            'search_seconds', 'wall_seconds', 'peak_memory_bytes')}
+        self.stdout.write(json.dumps(summary, indent=2))
+        self.stdout.write(self.style.SUCCESS(f'Published model version {version}'))
+
+    def handle_incremental(self, options):
+        try:
+            pipeline, metadata, attachments = incremental.train_incremental(
+                options['base'],
+                strategy=options['strategy'],
+                new_estimators=options['new_estimators'],
+                max_estimators=options['max_estimators'],
+                reservoir_size=options['reservoir_size'],
+                min_rows=options['min_rows'],
+                log=self.stdout.write,
+            )
+        except (ModelNotAvailable, ValueError) as exc:
+            raise CommandError(str(exc))
+        version = get_registry().publish(
+            pipeline, metadata,
+            version=options['model_version'],
+            activate=not options['no_activate'],
+            attachments=attachments,
+        )
+        summary = {key: metadata[key] for key in (
+            'incremental', 'base_test_metrics', 'test_metrics', 'wall_seconds')}
+        self.stdout.write(json.dumps(summary, indent=2))
+        self.stdout.write(self.style.SUCCESS(f'Published model version {version}'))
@@ -0,0 +1,126 @@
+# core/metrics.py
+"""Small in-process metric primitives (no external dependencies)."""
+import bisect
+import threading
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the style of Prometheus."""
+
+    def __init__(self, name, buckets, help_text=''):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = sorted(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self):
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+        cumulative, running = [], 0
+        for bound, n in zip(self.buckets + [float('inf')], counts):
+            running += n
+            cumulative.append((bound, running))
+        return {'buckets': cumulative, 'sum': total, 'count': count}
+
+    def describe(self):
+        snap = self.snapshot()
+        return {
+            'count': snap['count'],
+            'sum': snap['sum'],
+            'mean': snap['sum'] / snap['count'] if snap['count'] else 0.0,
+            'buckets': {('+Inf' if bound == float('inf') else str(bound)): n
+                        for bound, n in snap['buckets']},
+        }
+
+
+class LabeledHistogram:
+    """A family of histograms keyed by a tuple of label values."""
+
+    def __init__(self, name, buckets, label_names, help_text=''):
+        self.name = name
+        self.buckets = buckets
+        self.label_names = tuple(label_names)
+        self.help_text = help_text
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(
+                    values, Histogram(self.name, self.buckets, self.help_text))
+        return child
+
+    def items(self):
+        return list(self._children.items())
+
+
+class LabeledCounter:
+    def __init__(self, name, label_names, help_text=''):
+        self.name = name
+        self.label_names = tuple(label_names)
+        self.help_text = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *values, amount=1):
+        with self._lock:
+            self._values[values] = self._values.get(values, 0) + amount
+
+    def items(self):
+        with self._lock:
+            return list(self._values.items())
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def render_prometheus(metrics):
+    """Render histograms and counters in the Prometheus text exposition format."""
+    lines = []
+    for metric in metrics:
+        if isinstance(metric, Histogram):
+            children, names = [((), metric)], ()
+        elif isinstance(metric, LabeledHistogram):
+            children, names = metric.items(), metric.label_names
+        else:
+            children, names = None, metric.label_names
+
+        if children is None:
+            lines.append(f'# HELP {metric.name} {metric.help_text}')
+            lines.append(f'# TYPE {metric.name} counter')
+            for values, count in metric.items():
+                lines.append(f'{metric.name}{_labels(names, values)} {count}')
+            continue
+
+        lines.append(f'# HELP {metric.name} {metric.help_text}')
+        lines.append(f'# TYPE {metric.name} histogram')
+        for values, histogram in children:
+            snap = histogram.snapshot()
+            for bound, count in snap['buckets']:
+                le = '+Inf' if bound == float('inf') else repr(float(bound))
+                labels = _labels(names, values, 'le="%s"' % le)
+                lines.append(f'{metric.name}_bucket{labels} {count}')
+            lines.append(f'{metric.name}_sum{_labels(names, values)} {snap["sum"]}')
+            lines.append(f'{metric.name}_count{_labels(names, values)} {snap["count"]}')
+    return '\n'.join(lines) + '\n'
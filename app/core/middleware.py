@@ -0,0 +1,81 @@
+# core/middleware.py
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from . import instrumentation
+
+logger = logging.getLogger(__name__)
+
+
+class PerformanceMiddleware:
+    """
+    Time every request and break it down into database, template and
+    inference time.
+
+    The breakdown is sent back in a ``Server-Timing`` header (visible in the
+    browser's network panel), recorded in the Prometheus histograms served at
+    ``metrics/``, and a warning is logged when one SELECT is repeated
+    ``N_PLUS_ONE_THRESHOLD`` times within a request.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.threshold = getattr(settings, 'N_PLUS_ONE_THRESHOLD', 10)
+        self.server_timing = getattr(settings, 'SERVER_TIMING_HEADER', True)
+        instrumentation.install()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics, token = instrumentation.begin()
+        try:
+            response = self.get_response(request)
+        finally:
+            instrumentation.end(token)
+        self.finish(request, response, metrics)
+        return response
+
+    async def __acall__(self, request):
+        metrics, token = instrumentation.begin()
+        try:
+            response = await self.get_response(request)
+        finally:
+            instrumentation.end(token)
+        self.finish(request, response, metrics)
+        return response
+
+    def finish(self, request, response, metrics):
+        total = time.perf_counter() - metrics.started
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match is not None else 'unresolved'
+
+        instrumentation.REQUEST_SECONDS.labels(view).observe(total)
+        instrumentation.DB_SECONDS.labels(view).observe(metrics.db_seconds)
+        instrumentation.DB_QUERIES.labels(view).observe(metrics.db_queries)
+        instrumentation.TEMPLATE_SECONDS.labels(view).observe(metrics.template_seconds)
+        if metrics.inference_seconds:
+            instrumentation.INFERENCE_SECONDS.labels(view).observe(metrics.inference_seconds)
+
+        repeated = metrics.repeated_select(self.threshold)
+        if repeated is not None:
+            sql, count = repeated
+            instrumentation.N_PLUS_ONE.inc(view)
+            logger.warning('Possible N+1 in %s: query ran %d times: %s', view, count, sql[:300])
+
+        # Streaming responses are timed up to the first byte only; their
+        # queries run while the body is consumed.
+        if self.server_timing:
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={metrics.db_seconds * 1000:.1f};desc="{metrics.db_queries} queries"',
+                f'tpl;dur={metrics.template_seconds * 1000:.1f}',
+                f'inf;dur={metrics.inference_seconds * 1000:.1f}',
+                f'total;dur={total * 1000:.1f}',
+            ])
@@ -0,0 +1,98 @@
+# Generated by Django 5.2 on 2026-10-17 17:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def build_prediction_stats(apps, schema_editor):
+    from core.stats import rebuild
+    rebuild(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CropPredictionStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('crop', models.CharField(max_length=100)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Crop prediction stats',
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyPredictionStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('scored_count', models.PositiveIntegerField(default=0)),
+                ('sum_production', models.FloatField(default=0)),
+                ('sum_yield', models.FloatField(default=0)),
+                ('sum_price', models.FloatField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Daily prediction stats',
+            },
+        ),
+        migrations.CreateModel(
+            name='UserPredictionStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('scored_count', models.PositiveIntegerField(default=0)),
+                ('sum_production', models.FloatField(default=0)),
+                ('sum_yield', models.FloatField(default=0)),
+                ('sum_price', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'User prediction stats',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='agriculturaldata',
+            index=models.Index(fields=['user', '-created_at'], name='agridata_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='agriculturaldata',
+            index=models.Index(fields=['user', 'crop'], name='agridata_user_crop_idx'),
+        ),
+        migrations.AddField(
+            model_name='croppredictionstats',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='crop_prediction_stats', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='dailypredictionstats',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_prediction_stats', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='userpredictionstats',
+            name='user',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='prediction_stats', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='croppredictionstats',
+            index=models.Index(fields=['user', '-count'], name='cropstats_user_count_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='croppredictionstats',
+            constraint=models.UniqueConstraint(fields=('user', 'crop'), name='unique_crop_stats_per_user'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailypredictionstats',
+            constraint=models.UniqueConstraint(fields=('user', 'day'), name='unique_daily_stats_per_user'),
+        ),
+        migrations.RunPython(build_prediction_stats, migrations.RunPython.noop),
+    ]
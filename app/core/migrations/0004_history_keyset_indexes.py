@@ -0,0 +1,31 @@
+# Generated by Django 5.2 on 2026-10-17 18:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_job'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='agriculturaldata',
+            name='agridata_user_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='agriculturaldata',
+            name='agridata_user_crop_idx',
+        ),
+        migrations.AddIndex(
+            model_name='agriculturaldata',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='agridata_user_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='agriculturaldata',
+            index=models.Index(fields=['user', 'crop', '-created_at', '-id'], name='agridata_user_crop_created_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-17 18:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_history_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='job',
+            name='kind',
+            field=models.CharField(choices=[('batch_predict', 'Batch prediction'), ('import', 'Import'), ('export', 'Export'), ('train', 'Model training')], max_length=20),
+        ),
+    ]
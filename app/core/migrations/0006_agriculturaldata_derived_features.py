@@ -0,0 +1,101 @@
+# Generated by Django 5.2 on 2026-10-17 18:37
+
+import numpy as np
+from django.db import migrations, models
+
+BACKFILL_CHUNK = 5000
+INPUTS = ['area_harvested_ha', 'production_tonnes', 'rainfall_mm', 'temperature_c',
+          'price_usd_per_tonne', 'transport_cost_usd', 'demand_supply_gap']
+DERIVED = ['rainfall_temp_interaction', 'price_to_yield_ratio', 'demand_supply_balance',
+           'log_production_tonnes', 'log_area_harvested_ha', 'log_transport_cost_usd']
+
+
+def _divide(numerator, denominator, where):
+    out = np.zeros_like(numerator)
+    np.divide(numerator, denominator, out=out, where=where)
+    return out
+
+
+def _log(values):
+    out = np.zeros_like(values)
+    np.log(values, out=out, where=values > 0)
+    return out
+
+
+def _derive(rows):
+    # A frozen copy of core.features.derive_features as of this migration
+    area, production, rainfall, temperature, price, transport, gap = (
+        np.nan_to_num(np.array(column, dtype=np.float64), nan=0.0, posinf=0.0, neginf=0.0)
+        for column in list(zip(*rows))[1:])
+    tonnes_per_ha = _divide(production, area, area > 0)
+    return zip(
+        rainfall * temperature,
+        _divide(price, tonnes_per_ha, tonnes_per_ha != 0),
+        _divide(gap, production, production > 0),
+        _log(production),
+        _log(area),
+        _log(transport),
+    )
+
+
+def backfill_derived_features(apps, schema_editor):
+    AgriculturalData = apps.get_model('core', 'AgriculturalData')
+    quote = schema_editor.quote_name
+    # executemany of a plain UPDATE is far cheaper than bulk_update's CASE WHEN
+    sql = 'UPDATE {} SET {} WHERE {} = %s'.format(
+        quote(AgriculturalData._meta.db_table),
+        ', '.join(f'{quote(name)} = %s' for name in DERIVED),
+        quote(AgriculturalData._meta.pk.column),
+    )
+    last_pk = 0
+    with schema_editor.connection.cursor() as cursor:
+        while True:
+            rows = list(AgriculturalData.objects.filter(pk__gt=last_pk).order_by('pk')
+                        .values_list('pk', *INPUTS)[:BACKFILL_CHUNK])
+            if not rows:
+                break
+            cursor.executemany(sql, [
+                (*map(float, values), row[0]) for row, values in zip(rows, _derive(rows))
+            ])
+            last_pk = rows[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_job_import'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='agriculturaldata',
+            name='demand_supply_balance',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='agriculturaldata',
+            name='log_area_harvested_ha',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='agriculturaldata',
+            name='log_production_tonnes',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='agriculturaldata',
+            name='log_transport_cost_usd',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='agriculturaldata',
+            name='price_to_yield_ratio',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='agriculturaldata',
+            name='rainfall_temp_interaction',
+            field=models.FloatField(default=0),
+        ),
+        migrations.RunPython(backfill_derived_features, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,9 @@
 from django.db import models
 from django.contrib.auth.models import User
-import numpy as np
 from django.db.models import F, ExpressionWrapper, FloatField
 
+from .features import DERIVED_FIELDS, derived_fields
+
 class AgriculturalData(models.Model):
     # Basic Fields
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -27,38 +28,131 @@ class AgriculturalData(models.Model):
     # Timestamp
     created_at = models.DateTimeField(auto_now_add=True)
     
-    # Derived Fields as Properties
-    @property
-    def rainfall_temp_interaction(self):
-        return self.rainfall_mm * self.temperature_c
-    
-    @property
-    def price_to_yield_ratio(self):
-        if self.area_harvested_ha > 0:
-            return self.price_usd_per_tonne / (self.production_tonnes / self.area_harvested_ha)
-        return 0
-    
-    @property
-    def demand_supply_balance(self):
-        if self.production_tonnes > 0:
-            return self.demand_supply_gap / self.production_tonnes
-        return 0
-    
-    @property
-    def log_production_tonnes(self):
-        return np.log(self.production_tonnes) if self.production_tonnes > 0 else 0
-    
-    @property
-    def log_area_harvested_ha(self):
-        return np.log(self.area_harvested_ha) if self.area_harvested_ha > 0 else 0
-    
-    @property
-    def log_transport_cost_usd(self):
-        return np.log(self.transport_cost_usd) if self.transport_cost_usd > 0 else 0
+    # Derived Fields, stored so features are read in one query and can be
+    # filtered and aggregated in SQL. Computed by core.features on save();
+    # bulk_create callers go through core.batch.build_instances instead.
+    rainfall_temp_interaction = models.FloatField(default=0)
+    price_to_yield_ratio = models.FloatField(default=0)
+    demand_supply_balance = models.FloatField(default=0)
+    log_production_tonnes = models.FloatField(default=0)
+    log_area_harvested_ha = models.FloatField(default=0)
+    log_transport_cost_usd = models.FloatField(default=0)
     
+    def set_derived_features(self):
+        for field, values in derived_fields(self).items():
+            setattr(self, field, float(values[0]))
+
+    def save(self, *args, **kwargs):
+        self.set_derived_features()
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], *DERIVED_FIELDS}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.crop} in {self.country} ({self.year})"
 
     class Meta:
         verbose_name_plural = "Agricultural Data"
-        ordering = ['-year', 'country']
\ No newline at end of file
+        ordering = ['-year', 'country']
+        indexes = [
+            # Keyset pagination of the prediction history (core/history.py),
+            # unfiltered and filtered by crop
+            models.Index(fields=['user', '-created_at', '-id'], name='agridata_user_created_id_idx'),
+            models.Index(fields=['user', 'crop', '-created_at', '-id'], name='agridata_user_crop_created_idx'),
+        ]
+
+
+# Denormalized prediction statistics, maintained incrementally by core.stats
+# so the dashboard and stats API never aggregate over a user's full history.
+class UserPredictionStats(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='prediction_stats')
+    count = models.PositiveIntegerField(default=0)
+    # Rows with predictions set (the three targets are always written together)
+    scored_count = models.PositiveIntegerField(default=0)
+    sum_production = models.FloatField(default=0)
+    sum_yield = models.FloatField(default=0)
+    sum_price = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "User prediction stats"
+
+
+class CropPredictionStats(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='crop_prediction_stats')
+    crop = models.CharField(max_length=100)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = "Crop prediction stats"
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'crop'], name='unique_crop_stats_per_user'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-count'], name='cropstats_user_count_idx'),
+        ]
+
+
+class DailyPredictionStats(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_prediction_stats')
+    day = models.DateField()
+    count = models.PositiveIntegerField(default=0)
+    scored_count = models.PositiveIntegerField(default=0)
+    sum_production = models.FloatField(default=0)
+    sum_yield = models.FloatField(default=0)
+    sum_price = models.FloatField(default=0)
+
+    class Meta:
+        verbose_name_plural = "Daily prediction stats"
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'day'], name='unique_daily_stats_per_user'),
+        ]
+
+# Background work run by "python manage.py run_jobs" (see core/jobs.py)
+class Job(models.Model):
+    KIND_CHOICES = [
+        ('batch_predict', 'Batch prediction'),
+        ('import', 'Import'),
+        ('export', 'Export'),
+        ('train', 'Model training'),
+    ]
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='jobs')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    params = models.JSONField(default=dict, blank=True)
+    progress_done = models.PositiveIntegerField(default=0)
+    progress_total = models.PositiveIntegerField(default=0)
+    # Chunk numbers whose results are on disk (and in the database), for resuming
+    completed_chunks = models.JSONField(default=list, blank=True)
+    result_file = models.CharField(max_length=255, blank=True)
+    result = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.pk} ({self.status})"
+
+    @property
+    def progress_percent(self):
+        if not self.progress_total:
+            return 100 if self.status == 'done' else 0
+        return int(100 * self.progress_done / self.progress_total)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='job_status_created_idx'),
+            models.Index(fields=['user', '-created_at'], name='job_user_created_idx'),
+        ]
@@ -0,0 +1,46 @@
+# core/multitarget.py
+"""
+Several regression targets behind one ``predict`` call.
+
+:class:`TargetBundle` sits after the pipeline's ``preprocessor``: the
+features are transformed once and every target's model reads its own
+column subset of that single matrix. ``predict`` returns one column per
+target, in the order of the registry metadata's ``targets``.
+"""
+import numpy as np
+from sklearn.base import BaseEstimator, RegressorMixin, clone
+
+
+class TargetBundle(RegressorMixin, BaseEstimator):
+    """
+    One clone of ``estimator`` per output column.
+
+    ``exclude`` lists, per target, the indices of transformed columns that
+    target's model must not see (e.g. the target's own value passed in as an
+    input feature).
+    """
+
+    def __init__(self, estimator=None, exclude=None):
+        self.estimator = estimator
+        self.exclude = exclude
+
+    def fit(self, X, y):
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        if y.ndim == 1:
+            y = y[:, None]
+        exclude = self.exclude or [()] * y.shape[1]
+        if len(exclude) != y.shape[1]:
+            raise ValueError(f'exclude has {len(exclude)} entries for {y.shape[1]} targets')
+        self.n_features_in_ = X.shape[1]
+        self.n_outputs_ = y.shape[1]
+        self.columns_ = [np.setdiff1d(np.arange(X.shape[1]), np.asarray(drop, dtype=np.intp))
+                         for drop in exclude]
+        self.estimators_ = [clone(self.estimator).fit(X[:, columns], y[:, j])
+                            for j, columns in enumerate(self.columns_)]
+        return self
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        return np.column_stack([estimator.predict(X[:, columns])
+                                for estimator, columns in zip(self.estimators_, self.columns_)])
@@ -0,0 +1,138 @@
+# core/page_cache.py
+"""
+Cached aggregates and rendered fragments for the home, profile and dashboard pages.
+
+Entries live in the Django cache alias ``PAGE_CACHE['ALIAS']`` under
+versioned keys ``page:<KEY_VERSION>:<namespace>:<version>:<name>``. There are
+two kinds of namespace: ``global`` (site-wide figures on the landing page)
+and ``user:<id>`` (one user's profile and dashboard). Saving or deleting an
+``AgriculturalData`` row bumps the version of both namespaces it touches
+(``core.signals``, and ``core.batch.save_instances`` for bulk inserts), so
+every older key becomes unreachable at once and simply ages out.
+``KEY_VERSION`` changes whenever the shape of a cached value does, so new
+code never reads entries written by old code.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+KEY_VERSION = 1
+GLOBAL = 'global'
+DEFAULTS = {
+    'ENABLED': True,
+    'ALIAS': 'default',
+    'TTL': 300,
+}
+
+_MISSING = object()
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, 'PAGE_CACHE', {})}
+
+
+def enabled():
+    return _config()['ENABLED']
+
+
+def alias():
+    return _config()['ALIAS']
+
+
+def ttl():
+    return _config()['TTL'] if enabled() else 0
+
+
+def get_cache():
+    return caches[alias()]
+
+
+def user_namespace(user_id):
+    return f'user:{user_id}'
+
+
+def _version_key(namespace):
+    return f'page:{namespace}:version'
+
+
+def version(namespace):
+    """Current version of ``namespace``, created on first use."""
+    if not enabled():
+        return 0
+    cache = get_cache()
+    current = cache.get(_version_key(namespace))
+    if current is None:
+        # Seed from the clock rather than 1: if the counter is evicted, the
+        # new one still starts above every version already used in keys.
+        cache.add(_version_key(namespace), time.time_ns(), timeout=None)
+        current = cache.get(_version_key(namespace))
+    return current
+
+
+async def aversion(namespace):
+    if not enabled():
+        return 0
+    cache = get_cache()
+    current = await cache.aget(_version_key(namespace))
+    if current is None:
+        await cache.aadd(_version_key(namespace), time.time_ns(), timeout=None)
+        current = await cache.aget(_version_key(namespace))
+    return current
+
+
+def _key(namespace, current, name):
+    return f'page:{KEY_VERSION}:{namespace}:{current}:{name}'
+
+
+def get_or_set(namespace, name, compute):
+    """Return the cached value of ``name`` in ``namespace``, computing and storing it on a miss."""
+    if not enabled():
+        return compute()
+    cache = get_cache()
+    cache_key = _key(namespace, version(namespace), name)
+    value = cache.get(cache_key, _MISSING)
+    if value is _MISSING:
+        value = compute()
+        cache.set(cache_key, value, ttl())
+    return value
+
+
+async def aget_or_set(namespace, name, compute):
+    """Async :func:`get_or_set`; ``compute`` is a coroutine function."""
+    if not enabled():
+        return await compute()
+    cache = get_cache()
+    cache_key = _key(namespace, await aversion(namespace), name)
+    value = await cache.aget(cache_key, _MISSING)
+    if value is _MISSING:
+        value = await compute()
+        await cache.aset(cache_key, value, ttl())
+    return value
+
+
+def _bump(namespaces):
+    cache = get_cache()
+    for namespace in namespaces:
+        try:
+            cache.incr(_version_key(namespace))
+        except ValueError:
+            pass  # no version yet, so nothing has been cached under it
+
+
+def invalidate(*namespaces):
+    """
+    Make everything cached under ``namespaces`` unreachable.
+
+    Runs once the current transaction commits, so a request cannot re-cache
+    the old figures between the bump and the commit.
+    """
+    if enabled():
+        transaction.on_commit(lambda: _bump(namespaces))
+
+
+def invalidate_rows(instances):
+    """Invalidate the global namespace and that of every user owning one of ``instances``."""
+    user_ids = {instance.user_id for instance in instances}
+    invalidate(GLOBAL, *(user_namespace(user_id) for user_id in user_ids))
@@ -0,0 +1,221 @@
+# core/prediction_cache.py
+"""
+Prediction cache keyed on normalized feature vectors.
+
+Each row of a ``MODEL_FEATURES`` block is normalized (numbers rounded; text
+is kept exactly as the case-sensitive encoder sees it) and hashed together
+with the active model version, so resubmitting the same scenario skips inference and publishing a
+new model version naturally misses every old entry. Backends are selected
+with ``settings.PREDICTION_CACHE['BACKEND']``:
+
+* ``'locmem'`` – per-process LRU with TTL (default)
+* ``'django'`` – any alias from ``settings.CACHES``
+* ``'file'``   – Django's file-based cache in ``LOCATION``
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.filebased import FileBasedCache
+
+from .features import CATEGORICAL_FEATURES, MODEL_FEATURES
+from .inference import TARGETS
+from .registry import get_registry
+
+KEY_PREFIX = 'prediction'
+NUMERIC_PRECISION = 6
+DEFAULTS = {
+    'BACKEND': 'locmem',
+    'ALIAS': 'default',
+    'LOCATION': None,
+    'MAX_ENTRIES': 10000,
+    'TTL': 3600,
+}
+
+
+def _normalize(value, categorical):
+    if categorical:
+        return str(value)
+    return repr(round(float(value), NUMERIC_PRECISION) + 0.0)  # + 0.0 folds -0.0 into 0.0
+
+
+def feature_keys(features, version):
+    """One stable cache key per row of a ``MODEL_FEATURES`` block."""
+    categorical = [name in CATEGORICAL_FEATURES for name in MODEL_FEATURES]
+    rows = features[MODEL_FEATURES].to_numpy(dtype=object)
+    keys = []
+    for row in rows:
+        text = '\x1f'.join(_normalize(v, c) for v, c in zip(row, categorical))
+        digest = hashlib.blake2b(f'{version}\x1e{text}'.encode(), digest_size=16).hexdigest()
+        keys.append(f'{KEY_PREFIX}:{digest}')
+    return keys
+
+
+class LocalLRUBackend:
+    def __init__(self, max_entries=10000, ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry = self._data.get(key)
+                if entry is None:
+                    continue
+                expires, value = entry
+                if expires < now:
+                    del self._data[key]
+                    continue
+                self._data.move_to_end(key)
+                found[key] = value
+        return found
+
+    def set_many(self, mapping):
+        expires = time.monotonic() + self.ttl
+        with self._lock:
+            for key, value in mapping.items():
+                self._data[key] = (expires, value)
+                self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class DjangoCacheBackend:
+    """Adapter over a Django cache (shared between workers where the backend is)."""
+
+    def __init__(self, cache, ttl=3600):
+        self.cache = cache
+        self.ttl = ttl
+
+    def get_many(self, keys):
+        return self.cache.get_many(keys)
+
+    def set_many(self, mapping):
+        self.cache.set_many(mapping, timeout=self.ttl)
+
+    def clear(self):
+        # Keys embed the model version, so stale entries simply expire; the
+        # shared cache may hold unrelated data and is never flushed here.
+        pass
+
+
+class PredictionCache:
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def lookup(self, features, version):
+        """
+        Return ``(keys, cached, missing)``: the row keys, a ``{position: entry}``
+        dict of hits and the positions that still need scoring.
+        """
+        keys = feature_keys(features, version)
+        found = self.backend.get_many(keys)
+        cached, missing, saved = {}, [], 0.0
+        for position, key in enumerate(keys):
+            entry = found.get(key)
+            if entry is None:
+                missing.append(position)
+            else:
+                cached[position] = entry
+                saved += entry['cost']
+        with self._lock:
+            self.hits += len(cached)
+            self.misses += len(missing)
+            self.saved_seconds += saved
+        return keys, cached, missing
+
+    def store(self, keys, positions, outputs, elapsed):
+        """Cache freshly scored rows; ``outputs`` is aligned with ``positions``."""
+        if not positions:
+            return
+        cost = elapsed / len(positions)
+        columns = {name: outputs[name].tolist() for name in TARGETS}
+        self.backend.set_many({
+            keys[position]: dict({name: columns[name][i] for name in TARGETS}, cost=cost)
+            for i, position in enumerate(positions)
+        })
+
+    def cached_predict(self, features, version, predict_fn):
+        """Score ``features``, calling ``predict_fn`` only for rows not in the cache."""
+        keys, cached, missing = self.lookup(features, version)
+        if not missing:
+            return self.assemble(len(features), cached, missing, None)
+        started = time.perf_counter()
+        subset = features if len(missing) == len(features) else features.iloc[missing]
+        outputs = predict_fn(subset)
+        self.store(keys, missing, outputs, time.perf_counter() - started)
+        return self.assemble(len(features), cached, missing, outputs)
+
+    @staticmethod
+    def assemble(n, cached, missing, outputs):
+        result = {name: np.empty(n, dtype=np.float64) for name in TARGETS}
+        for position, entry in cached.items():
+            for name in TARGETS:
+                result[name][position] = entry[name]
+        if missing:
+            for name in TARGETS:
+                result[name][missing] = outputs[name]
+        return result
+
+    def clear(self):
+        self.backend.clear()
+
+    def metrics(self):
+        total = self.hits + self.misses
+        return {
+            'backend': type(self.backend).__name__,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / total if total else 0.0,
+            'saved_inference_seconds': round(self.saved_seconds, 6),
+        }
+
+
+def build_backend(config):
+    kind = config['BACKEND']
+    if kind == 'locmem':
+        return LocalLRUBackend(max_entries=config['MAX_ENTRIES'], ttl=config['TTL'])
+    if kind == 'django':
+        return DjangoCacheBackend(caches[config['ALIAS']], ttl=config['TTL'])
+    if kind == 'file':
+        location = config['LOCATION'] or str(settings.BASE_DIR / 'cache' / 'predictions')
+        cache = FileBasedCache(location, {
+            'TIMEOUT': config['TTL'],
+            'OPTIONS': {'MAX_ENTRIES': config['MAX_ENTRIES']},
+        })
+        return DjangoCacheBackend(cache, ttl=config['TTL'])
+    raise ValueError(f'Unknown prediction cache backend {kind!r}')
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_prediction_cache():
+    """Process-wide prediction cache, or ``None`` when disabled in settings."""
+    global _cache
+    config = dict(DEFAULTS, **getattr(settings, 'PREDICTION_CACHE', {}))
+    if not config.get('ENABLED', True):
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = PredictionCache(build_backend(config))
+                get_registry().on_change(lambda loaded: _cache.clear())
+    return _cache
@@ -0,0 +1,297 @@
+# core/registry.py
+"""
+Versioned model registry.
+
+Artifacts live under ``settings.MODEL_REGISTRY_DIR``::
+
+    models/
+        CURRENT                      <- name of the active version
+        versions/<version>/model.joblib
+        versions/<version>/metadata.json
+        versions/<version>/<attachment>  <- optional extra files (e.g. reservoir.joblib)
+        agricultural_model.pkl       <- legacy single-file artifact (fallback)
+
+Nothing is loaded at import time. The first call to ``get()`` unpickles the
+active version (memory-mapping its NumPy arrays when ``MODEL_MMAP_MODE`` is
+set, so forked workers share the pages through the OS page cache), and later
+calls re-check the ``CURRENT`` pointer at most every
+``MODEL_RELOAD_INTERVAL`` seconds. Publishing a new version writes it to its
+own directory and then swaps the pointer with ``os.replace``, so running
+workers pick it up without a restart and never see a half-written artifact.
+"""
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+import joblib
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+CURRENT_POINTER = 'CURRENT'
+VERSIONS_DIR = 'versions'
+ARTIFACT_NAME = 'model.joblib'
+METADATA_NAME = 'metadata.json'
+LEGACY_ARTIFACT = 'agricultural_model.pkl'
+LEGACY_VERSION = 'legacy'
+
+
+class ModelNotAvailable(Exception):
+    """Raised when no model artifact has been published yet."""
+
+
+@dataclass
+class LoadedModel:
+    version: str
+    estimator: object
+    path: str
+    metadata: dict = field(default_factory=dict)
+    load_seconds: float = 0.0
+    resident_bytes: int = 0
+    loaded_at: float = 0.0
+
+    def describe(self):
+        return {
+            'version': self.version,
+            'path': self.path,
+            'load_seconds': round(self.load_seconds, 4),
+            'resident_bytes': self.resident_bytes,
+            'loaded_at': datetime.fromtimestamp(self.loaded_at, timezone.utc).isoformat(),
+            'metadata': self.metadata,
+        }
+
+
+def _rss_bytes():
+    """Resident set size of this process, or 0 where it cannot be read."""
+    try:
+        with open('/proc/self/statm') as fh:
+            return int(fh.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except (ImportError, OSError):
+        return 0
+
+
+class ModelRegistry:
+    def __init__(self, root, mmap_mode='r', reload_interval=5.0):
+        self.root = str(root)
+        self.mmap_mode = mmap_mode or None
+        self.reload_interval = reload_interval
+        self._active = None
+        self._pointer_state = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._history = {}
+        self._listeners = []
+
+    # ------------------------------------------------------------------ paths
+    def version_dir(self, version):
+        return os.path.join(self.root, VERSIONS_DIR, version)
+
+    def _pointer_path(self):
+        return os.path.join(self.root, CURRENT_POINTER)
+
+    def _read_pointer(self):
+        """Return ``(version, artifact_path, stat_key)`` for the active artifact."""
+        pointer = self._pointer_path()
+        try:
+            st = os.stat(pointer)
+            with open(pointer) as fh:
+                version = fh.read().strip()
+            if version:
+                path = os.path.join(self.version_dir(version), ARTIFACT_NAME)
+                return version, path, (st.st_mtime_ns, st.st_ino, version)
+        except OSError:
+            pass
+        legacy = os.path.join(self.root, LEGACY_ARTIFACT)
+        try:
+            st = os.stat(legacy)
+        except OSError:
+            return None, None, None
+        return LEGACY_VERSION, legacy, (st.st_mtime_ns, st.st_ino, LEGACY_VERSION)
+
+    # ---------------------------------------------------------------- loading
+    def get(self):
+        """Return the active :class:`LoadedModel`, loading or reloading it if needed."""
+        active = self._active
+        now = time.monotonic()
+        if active is not None and now - self._checked_at < self.reload_interval:
+            return active
+
+        with self._lock:
+            self._checked_at = time.monotonic()
+            version, path, state = self._read_pointer()
+            if version is None:
+                if self._active is not None:
+                    return self._active
+                raise ModelNotAvailable(
+                    f'No model artifact found in {self.root}. '
+                    f'Publish a version or copy {LEGACY_ARTIFACT} there first.'
+                )
+            if self._active is None or state != self._pointer_state:
+                try:
+                    loaded = self._load(version, path)
+                except ModelNotAvailable:
+                    if self._active is None:
+                        raise
+                    logger.warning('Keeping model %s: %s is missing', self._active.version, path)
+                    return self._active
+                self._active = loaded
+                self._pointer_state = state
+                for listener in list(self._listeners):
+                    listener(self._active)
+            return self._active
+
+    def _artifact_path(self, version):
+        if version == LEGACY_VERSION:
+            path = os.path.join(self.root, LEGACY_ARTIFACT)
+        else:
+            path = os.path.join(self.version_dir(version), ARTIFACT_NAME)
+        if not os.path.exists(path):
+            raise ValueError(f'Unknown model version {version!r}')
+        return path
+
+    def load(self, version):
+        """Load a specific version without activating it."""
+        return self._load(version, self._artifact_path(version))
+
+    def read_estimator(self, version):
+        """Unpickle ``version`` fully into memory (writable, not memory-mapped), e.g. to train it further."""
+        return joblib.load(self._artifact_path(version))
+
+    def _load(self, version, path):
+        rss_before = _rss_bytes()
+        started = time.perf_counter()
+        try:
+            estimator = joblib.load(path, mmap_mode=self.mmap_mode)
+        except FileNotFoundError:
+            # e.g. CURRENT names a version directory that has been deleted
+            raise ModelNotAvailable(f'Model version {version!r} has no artifact at {path}')
+        elapsed = time.perf_counter() - started
+        resident = max(_rss_bytes() - rss_before, 0)
+
+        metadata = {}
+        meta_path = os.path.join(os.path.dirname(path), METADATA_NAME)
+        if version != LEGACY_VERSION and os.path.exists(meta_path):
+            with open(meta_path) as fh:
+                metadata = json.load(fh)
+
+        loaded = LoadedModel(
+            version=version,
+            estimator=estimator,
+            path=path,
+            metadata=metadata,
+            load_seconds=elapsed,
+            resident_bytes=resident,
+            loaded_at=time.time(),
+        )
+        self._history[version] = loaded.describe()
+        logger.info(
+            'Loaded model %s in %.3fs (%.1f MiB resident)',
+            version, elapsed, resident / 2 ** 20,
+        )
+        return loaded
+
+    def reload(self):
+        """Force the next ``get()`` to re-read the pointer."""
+        self._checked_at = 0.0
+        return self.get()
+
+    def on_change(self, callback):
+        """Register ``callback(loaded_model)`` to run whenever a version is (re)loaded."""
+        self._listeners.append(callback)
+
+    @property
+    def active_version(self):
+        return self._active.version if self._active is not None else None
+
+    def stats(self):
+        """Load time and resident size of every version loaded by this process."""
+        return list(self._history.values())
+
+    # ------------------------------------------------------------- publishing
+    def versions(self):
+        base = os.path.join(self.root, VERSIONS_DIR)
+        if not os.path.isdir(base):
+            return []
+        return sorted(
+            name for name in os.listdir(base)
+            if os.path.exists(os.path.join(base, name, ARTIFACT_NAME))
+        )
+
+    def read_metadata(self, version):
+        path = os.path.join(self.version_dir(version), METADATA_NAME)
+        if not os.path.exists(path):
+            return {}
+        with open(path) as fh:
+            return json.load(fh)
+
+    def read_attachment(self, version, name):
+        """An object stored with ``publish(attachments=...)``, or None."""
+        path = os.path.join(self.version_dir(version), name)
+        return joblib.load(path) if os.path.exists(path) else None
+
+    def publish(self, estimator, metadata=None, version=None, activate=True, attachments=None):
+        """
+        Write ``estimator`` as a new version and (optionally) make it active.
+
+        ``attachments`` maps file names to objects stored next to the artifact.
+        """
+        version = version or datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%fZ')
+        target = self.version_dir(version)
+        if os.path.exists(target):
+            raise ValueError(f'Model version {version!r} already exists')
+
+        os.makedirs(os.path.join(self.root, VERSIONS_DIR), exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=f'.{version}-', dir=os.path.join(self.root, VERSIONS_DIR))
+        # Uncompressed so the arrays can be memory-mapped on load.
+        joblib.dump(estimator, os.path.join(staging, ARTIFACT_NAME))
+        metadata = dict(metadata or {})
+        metadata.setdefault('version', version)
+        metadata.setdefault('created_at', datetime.now(timezone.utc).isoformat())
+        with open(os.path.join(staging, METADATA_NAME), 'w') as fh:
+            json.dump(metadata, fh, indent=2, default=str)
+        for name, value in (attachments or {}).items():
+            joblib.dump(value, os.path.join(staging, name))
+        os.rename(staging, target)
+
+        if activate:
+            self.activate(version)
+        return version
+
+    def activate(self, version):
+        """Atomically point ``CURRENT`` at an existing version."""
+        if not os.path.exists(os.path.join(self.version_dir(version), ARTIFACT_NAME)):
+            raise ValueError(f'Unknown model version {version!r}')
+        fd, tmp = tempfile.mkstemp(prefix='.CURRENT-', dir=self.root)
+        with os.fdopen(fd, 'w') as fh:
+            fh.write(version)
+        os.replace(tmp, self._pointer_path())
+        self._checked_at = 0.0
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Process-wide registry configured from settings."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry(
+                    root=getattr(settings, 'MODEL_REGISTRY_DIR',
+                                 os.path.join(settings.BASE_DIR, 'core', 'models')),
+                    mmap_mode=getattr(settings, 'MODEL_MMAP_MODE', 'r'),
+                    reload_interval=getattr(settings, 'MODEL_RELOAD_INTERVAL', 5.0),
+                )
+    return _registry
@@ -0,0 +1,183 @@
+# core/scenarios.py
+"""
+What-if sweeps around one prediction.
+
+A sweep takes a base record and a few axes (e.g. rainfall -30%..0%,
+transport cost x1..x2, every policy flag), expands their Cartesian product
+column-wise with ``np.repeat``/``np.tile`` and scores every grid point in a
+single ``predict`` call. Nothing is written to the database.
+
+Axis spec, per field::
+
+    {"start": -30, "stop": 0, "num": 7, "mode": "relative"}   # percent change
+    {"values": [-2, 0, 2], "mode": "absolute"}                # added to base
+    {"values": [900, 1000], "mode": "value"}                  # used as is
+    ["None", "Subsidy", "Tariff"]                             # policy_flag
+"""
+import math
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from .batch import FIELD_BOUNDS
+from .features import INPUT_FIELDS, build_features
+from .inference import TARGETS, predict_features
+from .instrumentation import timed
+
+# Sweepable numeric fields and the mode used when a spec does not give one
+NUMERIC_SWEEP_FIELDS = {
+    'rainfall_mm': 'relative',
+    'temperature_c': 'absolute',
+    'transport_cost_usd': 'relative',
+    'price_usd_per_tonne': 'relative',
+    'area_harvested_ha': 'relative',
+    'production_tonnes': 'relative',
+    'demand_supply_gap': 'absolute',
+    'year': 'absolute',
+}
+CATEGORICAL_SWEEP_FIELDS = ['policy_flag']
+MODES = ('relative', 'absolute', 'value')
+MAX_AXIS_POINTS = 1000
+QUANTILES = [5, 25, 50, 75, 95]
+
+
+class SweepError(ValueError):
+    pass
+
+
+@dataclass
+class Axis:
+    field: str
+    mode: str
+    steps: np.ndarray
+
+    def __len__(self):
+        return len(self.steps)
+
+    def apply(self, base_value):
+        """Column values along this axis for a scalar base value."""
+        if self.mode == 'relative':
+            return base_value * (1.0 + self.steps / 100.0)
+        if self.mode == 'absolute':
+            return base_value + self.steps
+        return self.steps
+
+    def describe(self):
+        return {'field': self.field, 'mode': self.mode, 'steps': self.steps.tolist()}
+
+
+def _check_length(field, values):
+    if len(values) > MAX_AXIS_POINTS:
+        raise SweepError(f'{field}: at most {MAX_AXIS_POINTS} values per axis')
+
+
+def _numeric_steps(field, spec):
+    if 'values' in spec:
+        if not isinstance(spec['values'], list):
+            raise SweepError(f'{field}: values must be a non-empty list of numbers')
+        _check_length(field, spec['values'])
+        try:
+            steps = np.asarray(spec['values'], dtype=np.float64)
+        except (TypeError, ValueError):
+            raise SweepError(f'{field}: values must be a non-empty list of numbers')
+    else:
+        try:
+            num = int(spec.get('num', 5))
+            start, stop = float(spec['start']), float(spec['stop'])
+        except (KeyError, TypeError, ValueError):
+            raise SweepError(f'{field}: give "values" or numeric "start", "stop" and "num"')
+        if not 1 <= num <= MAX_AXIS_POINTS:
+            raise SweepError(f'{field}: "num" must be between 1 and {MAX_AXIS_POINTS}')
+        steps = np.linspace(start, stop, num)
+    if steps.ndim != 1 or not len(steps) or not np.isfinite(steps).all():
+        raise SweepError(f'{field}: values must be a non-empty list of numbers')
+    return steps
+
+
+def parse_axes(spec):
+    """Validate an ``{field: axis spec}`` mapping into a list of :class:`Axis`."""
+    if not isinstance(spec, dict) or not spec:
+        raise SweepError('"axes" must be a non-empty object')
+    axes = []
+    for field, axis_spec in spec.items():
+        if field in CATEGORICAL_SWEEP_FIELDS:
+            values = axis_spec.get('values') if isinstance(axis_spec, dict) else axis_spec
+            if not isinstance(values, list) or not values:
+                raise SweepError(f'{field}: expected a list of values')
+            _check_length(field, values)
+            axes.append(Axis(field, 'value', np.asarray([str(v) for v in values], dtype=object)))
+        elif field in NUMERIC_SWEEP_FIELDS:
+            if isinstance(axis_spec, list):
+                axis_spec = {'values': axis_spec}
+            if not isinstance(axis_spec, dict):
+                raise SweepError(f'{field}: expected an object or a list')
+            mode = axis_spec.get('mode', NUMERIC_SWEEP_FIELDS[field])
+            if mode not in MODES:
+                raise SweepError(f'{field}: mode must be one of {", ".join(MODES)}')
+            axes.append(Axis(field, mode, _numeric_steps(field, axis_spec)))
+        else:
+            raise SweepError(f'{field} cannot be swept')
+    return axes
+
+
+def grid_shape(axes):
+    return tuple(len(axis) for axis in axes)
+
+
+def grid_points(axes):
+    # Python ints: np.prod would wrap around in int64 for large grids
+    return math.prod(grid_shape(axes))
+
+
+def expand_grid(base, axes):
+    """
+    One row per grid point, in C order of :func:`grid_shape`, as a DataFrame
+    of model field names. ``base`` maps field -> value for the fixed inputs.
+    """
+    shape = grid_shape(axes)
+    n = math.prod(shape)
+    columns = {}
+    for field in INPUT_FIELDS:
+        value = base.get(field)
+        if isinstance(value, str) or value is None:
+            columns[field] = np.full(n, value, dtype=object)
+        else:
+            columns[field] = np.full(n, float(value), dtype=np.float64)
+    for k, axis in enumerate(axes):
+        inner = math.prod(shape[k + 1:])
+        outer = math.prod(shape[:k])
+        values = axis.apply(base.get(axis.field))
+        if axis.field in NUMERIC_SWEEP_FIELDS:
+            low, high = FIELD_BOUNDS.get(axis.field, (None, None))
+            values = np.clip(values, -np.inf if low is None else low,
+                             np.inf if high is None else high)
+        columns[axis.field] = np.tile(np.repeat(values, inner), outer)
+    return pd.DataFrame(columns, copy=False)
+
+
+def run_sweep(base, axes, loaded=None):
+    """Score the whole grid in one model call; returns target -> flat array."""
+    features = build_features(expand_grid(base, axes))
+    with timed('inference'):
+        return predict_features(features, loaded=loaded)
+
+
+def summarize(outputs, axes, targets=TARGETS):
+    """Quantiles over the grid and, per axis, the mean over all other axes."""
+    shape = grid_shape(axes)
+    summary = {}
+    for target in targets:
+        values = outputs[target]
+        grid = values.reshape(shape)
+        summary[target] = {
+            'min': float(values.min()),
+            'max': float(values.max()),
+            'mean': float(values.mean()),
+            'quantiles': dict(zip(map(str, QUANTILES), np.percentile(values, QUANTILES).tolist())),
+            'marginals': {
+                axis.field: grid.mean(axis=tuple(j for j in range(len(shape)) if j != k)).tolist()
+                for k, axis in enumerate(axes)
+            },
+        }
+    return summary
@@ -0,0 +1,33 @@
+# core/signals.py
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import page_cache, stats
+from .models import AgriculturalData
+
+
+@receiver(pre_save, sender=AgriculturalData)
+def remember_previous_version(sender, instance, raw=False, **kwargs):
+    # Updates must subtract the stored row's old contribution before adding the new one.
+    instance._stats_previous = None
+    if not raw and instance.pk and not instance._state.adding:
+        instance._stats_previous = sender.objects.filter(pk=instance.pk).first()
+
+
+@receiver(post_save, sender=AgriculturalData)
+def update_stats_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_stats_previous', None)
+    if previous is not None:
+        stats.record([previous], sign=-1)
+    stats.record([instance])
+    page_cache.invalidate_rows([instance])
+
+
+@receiver(post_delete, sender=AgriculturalData)
+def update_stats_on_delete(sender, instance, origin=None, **kwargs):
+    # Rows removed because their user was deleted take the user's aggregates with them
+    if origin is None or getattr(origin, 'model', type(origin)) is sender:
+        stats.record([instance], sign=-1)
+    page_cache.invalidate_rows([instance])
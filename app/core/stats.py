@@ -0,0 +1,189 @@
+# core/stats.py
+"""
+Incrementally maintained per-user prediction statistics.
+
+``record()`` applies the contribution of saved/deleted ``AgriculturalData``
+rows to ``UserPredictionStats``, ``CropPredictionStats`` and
+``DailyPredictionStats`` with ``F()`` increments. It is called from the
+model signals in ``core.signals`` and explicitly after ``bulk_create`` (which
+sends no signals). ``rebuild()`` recomputes everything from scratch.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import (CropPredictionStats, DailyPredictionStats,
+                     UserPredictionStats)
+
+WINDOW_DAYS = 30
+SUM_FIELDS = {
+    'sum_production': 'predicted_production',
+    'sum_yield': 'predicted_yield',
+    'sum_price': 'predicted_price',
+}
+
+
+def _day(created_at):
+    if created_at is None:
+        created_at = timezone.now()
+    if timezone.is_aware(created_at):
+        created_at = timezone.localtime(created_at)
+    return created_at.date()
+
+
+def _contribution(instance):
+    scored = instance.predicted_production is not None
+    return {
+        'count': 1,
+        'scored_count': 1 if scored else 0,
+        **{total: (getattr(instance, field) or 0.0) if scored else 0.0
+           for total, field in SUM_FIELDS.items()},
+    }
+
+
+def _add(target, delta, sign):
+    for key, value in delta.items():
+        target[key] += sign * value
+
+
+def _apply(model, lookup, delta):
+    if not any(delta.values()):
+        return
+    obj, _ = model.objects.get_or_create(**lookup)
+    model.objects.filter(pk=obj.pk).update(
+        **{field: F(field) + value for field, value in delta.items()}
+    )
+
+
+def record(instances, sign=1):
+    """Add (``sign=1``) or remove (``sign=-1``) the rows' contribution to the stats."""
+    per_user = defaultdict(lambda: defaultdict(int))
+    per_crop = defaultdict(int)
+    per_day = defaultdict(lambda: defaultdict(int))
+    for instance in instances:
+        delta = _contribution(instance)
+        _add(per_user[instance.user_id], delta, sign)
+        per_crop[(instance.user_id, instance.crop)] += sign
+        _add(per_day[(instance.user_id, _day(instance.created_at))], delta, sign)
+
+    with transaction.atomic():
+        for user_id, delta in per_user.items():
+            _apply(UserPredictionStats, {'user_id': user_id}, dict(delta))
+        for (user_id, crop), count in per_crop.items():
+            _apply(CropPredictionStats, {'user_id': user_id, 'crop': crop}, {'count': count})
+        for (user_id, day), delta in per_day.items():
+            _apply(DailyPredictionStats, {'user_id': user_id, 'day': day}, dict(delta))
+
+
+def _zero_nulls(row):
+    return {key: 0 if value is None else value for key, value in row.items()}
+
+
+def rebuild(user_ids=None, apps=None):
+    """
+    Recompute all aggregates (optionally only for ``user_ids``) from ``AgriculturalData``.
+
+    Migrations pass their historical ``apps`` registry so the models match
+    the schema at that point.
+    """
+    if apps is not None:
+        AgriculturalData, UserPredictionStats, CropPredictionStats, DailyPredictionStats = (
+            apps.get_model('core', name) for name in (
+                'AgriculturalData', 'UserPredictionStats',
+                'CropPredictionStats', 'DailyPredictionStats'))
+    else:
+        from .models import (AgriculturalData, CropPredictionStats,
+                             DailyPredictionStats, UserPredictionStats)
+    rows = AgriculturalData.objects.order_by()
+    if user_ids is not None:
+        rows = rows.filter(user_id__in=user_ids)
+    scored = rows.filter(predicted_production__isnull=False)
+    sums = {total: Sum(field) for total, field in SUM_FIELDS.items()}
+
+    with transaction.atomic():
+        for model in (UserPredictionStats, CropPredictionStats, DailyPredictionStats):
+            stale = model.objects.all()
+            if user_ids is not None:
+                stale = stale.filter(user_id__in=user_ids)
+            stale.delete()
+
+        users = {r['user_id']: r for r in rows.values('user_id').annotate(count=Count('id'))}
+        for r in scored.values('user_id').annotate(scored_count=Count('id'), **sums):
+            users[r['user_id']].update(r)
+        UserPredictionStats.objects.bulk_create([
+            UserPredictionStats(**_zero_nulls(r))
+            for r in users.values()
+        ], batch_size=1000)
+
+        CropPredictionStats.objects.bulk_create([
+            CropPredictionStats(**r)
+            for r in rows.values('user_id', 'crop').annotate(count=Count('id'))
+        ], batch_size=1000)
+
+        days = {
+            (r['user_id'], r['day']): r
+            for r in rows.annotate(day=TruncDate('created_at'))
+                         .values('user_id', 'day').annotate(count=Count('id'))
+        }
+        for r in (scored.annotate(day=TruncDate('created_at'))
+                        .values('user_id', 'day').annotate(scored_count=Count('id'), **sums)):
+            days[(r['user_id'], r['day'])].update(r)
+        DailyPredictionStats.objects.bulk_create([
+            DailyPredictionStats(**_zero_nulls(r))
+            for r in days.values()
+        ], batch_size=1000)
+    return len(users)
+
+
+def _averages(scored_count, totals):
+    if not scored_count:
+        return {'avg_production': None, 'avg_yield': None, 'avg_price': None}
+    return {
+        'avg_production': totals['sum_production'] / scored_count,
+        'avg_yield': totals['sum_yield'] / scored_count,
+        'avg_price': totals['sum_price'] / scored_count,
+    }
+
+
+def _summary_queries(user, days):
+    since = timezone.localdate() - timedelta(days=days - 1)
+    overall = UserPredictionStats.objects.filter(user=user).values('count')
+    window = DailyPredictionStats.objects.filter(user=user, day__gte=since)
+    aggregates = dict(count=Sum('count'), scored_count=Sum('scored_count'),
+                      **{field: Sum(field) for field in SUM_FIELDS})
+    return overall, window, aggregates
+
+
+def _summary(overall, window):
+    return {
+        'total_count': overall['count'] if overall else 0,
+        'count': window['count'] or 0,
+        **_averages(window['scored_count'], window),
+    }
+
+
+def user_summary(user, days=WINDOW_DAYS):
+    """
+    All-time count plus the ``days``-day count and averages for ``user``.
+
+    The window is bucketed by calendar day, so it covers today and the
+    previous ``days - 1`` days.
+    """
+    overall, window, aggregates = _summary_queries(user, days)
+    return _summary(overall.first(), window.aggregate(**aggregates))
+
+
+async def auser_summary(user, days=WINDOW_DAYS):
+    """Async :func:`user_summary`, using the async ORM."""
+    overall, window, aggregates = _summary_queries(user, days)
+    return _summary(await overall.afirst(), await window.aaggregate(**aggregates))
+
+
+def favorite_crop(user):
+    """``{'crop': ..., 'count': ...}`` for the user's most-predicted crop, or ``None``."""
+    return (CropPredictionStats.objects.filter(user=user, count__gt=0)
+            .order_by('-count').values('crop', 'count').first())
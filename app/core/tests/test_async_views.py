@@ -0,0 +1,73 @@
+import asyncio
+import json
+import threading
+
+from asgiref.sync import sync_to_async
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from core import executors, stats
+from core.executors import ExecutorBusy, run_cpu
+
+from .utils import INPUTS, IsolatedTestCase, make_row
+
+
+def reset_executor():
+    if executors._executor is not None:
+        executors._executor.shutdown(wait=True)
+    executors._executor = executors._slots = executors._pid = None
+
+
+class RunCpuTests(SimpleTestCase):
+    def setUp(self):
+        reset_executor()
+        self.addCleanup(reset_executor)
+
+    async def test_calls_run_off_the_event_loop(self):
+        loop_thread = threading.get_ident()
+        self.assertNotEqual(await run_cpu(threading.get_ident), loop_thread)
+        self.assertEqual(await run_cpu(sum, [1, 2], start=3), 6)
+
+    @override_settings(INFERENCE_EXECUTOR_WORKERS=1, INFERENCE_EXECUTOR_MAX_PENDING=1)
+    async def test_overload_raises_executor_busy(self):
+        release = threading.Event()
+        busy = asyncio.ensure_future(run_cpu(release.wait, 5))
+        await asyncio.sleep(0)
+        with self.assertRaises(ExecutorBusy):
+            await run_cpu(int)
+        release.set()
+        self.assertTrue(await busy)
+        self.assertEqual(await run_cpu(int), 0)  # the slot is free again
+
+
+class AsyncViewTests(IsolatedTestCase):
+    model_targets = ('yield',)
+
+    def setUp(self):
+        super().setUp()
+        reset_executor()
+        self.addCleanup(reset_executor)
+        self.user = self.login()
+        self.row = make_row(self.user)
+        self.async_client.force_login(self.user)
+
+    async def test_dashboard_and_detail(self):
+        response = await self.async_client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Maize')
+        response = await self.async_client.get(reverse('prediction_detail', args=[self.row.pk]))
+        self.assertEqual(response.status_code, 200)
+        response = await self.async_client.get(reverse('prediction_detail', args=[self.row.pk + 1]))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_stats_match_the_sync_summary(self):
+        response = await self.async_client.get(reverse('prediction_stats'))
+        expected = await sync_to_async(stats.user_summary)(self.user)
+        self.assertEqual(response.json()['count'], expected['count'])
+        self.assertEqual(response.json()['avg_production'], expected['avg_production'])
+
+    async def test_batch_answers_503_when_the_executor_is_full(self):
+        with override_settings(INFERENCE_EXECUTOR_MAX_PENDING=0):
+            response = await self.async_client.post(
+                reverse('predict_batch'), json.dumps([INPUTS]), content_type='application/json')
+        self.assertEqual(response.status_code, 503)
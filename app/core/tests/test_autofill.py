@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from core.autofill import AUTOFILL_COLUMNS, AutofillIndex, build_index
+from core.feature_store import FeatureStore
+
+from .utils import DATA_PATH, IsolatedTestCase, dataset_sample
+
+
+def history():
+    return pd.DataFrame({
+        'Country': ['Kenya'] * 3 + ['Ghana'],
+        'Crop': ['Maize'] * 3 + ['Rice'],
+        'Year': [2012, 2010, 2015, 2011],
+        'Area_harvested_ha': [20.0, 10.0, np.nan, 5.0],
+        'Production_tonnes': [40.0, 30.0, 50.0, 6.0],
+        'Price_USD_per_tonne': [300.0, np.nan, 320.0, 250.0],
+        'Rainfall_mm': [60.0, 55.0, 58.0, 90.0],
+        'Temperature_C': [21.0, 22.0, 23.0, 27.0],
+        'Transport_Cost_USD': [100.0, 90.0, 110.0, 70.0],
+    })
+
+
+class AutofillIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = AutofillIndex(build_index(history()))
+
+    def test_latest_year_at_or_before_with_forward_fill(self):
+        latest = self.index.suggest('Kenya', 'Maize')
+        self.assertEqual(latest['source_year'], 2015)
+        self.assertEqual(latest['area_harvested_ha'], 20.0)  # carried forward from 2012
+        self.assertEqual(self.index.suggest(' Kenya ', 'Maize', 2013)['source_year'], 2012)
+
+    def test_years_before_the_record_have_no_suggestion(self):
+        self.assertIsNone(self.index.suggest('Kenya', 'Maize', 2009))
+        earliest = self.index.suggest('Kenya', 'Maize', 2010)
+        self.assertEqual(earliest['source_year'], 2010)
+        self.assertIsNone(earliest['price_usd_per_tonne'])
+
+    def test_unknown_partition(self):
+        self.assertIsNone(self.index.suggest('Kenya', 'Rice'))
+        self.assertEqual(len(self.index), 2)
+
+
+class FeatureStoreAgreementTests(IsolatedTestCase):
+    def test_suggestions_exist_exactly_where_the_store_has_a_row(self):
+        store = FeatureStore(f'{self.tmp}/store', reload_interval=0)
+        store.ingest_csv(DATA_PATH)
+        index = AutofillIndex(build_index(store.to_frame(['Country', 'Crop', 'Year'] + AUTOFILL_COLUMNS)))
+        frame = dataset_sample(20)
+        for country, crop, year in zip(frame['Country'], frame['Crop'], frame['Year']):
+            for probe in (year - 100, year, None):
+                with self.subTest(country=country, crop=crop, year=probe):
+                    row = store.lookup(country, crop, probe)
+                    suggestion = index.suggest(country, crop, probe)
+                    self.assertEqual(suggestion is None, row is None)
+                    if row is not None:
+                        self.assertEqual(suggestion['source_year'], int(row['Year']))
+
+
+class AutofillViewTests(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.login()
+        self.source = f'{self.tmp}/history.csv'
+        history().to_csv(self.source, index=False)
+
+    def test_suggestions_from_the_dataset_csv(self):
+        with override_settings(FEATURE_STORE_SOURCE=self.source):
+            response = self.client.get(reverse('autofill'), {'country': 'Ghana', 'crop': 'Rice'})
+        body = response.json()
+        self.assertTrue(body['found'])
+        self.assertEqual(body['values']['production_tonnes'], 6.0)
+
+    def test_bad_requests(self):
+        self.assertEqual(self.client.get(reverse('autofill'), {'country': 'Ghana'}).status_code, 400)
+        response = self.client.get(reverse('autofill'), {'country': 'Ghana', 'crop': 'Rice', 'year': 'x'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_missing_history_is_unavailable(self):
+        with override_settings(FEATURE_STORE_SOURCE=f'{self.tmp}/missing.csv'):
+            response = self.client.get(reverse('autofill'), {'country': 'Ghana', 'crop': 'Rice'})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json(), {'error': 'Autofill history is not available'})
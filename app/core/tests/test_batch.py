@@ -0,0 +1,96 @@
+import json
+
+import pandas as pd
+from django.urls import reverse
+
+from core.batch import predict_batch, validate_and_score, validate_frame
+from core.models import AgriculturalData, UserPredictionStats
+
+from .utils import INPUTS, IsolatedTestCase
+
+
+class ValidateFrameTests(IsolatedTestCase):
+    def test_errors_name_the_rejected_rows(self):
+        frame = pd.DataFrame([
+            INPUTS,
+            dict(INPUTS, year=1999, area_harvested_ha=-1),
+            dict(INPUTS, rainfall_mm='lots', country=' '),
+            dict(INPUTS, year=2020.5),
+            INPUTS,
+        ])
+        valid, errors = validate_frame(frame)
+
+        self.assertEqual(list(valid.index), [0, 4])
+        self.assertEqual(valid['year'].dtype, 'int64')
+        self.assertEqual(errors, [
+            {'row': 1, 'errors': {
+                'year': 'Year must be between 2000 and 2100',
+                'area_harvested_ha': 'Ensure this value is greater than or equal to 0.',
+            }},
+            {'row': 2, 'errors': {'country': 'This field is required.', 'rainfall_mm': 'Enter a number.'}},
+            {'row': 3, 'errors': {'year': 'Enter a whole number.'}},
+        ])
+
+    def test_dataset_columns_and_optional_fields(self):
+        frame = pd.DataFrame([{
+            'Country': 'Kenya', 'Crop': 'Rice', 'Year': 2021, 'Area_harvested_ha': 5,
+            'Production_tonnes': 10, 'Rainfall_mm': 40, 'Temperature_C': 25,
+            'Price_USD_per_tonne': 300, 'Transport_Cost_USD': 50, 'Demand_Supply_Gap': 0,
+        }])
+        valid, errors = validate_frame(frame)
+        self.assertEqual(errors, [])
+        row = valid.iloc[0]
+        self.assertEqual((row['crop'], row['policy_flag'], row['productivity_index']), ('Rice', '', 0.0))
+
+    def test_missing_required_column_rejects_every_row(self):
+        valid, errors = validate_frame(pd.DataFrame([INPUTS, INPUTS]).drop(columns='crop'))
+        self.assertTrue(valid.empty)
+        self.assertEqual([e['errors'] for e in errors], [{'crop': 'This field is required.'}] * 2)
+
+
+class PredictBatchTests(IsolatedTestCase):
+    model_targets = ('yield',)
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.login()
+
+    def test_valid_rows_are_scored_saved_and_counted(self):
+        frame = pd.DataFrame([INPUTS, dict(INPUTS, year='soon'), dict(INPUTS, crop='Rice')])
+        valid, outputs, errors, instances = predict_batch(self.user, frame)
+        self.assertEqual(len(valid), 2)
+        self.assertEqual([e['row'] for e in errors], [1])
+        self.assertEqual(len(outputs['yield']), 2)
+        saved = AgriculturalData.objects.order_by('pk')
+        self.assertEqual([obj.pk for obj in instances], [obj.pk for obj in saved])
+        self.assertEqual(list(saved.values_list('crop', flat=True)), ['Maize (corn)', 'Rice'])
+        # bulk_create skips save(), so derived features come from build_instances
+        self.assertNotEqual(saved[0].log_area_harvested_ha, 0)
+        self.assertEqual(UserPredictionStats.objects.get(user=self.user).count, 2)
+
+    def test_nothing_valid_scores_nothing(self):
+        valid, outputs, errors = validate_and_score(pd.DataFrame([dict(INPUTS, year='soon')]))
+        self.assertTrue(valid.empty)
+        self.assertEqual({name: len(values) for name, values in outputs.items()},
+                         {'production': 0, 'yield': 0, 'price': 0})
+        self.assertEqual(len(errors), 1)
+
+    def test_api_accepts_json_rows(self):
+        response = self.client.post(reverse('predict_batch') + '?persist=0',
+                                    json.dumps({'rows': [INPUTS, dict(INPUTS, year=1900)]}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual((body['received'], body['scored'], body['rejected']), (2, 1, 1))
+        self.assertEqual(body['ids'], [])
+        self.assertEqual(len(body['predictions']['price']), 1)
+        self.assertFalse(AgriculturalData.objects.exists())
+
+    def test_api_accepts_csv_and_rejects_garbage(self):
+        csv = pd.DataFrame([INPUTS]).to_csv(index=False)
+        response = self.client.post(reverse('predict_batch'), csv, content_type='text/csv')
+        self.assertEqual(response.json()['ids'], [AgriculturalData.objects.get().pk])
+
+        response = self.client.post(reverse('predict_batch'), '{"rows": 3}',
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,98 @@
+import asyncio
+import threading
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from core.batching import MicroBatcher, score_online_async
+from core.inference import TARGETS, score
+from core.models import AgriculturalData
+
+from .utils import INPUTS, IsolatedTestCase
+
+
+class MicroBatcherTests(SimpleTestCase):
+    def test_concurrent_requests_share_one_predict_call(self):
+        calls = []
+        release = threading.Event()
+
+        def predict(features):
+            release.wait(5)
+            calls.append(len(features))
+            return {'yield': features['x'].to_numpy() * 2.0}
+
+        batcher = MicroBatcher(max_batch_size=64, max_wait=0.5, predict_fn=predict)
+        futures = [batcher.submit(pd.DataFrame({'x': [float(i)] * (i + 1)})) for i in range(4)]
+        release.set()
+
+        results = [future.result(timeout=5) for future in futures]
+        self.assertEqual(sum(calls), 10)
+        self.assertLess(len(calls), 4)
+        for i, result in enumerate(results):
+            np.testing.assert_array_equal(result['yield'], [2.0 * i] * (i + 1))
+        self.assertEqual(batcher.metrics()['max_batch_size'], 64)
+
+    def test_full_batch_is_scored_without_waiting(self):
+        batcher = MicroBatcher(max_batch_size=2, max_wait=60,
+                               predict_fn=lambda f: {'yield': f['x'].to_numpy()})
+        result = batcher.predict(pd.DataFrame({'x': [1.0, 2.0]}), timeout=5)
+        np.testing.assert_array_equal(result['yield'], [1.0, 2.0])
+
+    def test_failures_reach_every_caller_and_the_worker_survives(self):
+        def predict(features):
+            if (features['x'] < 0).any():
+                raise ValueError('bad row')
+            return {'yield': features['x'].to_numpy()}
+
+        batcher = MicroBatcher(max_batch_size=64, max_wait=0.001, predict_fn=predict)
+        with self.assertLogs('core.batching', 'WARNING'):
+            with self.assertRaisesMessage(ValueError, 'bad row'):
+                batcher.predict(pd.DataFrame({'x': [-1.0]}), timeout=5)
+        result = batcher.predict(pd.DataFrame({'x': [3.0]}), timeout=5)
+        np.testing.assert_array_equal(result['yield'], [3.0])
+
+    async def test_awaiting_callers_share_one_predict_call(self):
+        calls = []
+
+        def predict(features):
+            calls.append(len(features))
+            return {'yield': features['x'].to_numpy() + 1.0}
+
+        batcher = MicroBatcher(max_batch_size=3, max_wait=5, predict_fn=predict)
+        results = await asyncio.gather(*(batcher.predict_async(pd.DataFrame({'x': [float(i)]}))
+                                         for i in range(3)))
+        self.assertEqual(calls, [3])
+        self.assertEqual([r['yield'].tolist() for r in results], [[1.0], [2.0], [3.0]])
+
+
+class ScoreOnlineAsyncTests(IsolatedTestCase):
+    model_targets = ('yield',)
+
+    async def test_scores_through_the_batcher_then_the_cache(self):
+        expected = await sync_to_async(score)(INPUTS)
+        with mock.patch.object(MicroBatcher, 'predict', side_effect=AssertionError('blocked a thread')):
+            outputs = await score_online_async(INPUTS)
+        with mock.patch.object(MicroBatcher, 'submit', side_effect=AssertionError('cache missed')):
+            cached = await score_online_async(INPUTS)
+        for target in TARGETS:
+            np.testing.assert_allclose(outputs[target], expected[target])
+            np.testing.assert_allclose(cached[target], expected[target])
+
+        with self.settings(PREDICTION_CACHE={'ENABLED': False}):
+            uncached = await score_online_async([INPUTS, INPUTS])
+        np.testing.assert_allclose(uncached['yield'], np.repeat(expected['yield'], 2))
+
+    async def test_predict_view_awaits_the_batcher(self):
+        user = await sync_to_async(User.objects.create_user)('grower', password='pw')
+        await self.async_client.aforce_login(user)
+        with mock.patch.object(MicroBatcher, 'predict', side_effect=AssertionError('blocked a thread')):
+            response = await self.async_client.post(reverse('predict'), INPUTS)
+        row = await AgriculturalData.objects.aget()
+        self.assertRedirects(response, reverse('prediction_results', args=[row.pk]),
+                             fetch_redirect_response=False)
+        self.assertGreater(row.predicted_yield, 0)
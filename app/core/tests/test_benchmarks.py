@@ -0,0 +1,50 @@
+import io
+import json
+
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase
+
+from core import benchmarks
+
+from .utils import DATA_PATH, IsolatedTestCase
+
+
+def document(p50):
+    return {'results': {'feature_building': {'1': {'p50': p50}, '10': {'p50': p50}}}}
+
+
+class CompareTests(SimpleTestCase):
+    def test_summarize_percentiles(self):
+        summary = benchmarks.summarize(range(1, 101))
+        self.assertEqual((summary['n'], summary['min'], summary['max']), (100, 1.0, 100.0))
+        self.assertAlmostEqual(summary['p50'], 50.5)
+
+    def test_regressions_beyond_tolerance_are_flagged(self):
+        rows = benchmarks.compare(document(1.0), document(1.3), tolerance=0.2)
+        self.assertEqual([(name, regressed) for name, *_, regressed in rows],
+                         [('feature_building/1', True), ('feature_building/10', True)])
+        self.assertFalse(any(r[-1] for r in benchmarks.compare(document(1.0), document(1.1))))
+
+
+class BenchmarkCommandTests(IsolatedTestCase):
+    def run_benchmark(self, *args):
+        out = io.StringIO()
+        call_command('benchmark', '--data', str(DATA_PATH), '--batch-sizes', '1,10',
+                     '--skip', 'predict', '--skip', 'views', '--skip', 'writes', *args,
+                     stdout=out, stderr=io.StringIO())
+        return out.getvalue()
+
+    def test_writes_results_json(self):
+        results = json.loads(self.run_benchmark())['results']
+        self.assertEqual(set(results['feature_building']), {'1', '10'})
+
+    def test_regressions_fail_the_command(self):
+        baseline = f'{self.tmp}/baseline.json'
+        with open(baseline, 'w') as fh:
+            json.dump(document(1e-12), fh)
+        with self.assertRaisesMessage(CommandError, '2 measurement(s) regressed by more than 20%'):
+            self.run_benchmark('--compare', baseline)
+
+        with open(baseline, 'w') as fh:
+            json.dump(document(60.0), fh)
+        self.run_benchmark('--compare', baseline)
@@ -0,0 +1,61 @@
+import tempfile
+
+import numpy as np
+from django.test import SimpleTestCase
+from sklearn.ensemble import GradientBoostingRegressor
+from sklearn.linear_model import LinearRegression
+
+from core.compiled import CompileError, compile_pipeline, max_abs_error
+from core.features import build_features
+from core.registry import ModelRegistry
+from core.training import features_and_targets
+
+from .utils import dataset_sample, fitted_pipeline
+
+
+def scoring_features():
+    frame = dataset_sample(300)
+    # Unseen categories and missing inputs go through the imputers/encoder
+    frame.loc[:9, 'Crop'] = 'Unheard-of crop'
+    frame.loc[10:19, 'Rainfall_mm'] = np.nan
+    return build_features(frame)
+
+
+class CompiledModelTests(SimpleTestCase):
+    def assertMatches(self, pipeline):
+        features = scoring_features()
+        compiled = compile_pipeline(pipeline)
+        expected = pipeline.predict(features)
+        np.testing.assert_allclose(compiled.predict(features), expected, rtol=1e-9, atol=1e-6)
+        self.assertEqual(compiled.predict(features.iloc[:1]).shape, expected[:1].shape)
+        return compiled
+
+    def test_random_forest_matches_sklearn(self):
+        self.assertMatches(fitted_pipeline())
+
+    def test_gradient_boosting_matches_sklearn(self):
+        pipeline = fitted_pipeline()
+        X, y = features_and_targets(dataset_sample())
+        pipeline.set_params(model=GradientBoostingRegressor(n_estimators=20, random_state=0)).fit(X, y)
+        self.assertMatches(pipeline)
+
+    def test_target_bundle_matches_sklearn(self):
+        compiled = self.assertMatches(fitted_pipeline(('production', 'yield', 'price')))
+        self.assertEqual(compiled.n_outputs, 3)
+
+    def test_memory_mapped_artifact_predicts_the_same(self):
+        compiled = compile_pipeline(fitted_pipeline())
+        with tempfile.TemporaryDirectory() as root:
+            registry = ModelRegistry(root, mmap_mode='r', reload_interval=0)
+            registry.publish(compiled, version='compiled')
+            loaded = registry.get().estimator
+            self.assertIsInstance(loaded.value.base, np.memmap)
+            self.assertFalse(loaded.value.flags.writeable)
+            self.assertEqual(max_abs_error(compiled, loaded, scoring_features()), 0.0)
+
+    def test_unsupported_models_are_rejected(self):
+        pipeline = fitted_pipeline()
+        X, y = features_and_targets(dataset_sample())
+        pipeline.set_params(model=LinearRegression()).fit(X, y)
+        with self.assertRaisesMessage(CompileError, 'Unsupported model LinearRegression'):
+            compile_pipeline(pipeline)
@@ -0,0 +1,20 @@
+import unittest
+
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'SQLite tuning')
+class SQLiteTuningTests(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_connections_are_tuned(self):
+        if not settings.DATABASES['default']['OPTIONS']:
+            self.skipTest('DB_SQLITE_TUNED=0')
+        self.assertEqual(self.pragma('synchronous'), 1)  # NORMAL
+        self.assertEqual(self.pragma('busy_timeout'), 20000)
+        self.assertEqual(connection.transaction_mode, 'IMMEDIATE')
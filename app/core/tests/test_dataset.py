@@ -0,0 +1,109 @@
+import io
+import os
+
+import numpy as np
+import pandas as pd
+from django.core.management import CommandError, call_command
+from pandas.testing import assert_frame_equal
+
+from core.dataset import (ENRICHMENT_COLUMNS, build_dataset, dataset_sha256, downcast, pivot_file,
+                          read_dataset, read_manifest)
+from core.exporters import parquet_available
+
+from .utils import IsolatedTestCase
+
+RAW = [
+    ('Kenya', 'Maize', 'Area harvested', 2020, 10.5),
+    ('Kenya', 'Maize', 'Production', 2020, 21.25),
+    ('Kenya', 'Maize', 'Laying', 2020, 7.0),
+    ('Kenya', 'Maize', 'Yield', 2020, 2023.8),
+    # A repeated element keeps its first value
+    ('Kenya', 'Maize', 'Yield', 2020, 9999.0),
+    ('Kenya', 'Maize', 'Area harvested', 2021, 11.0),
+    ('Ghana', 'Yams', 'Production', 2021, 3.123456789),
+    ('Ghana', 'Yams', 'Laying', 2022, 1.0),
+]
+EXPECTED = pd.DataFrame({
+    'Country': ['Ghana', 'Kenya', 'Kenya'],
+    'Crop': ['Yams', 'Maize', 'Maize'],
+    'Year': [2021, 2020, 2021],
+    'Area_harvested_ha': [np.nan, 10.5, 11.0],
+    'Production_tonnes': [3.123456789, 21.25, np.nan],
+    'Yield_kg_per_ha': [np.nan, 2023.8, np.nan],
+})
+
+
+class DatasetTests(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.raw = os.path.join(self.tmp, 'raw.csv')
+        pd.DataFrame(RAW, columns=['Area', 'Item', 'Element', 'Year', 'Value']).assign(Unit='t').to_csv(
+            self.raw, index=False)
+        self.enrichment = os.path.join(self.tmp, 'enrichment.csv')
+        pd.DataFrame([
+            ('Kenya', 'Maize', 2020, 55.5, 21.0, 300.0, 'Subsidy', 90.0, -3.0),
+            ('Kenya', 'Maize', 2020, 0.0, 0.0, 0.0, 'Tariff', 0.0, 0.0),
+        ], columns=['Country', 'Crop', 'Year', *ENRICHMENT_COLUMNS]).to_csv(self.enrichment, index=False)
+        self.root = os.path.join(self.tmp, 'dataset')
+
+    def build(self, **options):
+        options.setdefault('fmt', 'npz')
+        return build_dataset([self.raw], self.root, log=lambda message: None, **options)
+
+    def test_pivot_is_the_same_for_any_chunk_size(self):
+        for chunk_rows in (1, 3, 100):
+            with self.subTest(chunk_rows=chunk_rows):
+                wide, rows = pivot_file(self.raw, chunk_rows)
+                self.assertEqual(rows, len(RAW))
+                assert_frame_equal(wide, EXPECTED, check_dtype=False)
+
+    def test_downcast_is_lossless(self):
+        frame, narrowed = downcast(EXPECTED)
+        self.assertEqual(narrowed, {'Area_harvested_ha': 1, 'Yield_kg_per_ha': 1})
+        self.assertEqual((frame['Year'].dtype, frame['Production_tonnes'].dtype), (np.int16, np.float64))
+        self.assertIsInstance(frame['Country'].dtype, pd.CategoricalDtype)
+
+    def test_exact_round_trip_in_every_format(self):
+        formats = ['npz'] + (['parquet'] if parquet_available() else [])
+        for fmt in formats:
+            with self.subTest(fmt=fmt):
+                self.build(fmt=fmt, enrichment=self.enrichment, chunk_rows=2)
+                frame = read_dataset(self.root, exact=True)
+                self.assertEqual(frame['Area_harvested_ha'].dtype, np.float64)
+                assert_frame_equal(frame[EXPECTED.columns].astype({'Country': object, 'Crop': object,
+                                                                   'Year': np.int64}), EXPECTED)
+                maize = frame[frame['Year'] == 2020].iloc[0]
+                self.assertEqual((maize['Policy_Flag'], maize['Rainfall_mm']), ('Subsidy', 55.5))
+                self.assertEqual(read_manifest(self.root)['partitions'][0]['format'], fmt)
+                self.assertEqual(read_dataset(self.root)['Area_harvested_ha'].dtype, np.float32)
+        # The inputs decide the hash, not the format they are stored in
+        digest = dataset_sha256(self.root)
+        self.build(fmt='npz', enrichment=self.enrichment)
+        self.assertEqual(dataset_sha256(self.root), digest)
+
+    def test_unchanged_inputs_are_skipped(self):
+        self.assertEqual(self.build()['built'], 1)
+        summary = self.build()
+        self.assertEqual((summary['built'], summary['skipped'], summary['raw_rows']), (0, 1, 0))
+        self.assertEqual(self.build(force=True)['built'], 1)
+        self.assertEqual(self.build(enrichment=self.enrichment)['built'], 1)
+
+        with open(self.raw, 'a') as fh:
+            fh.write('Chad,Millet,Production,2020,4.0,t\n')
+        self.assertEqual(self.build(enrichment=self.enrichment)['rows'], 4)
+
+        other = os.path.join(self.tmp, 'other.csv')
+        os.rename(self.raw, other)
+        summary = build_dataset([other], self.root, fmt='npz', log=lambda message: None)
+        self.assertEqual((summary['built'], summary['removed']), (1, 1))
+        self.assertEqual(len(os.listdir(os.path.join(self.root, 'partitions'))), 1)
+
+    def test_build_dataset_command(self):
+        out, csv = io.StringIO(), os.path.join(self.tmp, 'out.csv')
+        call_command('build_dataset', self.raw, output=self.root, no_enrichment=True, format='npz',
+                     csv=csv, stdout=out, stderr=io.StringIO())
+        self.assertIn('1 built', out.getvalue())
+        assert_frame_equal(pd.read_csv(csv), EXPECTED)
+        with self.assertRaisesMessage(CommandError, 'No such file or directory'):
+            call_command('build_dataset', os.path.join(self.tmp, 'missing.csv'), output=self.root,
+                         stdout=out, stderr=io.StringIO())
@@ -0,0 +1,66 @@
+import importlib
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+from django.apps import apps
+from django.db import connection
+
+from core.batch import build_instances, save_instances, validate_frame
+from core.features import DERIVED_COLUMNS, DERIVED_FIELD_TO_COLUMN, DERIVED_FIELDS, build_features
+from core.models import AgriculturalData
+
+from .utils import INPUTS, IsolatedTestCase, make_row
+
+migration = importlib.import_module('core.migrations.0006_agriculturaldata_derived_features')
+
+
+class StoredDerivedFeaturesTests(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.login()
+
+    def assertStoredMatch(self, row):
+        expected = build_features(dict(INPUTS, **{f: getattr(row, f) for f in INPUTS})).iloc[0]
+        for field, column in DERIVED_FIELD_TO_COLUMN.items():
+            self.assertAlmostEqual(getattr(row, field), expected[column], msg=field)
+
+    def test_save_sets_the_columns(self):
+        row = make_row(self.user, area_harvested_ha=0.0, transport_cost_usd=250.0)
+        row.refresh_from_db()
+        self.assertStoredMatch(row)
+        self.assertEqual(row.price_to_yield_ratio, 0.0)
+
+        row.production_tonnes = 80.0
+        row.area_harvested_ha = 4.0
+        row.save(update_fields=['production_tonnes', 'area_harvested_ha'])
+        row.refresh_from_db()
+        self.assertAlmostEqual(row.log_production_tonnes, np.log(80.0))
+        self.assertStoredMatch(row)
+
+    def test_bulk_instances_carry_the_columns(self):
+        valid, errors = validate_frame(pd.DataFrame([INPUTS, dict(INPUTS, production_tonnes=0.0)]))
+        self.assertEqual(errors, [])
+        outputs = {target: np.array([1.0, 2.0]) for target in ('production', 'yield', 'price')}
+        save_instances(build_instances(self.user, valid, outputs))
+        for row in AgriculturalData.objects.all():
+            self.assertStoredMatch(row)
+
+    def test_queryset_features_use_the_stored_columns(self):
+        make_row(self.user)
+        rows = AgriculturalData.objects.filter(user=self.user)
+        stored = build_features(rows)
+        recomputed = build_features([dict(INPUTS, **{f: getattr(r, f) for f in INPUTS}) for r in rows])
+        np.testing.assert_allclose(stored[DERIVED_COLUMNS], recomputed[DERIVED_COLUMNS])
+        # The stored values are what is read, not a recomputation
+        rows.update(log_production_tonnes=-1.0)
+        self.assertEqual(build_features(rows)['log_Production_tonnes'].tolist(), [-1.0])
+
+    def test_migration_backfills_existing_rows(self):
+        rows = [make_row(self.user, production_tonnes=p) for p in (0.0, 5.0, 20.0)]
+        AgriculturalData.objects.update(**{field: 0.0 for field in DERIVED_FIELDS})
+        editor = SimpleNamespace(quote_name=connection.ops.quote_name, connection=connection)
+        migration.backfill_derived_features(apps, editor)
+        for row in rows:
+            row.refresh_from_db()
+            self.assertStoredMatch(row)
@@ -0,0 +1,82 @@
+import csv
+import gzip
+import io
+import json
+import unittest
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from core.exporters import (CSV_HEADER, EXPORT_FIELDS, gzip_stream, parquet_available,
+                            stream_csv, stream_json, stream_ndjson, stream_parquet)
+from core.models import AgriculturalData
+
+from .utils import make_row
+
+
+class ExporterTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('grower', password='pw')
+        for year in range(2001, 2006):
+            make_row(self.user, year=year)
+        self.rows = AgriculturalData.objects.order_by('year')
+
+    def test_csv_streams_every_row_in_chunks(self):
+        chunks = list(stream_csv(self.rows, chunk_size=2))
+        self.assertEqual(len(chunks), 4)  # header + 3 chunks
+        lines = list(csv.reader(io.StringIO(b''.join(chunks).decode())))
+        self.assertEqual(lines[0], CSV_HEADER)
+        self.assertEqual([line[2] for line in lines[1:]], ['2001', '2002', '2003', '2004', '2005'])
+
+    def test_json_and_ndjson_hold_the_same_records(self):
+        records = json.loads(b''.join(stream_json(self.rows, chunk_size=2)))
+        lines = b''.join(stream_ndjson(self.rows, chunk_size=2)).decode().splitlines()
+        self.assertEqual(records, [json.loads(line) for line in lines])
+        self.assertEqual(list(records[0]), EXPORT_FIELDS)
+        self.assertEqual([r['year'] for r in records], [2001, 2002, 2003, 2004, 2005])
+
+    def test_empty_exports_are_well_formed(self):
+        empty = AgriculturalData.objects.none()
+        self.assertEqual(json.loads(b''.join(stream_json(empty))), [])
+        self.assertEqual(b''.join(stream_ndjson(empty)), b'')
+
+    def test_gzip_stream_round_trips(self):
+        raw = b''.join(stream_csv(self.rows))
+        self.assertEqual(gzip.decompress(b''.join(gzip_stream(stream_csv(self.rows, chunk_size=2)))), raw)
+
+    @unittest.skipUnless(parquet_available(), 'pyarrow is not installed')
+    def test_parquet_has_one_row_group_per_chunk(self):
+        import pyarrow.parquet as pq
+
+        table = pq.ParquetFile(io.BytesIO(b''.join(stream_parquet(self.rows, chunk_size=2))))
+        self.assertEqual(table.metadata.num_row_groups, 3)
+        self.assertEqual(table.read().column('year').to_pylist(), [2001, 2002, 2003, 2004, 2005])
+
+
+class ExportViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('grower', password='pw')
+        self.client.force_login(self.user)
+        self.row = make_row(self.user)
+        make_row(User.objects.create_user('other', password='pw'))
+
+    def test_exports_only_the_users_rows(self):
+        response = self.client.get(reverse('export_predictions', args=['ndjson']))
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).splitlines()
+        self.assertEqual(len(lines), 1)
+
+    def test_gzip_and_single_prediction(self):
+        response = self.client.get(reverse('export_prediction', args=[self.row.pk, 'csv']) + '?gzip=1')
+        self.assertEqual(response['Content-Disposition'],
+                         f'attachment; filename="agricultural_prediction_{self.row.pk}.csv.gz"')
+        body = gzip.decompress(b''.join(response.streaming_content)).decode()
+        self.assertEqual(len(body.splitlines()), 2)
+
+    def test_unknown_format_and_foreign_rows(self):
+        response = self.client.get(reverse('export_predictions', args=['xml']))
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+        other = AgriculturalData.objects.exclude(user=self.user).get()
+        response = self.client.get(reverse('export_prediction', args=[other.pk, 'csv']))
+        self.assertEqual(response.status_code, 404)
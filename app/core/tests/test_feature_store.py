@@ -0,0 +1,81 @@
+import os
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from core.feature_store import FeatureStore
+from core.features import build_features
+
+from .utils import IsolatedTestCase, dataset_sample
+
+
+def history_rows():
+    frame = dataset_sample(200).drop_duplicates(['Country', 'Crop', 'Year'])
+    return frame.sort_values(['Country', 'Crop', 'Year']).reset_index(drop=True)
+
+
+class FeatureStoreTests(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.store = FeatureStore(os.path.join(self.tmp, 'store'), reload_interval=0)
+        self.frame = history_rows()
+
+    def write_csv(self, frame, name='history.csv'):
+        path = os.path.join(self.tmp, name)
+        frame.to_csv(path, index=False)
+        return path
+
+    def test_ingest_then_lookup_latest_year_at_or_before(self):
+        path = self.write_csv(self.frame)
+        self.assertEqual(self.store.ingest_csv(path, chunksize=50), len(self.frame))
+        self.assertEqual(len(self.store), len(self.frame))
+
+        country, crop = self.frame.iloc[0][['Country', 'Crop']]
+        years = sorted(self.frame[(self.frame.Country == country) & (self.frame.Crop == crop)].Year)
+        self.assertEqual(self.store.lookup(country, crop)['Year'], years[-1])
+        self.assertEqual(self.store.lookup(f' {country} ', crop, years[0])['Year'], years[0])
+        self.assertIsNone(self.store.lookup(country, crop, years[0] - 1))
+        self.assertIsNone(self.store.lookup('Atlantis', crop))
+        np.testing.assert_array_equal(self.store.history(country, crop, ['Year'])['Year'], years)
+
+    def test_stored_features_match_build_features(self):
+        self.store.ingest_csv(self.write_csv(self.frame))
+        position = self.frame.index.get_loc(self.frame.dropna().index[0])
+        row = self.frame.iloc[position]
+        stored = self.store.lookup(row['Country'], row['Crop'], row['Year'])
+        expected = build_features(self.frame.iloc[[position]]).iloc[0]
+        for column, value in expected.items():
+            if isinstance(value, str):
+                self.assertEqual(stored[column], value, column)
+            else:
+                self.assertAlmostEqual(stored[column], value, msg=column)
+        self.assertEqual(stored['Yield_kg_per_ha'], row['Yield_kg_per_ha'])
+
+    def test_unchanged_sources_and_known_keys_are_skipped(self):
+        first = self.write_csv(self.frame.iloc[:100], 'first.csv')
+        self.store.ingest_csv(first)
+        self.assertEqual(self.store.ingest_csv(first), 0)
+
+        second = self.write_csv(self.frame.iloc[50:], 'second.csv')
+        self.assertEqual(self.store.ingest_csv(second), len(self.frame) - 100)
+        self.assertEqual(len(self.store.read_manifest()['segments']), 2)
+
+        self.store.compact()
+        self.assertEqual([s['source'] for s in self.store.read_manifest()['segments']], ['compacted'])
+        self.assertEqual(len(self.store), len(self.frame))
+        self.assertEqual(self.store.ingest_csv(second), 0)
+
+    def test_missing_inputs_are_kept_as_nan(self):
+        frame = self.frame.iloc[:3].copy()
+        frame.loc[0, 'Rainfall_mm'] = np.nan
+        self.store.ingest_csv(self.write_csv(frame))
+        row = frame.iloc[0]
+        self.assertTrue(np.isnan(self.store.lookup(row['Country'], row['Crop'], row['Year'])['Rainfall_mm']))
+
+
+class EmptyFeatureStoreTests(SimpleTestCase):
+    def test_missing_store_is_empty(self):
+        store = FeatureStore('/nonexistent/feature-store', reload_interval=0)
+        self.assertEqual(len(store), 0)
+        self.assertIsNone(store.lookup('Kenya', 'Maize'))
+        self.assertTrue(store.to_frame().empty)
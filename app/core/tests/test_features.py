@@ -0,0 +1,73 @@
+import math
+
+import numpy as np
+import pandas as pd
+from django.urls import reverse
+from pandas.testing import assert_frame_equal
+
+from core.features import FIELD_TO_COLUMN, MODEL_FEATURES, build_features
+from core.models import AgriculturalData
+
+from .utils import INPUTS, IsolatedTestCase
+
+
+class BuildFeaturesTests(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.login()
+
+    def test_every_input_shape_gives_the_same_block(self):
+        row = AgriculturalData.objects.create(user=self.user, **INPUTS)
+        expected = build_features(row)
+        self.assertEqual(list(expected.columns), MODEL_FEATURES)
+        self.assertEqual(expected['Crop'].dtype, object)
+        self.assertEqual(expected['Year'].dtype, np.float64)
+
+        dataset_columns = pd.DataFrame([INPUTS]).rename(columns=FIELD_TO_COLUMN)
+        for rows in (INPUTS, [INPUTS], pd.DataFrame([INPUTS]), dataset_columns,
+                     AgriculturalData.objects.filter(pk=row.pk)):
+            with self.subTest(type(rows).__name__):
+                assert_frame_equal(build_features(rows), expected)
+
+    def test_derived_features_match_their_definitions(self):
+        features = build_features(INPUTS).iloc[0]
+        tonnes_per_ha = INPUTS['production_tonnes'] / INPUTS['area_harvested_ha']
+        self.assertAlmostEqual(features['Rainfall_Temp_interaction'],
+                               INPUTS['rainfall_mm'] * INPUTS['temperature_c'])
+        self.assertAlmostEqual(features['Price_to_Yield_ratio'],
+                               INPUTS['price_usd_per_tonne'] / tonnes_per_ha)
+        self.assertAlmostEqual(features['Demand_Supply_balance'],
+                               INPUTS['demand_supply_gap'] / INPUTS['production_tonnes'])
+        self.assertAlmostEqual(features['log_Production_tonnes'], math.log(INPUTS['production_tonnes']))
+        self.assertAlmostEqual(features['log_Area_harvested_ha'], math.log(INPUTS['area_harvested_ha']))
+        self.assertAlmostEqual(features['log_Transport_Cost_USD'], math.log(INPUTS['transport_cost_usd']))
+
+    def test_zero_denominators_and_missing_values(self):
+        inputs = dict(INPUTS, area_harvested_ha=0.0, production_tonnes=0.0, transport_cost_usd=None,
+                      policy_flag='')
+        features = build_features(inputs).iloc[0]
+        for column in ('Price_to_Yield_ratio', 'Demand_Supply_balance', 'log_Production_tonnes',
+                       'log_Area_harvested_ha', 'Transport_Cost_USD', 'log_Transport_Cost_USD'):
+            self.assertEqual(features[column], 0.0, column)
+        self.assertEqual(features['Policy_Flag'], 'None')
+
+    def test_frame_without_productivity_index_derives_it(self):
+        frame = pd.DataFrame([INPUTS]).drop(columns='productivity_index')
+        features = build_features(frame).iloc[0]
+        self.assertAlmostEqual(features['Productivity_index'],
+                               INPUTS['production_tonnes'] / INPUTS['area_harvested_ha'])
+        with self.assertRaisesMessage(ValueError, 'Missing input columns: Country'):
+            build_features(frame.drop(columns='country'))
+
+
+class PredictViewTests(IsolatedTestCase):
+    model_targets = ('yield',)
+
+    def test_prediction_is_scored_and_saved(self):
+        self.login()
+        response = self.client.post(reverse('predict'), INPUTS)
+        row = AgriculturalData.objects.get()
+        self.assertRedirects(response, reverse('prediction_results', args=[row.pk]))
+        self.assertGreater(row.predicted_yield, 0)
+        self.assertAlmostEqual(row.predicted_production,
+                               row.predicted_yield * INPUTS['area_harvested_ha'] / 1000.0)
@@ -0,0 +1,156 @@
+import io
+import os
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from django.core.management import call_command
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from core import forecasting
+from core.forecasting import (AR1, MODELS, PARAMS, Forecaster, ForecastsNotAvailable, fit_ar1,
+                              fit_matrix, fit_series, fit_trend, get_forecaster, project)
+
+from .utils import IsolatedTestCase
+
+
+def history_frame():
+    rows = []
+    for year in range(2010, 2020):
+        # A straight line, a flat series with a gap, and a one-year series
+        rows.append(('Kenya', 'Maize', year, 100.0 + 10 * (year - 2010), 1000.0 + 50 * (year - 2010)))
+        if year != 2014:
+            rows.append(('Kenya', 'Rice', year, 20.0, 40.0))
+    rows.append(('Ghana', 'Yams', 2019, 5.0, 50.0))
+    frame = pd.DataFrame(rows, columns=['Country', 'Crop', 'Year', 'Area_harvested_ha', 'Production_tonnes'])
+    frame['Yield_kg_per_ha'] = frame['Production_tonnes'] * 1000 / frame['Area_harvested_ha']
+    return frame
+
+
+class FittingTests(SimpleTestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.Y = rng.normal(100, 10, (12, 8)).cumsum(axis=1)
+        self.Y[rng.random(self.Y.shape) < 0.25] = np.nan
+        self.Y[0] = np.nan
+        self.Y[1, :-1] = np.nan
+
+    def test_vectorised_fit_matches_one_series_at_a_time(self):
+        together = fit_series(self.Y)
+        one_by_one = [fit_series(self.Y[i:i + 1]) for i in range(len(self.Y))]
+        for key in PARAMS:
+            np.testing.assert_allclose(together[key], np.concatenate([p[key] for p in one_by_one]),
+                                       equal_nan=True, err_msg=key)
+        blocks = fit_matrix(self.Y, block_size=5)
+        for key in PARAMS:
+            np.testing.assert_allclose(blocks[key], together[key], equal_nan=True, err_msg=key)
+
+    def test_trend_matches_polyfit(self):
+        params = fit_trend(self.Y)
+        T = self.Y.shape[1]
+        for i, row in enumerate(self.Y):
+            observed = ~np.isnan(row)
+            if observed.sum() < 2:
+                continue
+            slope, intercept = np.polyfit(np.arange(T)[observed], row[observed], 1)
+            self.assertAlmostEqual(params['slope'][i], slope)
+            self.assertAlmostEqual(params['level'][i], intercept + slope * (T - 1))
+
+    def test_ar1_reverts_to_its_mean(self):
+        series = 50 + 0.5 ** np.arange(8) * 40  # y[t] = 25 + 0.5 * y[t-1]
+        params = fit_ar1(series[None, :])
+        self.assertAlmostEqual(params['phi'][0], 0.5)
+        self.assertAlmostEqual(params['mean'][0], 50)
+        params['model'] = np.array([AR1])
+        forecast = project(params, np.arange(1, 30)[None, :])[0]
+        self.assertTrue(np.all(np.diff(forecast) < 0))
+        self.assertAlmostEqual(forecast[-1], 50, places=4)
+
+    def test_forecasts_are_never_negative(self):
+        params = fit_trend(np.array([[30.0, 20.0, 10.0]]))
+        params['model'] = np.array([MODELS.index('trend')])
+        np.testing.assert_array_equal(project(params, np.arange(1, 4)[None, :])[0], [0.0, 0.0, 0.0])
+
+
+class ForecasterTests(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.source = os.path.join(self.tmp, 'fao.csv')
+        history_frame().to_csv(self.source, index=False)
+        overrides = self.settings(FORECAST_SOURCE=self.source)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        forecasting._forecaster = None
+
+    def fit(self):
+        call_command('fit_forecasts', stdout=io.StringIO())
+
+    def test_forecasts_a_fitted_series(self):
+        self.fit()
+        result = get_forecaster().forecast('Kenya', 'Maize', years=3)
+        self.assertEqual([point['year'] for point in result['forecast']], [2020, 2021, 2022])
+        self.assertEqual(len(result['history']), 10)
+        for i, point in enumerate(result['forecast']):
+            self.assertAlmostEqual(point['area'], 200.0 + 10 * i, delta=2)
+        self.assertIsNotNone(result['forecast'][0]['production'])
+        self.assertEqual(get_forecaster().forecast('Ghana', 'Yams', 2)['models']['area'], 'naive')
+        self.assertIsNone(get_forecaster().forecast('Kenya', 'Yams'))
+        self.assertEqual(get_forecaster().options(), (['Ghana', 'Kenya'], ['Maize', 'Rice', 'Yams']))
+        manifest = get_forecaster().read_manifest()
+        self.assertEqual((manifest['series'], manifest['years']), (3, [2010, 2019]))
+        fit, _ = get_forecaster()._ensure_loaded()
+        self.assertIsInstance(fit['area.level'], np.memmap)
+
+    def test_requests_never_fit(self):
+        with self.assertRaisesMessage(ForecastsNotAvailable, 'have not been fitted'):
+            get_forecaster().forecast('Kenya', 'Rice')
+        self.assertIsNone(get_forecaster().read_manifest())
+
+    def test_changed_source_is_unavailable_until_refitted(self):
+        self.fit()
+        forecaster = get_forecaster()
+        forecaster.reload_interval = 0
+        self.assertAlmostEqual(forecaster.forecast('Kenya', 'Rice')['forecast'][0]['area'], 20.0)
+        fit = forecaster.read_manifest()['fit']
+        history_frame().assign(Area_harvested_ha=lambda f: f['Area_harvested_ha'] * 2).to_csv(
+            self.source, index=False)
+        with self.assertRaisesMessage(ForecastsNotAvailable, 'out of date'):
+            forecaster.forecast('Kenya', 'Rice')
+        self.assertEqual(forecaster.read_manifest()['fit'], fit)
+
+        self.fit()
+        self.assertAlmostEqual(forecaster.forecast('Kenya', 'Rice')['forecast'][0]['area'], 40.0)
+        fits = os.listdir(os.path.join(forecaster.root, forecasting.FITS_DIR))
+        self.assertEqual(fits, [forecaster.read_manifest()['fit']])
+
+    def test_fit_forecasts_command(self):
+        out = io.StringIO()
+        call_command('fit_forecasts', stdout=out)
+        self.assertIn('Fitted 3 series (2010-2019)', out.getvalue())
+
+    def test_forecast_api(self):
+        self.login()
+        url = reverse('forecast')
+        self.assertEqual(self.client.get(url, {'country': 'Kenya', 'crop': 'Maize'}).status_code, 503)
+        self.fit()
+        response = self.client.get(url, {'country': 'Kenya', 'crop': 'Maize', 'years': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['forecast']), 2)
+        for params in ({'country': 'Kenya'}, {'country': 'Kenya', 'crop': 'Maize', 'years': 'x'},
+                       {'country': 'Kenya', 'crop': 'Maize', 'years': 0},
+                       {'country': 'Kenya', 'crop': 'Maize', 'years': 1000}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(url, params).status_code, 400)
+        self.assertEqual(self.client.get(url, {'country': 'Chad', 'crop': 'Maize'}).status_code, 404)
+
+        os.remove(self.source)
+        get_forecaster().reload_interval = 0
+        self.assertEqual(self.client.get(url, {'country': 'Kenya', 'crop': 'Maize'}).status_code, 503)
+
+    def test_dashboard_survives_any_forecast_failure(self):
+        self.login()
+        for error in (ForecastsNotAvailable('not fitted'), OSError('disk full')):
+            with self.subTest(error=error), mock.patch.object(Forecaster, 'options', side_effect=error), \
+                    self.assertLogs('core.views', 'WARNING'):
+                self.assertContains(self.client.get(reverse('dashboard')), 'Forecasts are not available.')
@@ -0,0 +1,80 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from core.history import (HistoryQueryError, decode_cursor, encode_cursor, history_queryset,
+                          paginate, parse_filters)
+from core.models import AgriculturalData
+
+from .utils import make_row
+
+
+class HistoryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('grower', password='pw')
+        self.rows = [make_row(self.user, crop='Maize' if i % 2 else 'Rice', year=2015 + i)
+                     for i in range(7)]
+        # Shared timestamps make the id the tie-breaker
+        AgriculturalData.objects.filter(pk__in=[r.pk for r in self.rows[:4]]).update(
+            created_at=timezone.now())
+        make_row(User.objects.create_user('other'))
+
+    def walk(self, filters=None, limit=3):
+        ids, cursor = [], None
+        while True:
+            page, cursor = paginate(history_queryset(self.user, filters, cursor, limit), limit)
+            self.assertLessEqual(len(page), limit)
+            ids += [row['id'] for row in page]
+            if cursor is None:
+                return ids
+
+    def test_pages_cover_every_row_once_newest_first(self):
+        expected = list(AgriculturalData.objects.filter(user=self.user)
+                        .order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(len(expected), 7)
+        for limit in (1, 3, 7, 10):
+            with self.subTest(limit=limit):
+                self.assertEqual(self.walk(limit=limit), expected)
+
+    def test_filters(self):
+        filters = parse_filters({'crop': ' Maize ', 'country': 'kenya', 'year_min': '2017', 'year_max': ''})
+        self.assertEqual(filters, {'crop': 'Maize', 'country__iexact': 'kenya', 'year__gte': 2017})
+        expected = {r.pk for r in self.rows if r.crop == 'Maize' and r.year >= 2017}
+        self.assertEqual(set(self.walk(filters, limit=1)), expected)
+        with self.assertRaises(HistoryQueryError):
+            parse_filters({'year_max': 'soon'})
+
+    def test_cursor_round_trip(self):
+        row = history_queryset(self.user, limit=1)[0]
+        self.assertEqual(decode_cursor(encode_cursor(row)), (row['created_at'], row['id']))
+        for cursor in ('!!', 'bm90LWEtY3Vyc29y'):
+            with self.subTest(cursor=cursor), self.assertRaises(HistoryQueryError):
+                decode_cursor(cursor)
+
+
+class PredictionHistoryViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('grower', password='pw')
+        self.client.force_login(self.user)
+        for year in (2020, 2021, 2022):
+            make_row(self.user, year=year)
+
+    def test_pages_through_the_json_api(self):
+        url = reverse('prediction_history')
+        first = self.client.get(url, {'limit': 2}).json()
+        self.assertEqual(len(first['results']), 2)
+        second = self.client.get(url, {'limit': 2, 'cursor': first['next_cursor']}).json()
+        self.assertEqual(len(second['results']), 1)
+        self.assertIsNone(second['next_cursor'])
+        self.assertEqual(set(first['results'][0]), {
+            'id', 'crop', 'country', 'year', 'area_harvested_ha', 'predicted_production',
+            'predicted_yield', 'predicted_price', 'created_at'})
+
+    def test_bad_queries_answer_400(self):
+        url = reverse('prediction_history')
+        for params in ({'limit': 0}, {'limit': 'many'}, {'limit': 1000}, {'cursor': '!!'}, {'year_min': 'x'}):
+            with self.subTest(params=params):
+                response = self.client.get(url, params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
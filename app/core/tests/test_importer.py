@@ -0,0 +1,88 @@
+import io
+import json
+import unittest
+
+import pandas as pd
+from django.core.management import CommandError, call_command
+
+from core.importer import (count_rows, excel_available, file_format, import_file, read_chunks,
+                           summarize)
+from core.models import AgriculturalData
+
+from .utils import INPUTS, IsolatedTestCase
+
+
+class ImporterTests(IsolatedTestCase):
+    model_targets = ('yield',)
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.login()
+        rows = [INPUTS] * 5
+        rows[1] = dict(INPUTS, year='soon')
+        rows[3] = dict(INPUTS, area_harvested_ha=-1)
+        self.frame = pd.DataFrame(rows)
+        self.csv = f'{self.tmp}/rows.csv'
+        self.frame.to_csv(self.csv, index=False)
+
+    def test_file_format(self):
+        self.assertEqual(file_format('a/Rows.CSV'), 'csv')
+        with self.assertRaisesMessage(ValueError, "Unsupported file type '.json'"):
+            file_format('rows.json')
+        if excel_available():
+            self.assertEqual(file_format('rows.xlsm'), 'xlsx')
+
+    def test_csv_chunks_keep_file_positions(self):
+        chunks = list(read_chunks(self.csv, chunk_rows=2))
+        self.assertEqual([list(chunk.index) for chunk in chunks], [[0, 1], [2, 3], [4]])
+        self.assertEqual(count_rows(self.csv), 5)
+        # A last line without a newline still counts
+        with open(f'{self.tmp}/short.csv', 'w') as fh:
+            fh.write('a,b\n1,2\n3,4')
+        self.assertEqual(count_rows(f'{self.tmp}/short.csv'), 2)
+
+    @unittest.skipUnless(excel_available(), 'needs openpyxl')
+    def test_excel_chunks_skip_blank_rows(self):
+        path = f'{self.tmp}/rows.xlsx'
+        frame = pd.concat([self.frame.iloc[:2], pd.DataFrame([{}], columns=self.frame.columns),
+                           self.frame.iloc[2:]])
+        frame.to_excel(path, index=False)
+        chunks = list(read_chunks(path, chunk_rows=3))
+        self.assertEqual([list(chunk.index) for chunk in chunks], [[0, 1, 2], [3, 4]])
+        self.assertEqual(list(chunks[0].columns), list(self.frame.columns))
+        self.assertEqual(count_rows(path), 6)
+
+    def test_summarize(self):
+        summary = summarize(10, 8, [{'row': i} for i in range(150)], 2, 2.0)
+        self.assertEqual(len(summary['errors']), 100)
+        self.assertEqual(summary['rows_per_second'], 5.0)
+        self.assertIsNone(summarize(0, 0, [], 0, 0)['rows_per_second'])
+
+    def test_import_saves_valid_rows_and_reports_file_rows(self):
+        progress = []
+        summary = import_file(self.user, self.csv, chunk_rows=2, progress=progress.append)
+        self.assertEqual((summary['rows'], summary['imported'], summary['rejected']), (5, 3, 2))
+        self.assertEqual([error['row'] for error in summary['errors']], [1, 3])
+        self.assertEqual([p['rows'] for p in progress], [2, 4, 5])
+        self.assertEqual(AgriculturalData.objects.filter(user=self.user).count(), 3)
+        self.assertTrue(all(row.predicted_yield is not None
+                            for row in AgriculturalData.objects.filter(user=self.user)))
+
+    def test_import_data_command(self):
+        out, err = io.StringIO(), io.StringIO()
+        call_command('import_data', self.csv, user='grower', dry_run=True, json=True,
+                     chunk_rows=2, stdout=out, stderr=err)
+        summary = json.loads(out.getvalue())
+        self.assertEqual((summary['imported'], summary['model_version']), (3, 'test'))
+        self.assertFalse(AgriculturalData.objects.exists())
+
+        call_command('import_data', self.csv, user='grower', stdout=out, stderr=err)
+        self.assertEqual(AgriculturalData.objects.count(), 3)
+        self.assertIn('Imported 3 of 5 rows', out.getvalue())
+
+        for args, options, message in [
+            (['rows.json'], {'user': 'grower'}, 'Unsupported file type'),
+            ([self.csv], {'user': 'nobody'}, "No user named 'nobody'"),
+        ]:
+            with self.subTest(message), self.assertRaisesMessage(CommandError, message):
+                call_command('import_data', *args, stdout=out, stderr=err, **options)
@@ -0,0 +1,86 @@
+import io
+
+import numpy as np
+import pandas as pd
+from django.core.management import CommandError, call_command
+
+from core import incremental
+from core.batch import build_instances, save_instances, validate_frame
+from core.incremental import (RESERVOIR_NAME, IncrementalTrainingError, train_incremental,
+                              update_reservoir)
+from core.models import AgriculturalData
+from core.registry import get_registry
+
+from .utils import IsolatedTestCase, dataset_sample
+
+
+class ReservoirTests(IsolatedTestCase):
+    def test_sample_is_capped_and_drawn_from_the_stream(self):
+        X = pd.DataFrame({'a': np.arange(100.0)})
+        reservoir = update_reservoir(None, X.iloc[:30], np.arange(30.0), size=50)
+        self.assertEqual((len(reservoir['X']), reservoir['seen']), (30, 30))
+        reservoir = update_reservoir(reservoir, X.iloc[30:].reset_index(drop=True), np.arange(30.0, 100.0), size=50)
+        self.assertEqual((len(reservoir['X']), len(reservoir['y']), reservoir['seen']), (50, 50, 100))
+        # Rows stay paired with their targets and are not repeated
+        np.testing.assert_array_equal(reservoir['X']['a'].to_numpy(), reservoir['y'])
+        self.assertEqual(len(set(reservoir['y'])), 50)
+        self.assertTrue(any(reservoir['y'] >= 50))
+
+
+class TrainIncrementalTests(IsolatedTestCase):
+    model_targets = ('yield',)
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.login()
+
+    def save_rows(self, count):
+        valid, _ = validate_frame(dataset_sample(count))
+        outputs = {target: np.zeros(len(valid)) for target in ('production', 'yield', 'price')}
+        save_instances(build_instances(self.user, valid, outputs))
+        return len(valid)
+
+    def train(self, **options):
+        return train_incremental(min_rows=20, new_estimators=5, log=lambda message: None, **options)
+
+    def test_warm_start_grows_the_ensemble_and_moves_the_watermark(self):
+        saved = self.save_rows(120)
+        pipeline, metadata, attachments = self.train(strategy='warm_start')
+        self.assertEqual(pipeline.named_steps['model'].n_estimators, 15)
+        self.assertEqual(metadata['rows_through_pk'], AgriculturalData.objects.latest('pk').pk)
+        self.assertEqual(metadata['targets'], ['yield'])
+        self.assertEqual(metadata['incremental']['new_rows'], saved)
+        self.assertEqual(metadata['training_rows'] + metadata['test_rows'], saved)
+        self.assertEqual(attachments[RESERVOIR_NAME]['seen'], metadata['training_rows'])
+
+        version = get_registry().publish(pipeline, metadata, attachments=attachments)
+        self.assertEqual(get_registry().read_attachment(version, RESERVOIR_NAME)['seen'],
+                         metadata['training_rows'])
+        with self.assertRaisesMessage(IncrementalTrainingError, f'No rows saved since {version}'):
+            self.train()
+
+    def test_auto_falls_back_to_a_reservoir_refit(self):
+        self.save_rows(120)
+        pipeline, metadata, _ = self.train(strategy='auto', max_estimators=12)
+        self.assertEqual(metadata['incremental']['strategy'], 'reservoir')
+        self.assertEqual(pipeline.named_steps['model'].n_estimators, 10)
+        self.assertEqual(metadata['incremental']['reservoir_rows'], metadata['training_rows'])
+
+    def test_rejects_too_few_rows_and_unknown_strategies(self):
+        with self.assertRaisesMessage(IncrementalTrainingError, 'No rows saved since test'):
+            self.train()
+        self.save_rows(10)
+        with self.assertRaisesMessage(IncrementalTrainingError, 'usable new rows since test (need 20)'):
+            self.train()
+        with self.assertRaisesMessage(IncrementalTrainingError, "Unknown strategy 'sometimes'"):
+            self.train(strategy='sometimes')
+
+    def test_train_model_command(self):
+        self.save_rows(120)
+        out = io.StringIO()
+        call_command('train_model', incremental=True, strategy='warm_start', min_rows=20,
+                     new_estimators=incremental.DEFAULT_NEW_ESTIMATORS, model_version='grown', stdout=out)
+        self.assertIn('Published model version grown', out.getvalue())
+        self.assertEqual(get_registry().get().version, 'grown')
+        with self.assertRaises(CommandError):
+            call_command('train_model', incremental=True, stdout=io.StringIO())
@@ -0,0 +1,72 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from core import instrumentation
+from core.metrics import Histogram, LabeledCounter, LabeledHistogram, render_prometheus
+from core.middleware import PerformanceMiddleware
+
+
+class MetricsTests(SimpleTestCase):
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram('latency', [0.1, 1.0])
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value)
+        described = histogram.describe()
+        self.assertEqual(described['buckets'], {'0.1': 2, '1.0': 3, '+Inf': 4})
+        self.assertAlmostEqual(described['mean'], 3.65 / 4)
+
+    def test_prometheus_text_format(self):
+        family = LabeledHistogram('agri_test_seconds', [1.0], ['view'], 'Test latency')
+        family.labels('home').observe(0.5)
+        counter = LabeledCounter('agri_test_total', ['view'], 'Test count')
+        counter.inc('say "hi"', amount=2)
+        text = render_prometheus([family, counter])
+        self.assertIn('# TYPE agri_test_seconds histogram', text)
+        self.assertIn('agri_test_seconds_bucket{view="home",le="1.0"} 1', text)
+        self.assertIn('agri_test_seconds_count{view="home"} 1', text)
+        self.assertIn('agri_test_total{view="say \\"hi\\""} 2', text)
+
+    def test_timed_only_counts_inside_a_request(self):
+        with instrumentation.timed('inference'):
+            pass
+        metrics, token = instrumentation.begin()
+        try:
+            with instrumentation.timed('inference'):
+                pass
+        finally:
+            instrumentation.end(token)
+        self.assertGreater(metrics.inference_seconds, 0)
+        self.assertIsNone(instrumentation.current())
+
+
+class PerformanceMiddlewareTests(TestCase):
+    def setUp(self):
+        # install() only wraps connections opened after it ran, or those of the
+        # thread it ran in; the test database connection predates both.
+        instrumentation._install_wrapper(connection)
+
+    def test_database_time_and_repeated_selects(self):
+        def view(request):
+            for _ in range(3):
+                list(User.objects.filter(username='nobody'))
+            return HttpResponse('ok')
+
+        middleware = PerformanceMiddleware(view)
+        middleware.threshold = 3
+        with self.assertLogs('core.middleware', 'WARNING') as logs:
+            response = middleware(RequestFactory().get('/'))
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('desc="3 queries"', response['Server-Timing'])
+        self.assertIn('query ran 3 times', logs.output[0])
+
+    def test_metrics_endpoint_access(self):
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('agri_request_duration_seconds', response.content.decode())
+        with override_settings(METRICS_ALLOWED_IPS=[]):
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+            self.client.force_login(User.objects.create_user('ops', password='pw', is_staff=True))
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
@@ -0,0 +1,118 @@
+import gzip
+import json
+from datetime import timedelta
+from unittest import mock
+
+from django.urls import reverse
+from django.utils import timezone
+
+from core import jobs
+from core.models import Job
+from core.registry import get_registry
+
+from .utils import IsolatedTestCase, fitted_pipeline, make_row
+
+
+class JobQueueTests(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.login()
+
+    def test_export_job_runs_to_completion(self):
+        for year in (2001, 2002, 2003):
+            make_row(self.user, year=year)
+        job = jobs.submit(self.user, 'export', {'format': 'ndjson', 'gzip': True})
+
+        claimed = jobs.claim_next('worker-a')
+        self.assertEqual((claimed.pk, claimed.status, claimed.attempts), (job.pk, 'running', 1))
+        self.assertIsNone(jobs.claim_next('worker-b'))
+        job = jobs.run_job(claimed)
+
+        self.assertEqual(job.status, 'done')
+        self.assertEqual(job.result, {'rows': 3, 'format': 'ndjson'})
+        self.assertEqual((job.progress_done, job.progress_total), (3, 3))
+        with gzip.open(jobs.result_path(job)) as fh:
+            self.assertEqual(sorted(json.loads(line)['year'] for line in fh), [2001, 2002, 2003])
+
+    def test_stale_jobs_are_reclaimed_and_attempts_capped(self):
+        job = jobs.submit(self.user, 'export')
+        jobs.claim_next('worker-a')
+        stale = timezone.now() - timedelta(hours=1)
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=stale)
+        self.assertEqual(jobs.claim_next('worker-b').worker, 'worker-b')
+
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=stale, attempts=3)
+        with self.settings(JOB_MAX_ATTEMPTS=3):
+            self.assertIsNone(jobs.claim_next('worker-c'))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), ('failed', 'Gave up after 3 attempts'))
+
+    def test_a_worker_that_lost_the_job_records_nothing(self):
+        job = jobs.submit(self.user, 'export')
+        claimed = jobs.claim_next('worker-a')
+        Job.objects.filter(pk=job.pk).update(worker='worker-b')
+
+        with self.assertRaises(jobs.LostOwnership):
+            jobs.JobContext(claimed).progress(1, 2)
+        with self.assertLogs('core.jobs', 'WARNING'):
+            self.assertFalse(jobs._finish(claimed, 'done'))
+        with self.assertLogs('core.jobs', 'WARNING'):
+            job = jobs.run_job(claimed)
+
+        self.assertEqual((job.status, job.worker, job.progress_total), ('running', 'worker-b', 0))
+
+    def test_failures_are_recorded(self):
+        job = jobs.submit(self.user, 'export', {'format': 'xml'})
+        with self.assertLogs('core.jobs', 'ERROR'):
+            job = jobs.run_job(jobs.claim_next('worker-a'))
+        self.assertEqual(job.status, 'failed')
+        self.assertIn("Unknown export format 'xml'", job.error)
+
+
+class TrainingJobTests(IsolatedTestCase):
+    model_targets = ('yield',)
+
+    def run_training(self, **params):
+        user = self.login(f'staff{Job.objects.count()}', is_staff=True)
+        jobs.submit(user, 'train', params)
+        trained = (fitted_pipeline(), {'targets': ['yield'], 'test_metrics': {'r2': 0.5}})
+        with mock.patch('core.training.train', return_value=trained):
+            return jobs.run_job(jobs.claim_next('worker-a'))
+
+    def test_version_is_only_served_when_activated(self):
+        job = self.run_training(quick=True)
+        self.assertEqual(job.status, 'done')
+        self.assertFalse(job.result['active'])
+        self.assertIn(f'--activate {job.result["version"]}', job.result['note'])
+        self.assertEqual(get_registry().get().version, 'test')
+
+        job = self.run_training(quick=True, activate=True)
+        self.assertTrue(job.result['active'])
+        self.assertNotIn('note', job.result)
+        self.assertEqual(get_registry().get().version, job.result['version'])
+
+
+class SubmitJobViewTests(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.login(is_staff=True)
+
+    def submit(self, **data):
+        self.client.post(reverse('submit_job'), dict(kind='train', **data))
+        return Job.objects.order_by('-pk').first()
+
+    def test_training_flags_are_parsed_explicitly(self):
+        self.assertEqual(self.submit(quick='1', targets=['yield', 'price']).params,
+                         {'quick': True, 'incremental': False, 'activate': False,
+                          'targets': ['yield', 'price']})
+        self.assertTrue(self.submit(activate='on').params['activate'])
+        self.assertFalse(self.submit(quick='0').params['quick'])
+        self.assertFalse(self.submit().params['quick'])
+
+    def test_unknown_targets_are_rejected(self):
+        self.assertIsNone(self.submit(targets=['yield', 'weight']))
+
+    def test_training_is_staff_only(self):
+        self.user.is_staff = False
+        self.user.save()
+        self.assertIsNone(self.submit(quick='1'))
@@ -0,0 +1,46 @@
+import numpy as np
+from django.test import SimpleTestCase
+from sklearn.linear_model import LinearRegression
+
+from core.features import NUMERIC_FEATURES, build_features
+from core.inference import score
+from core.multitarget import TargetBundle
+from core.registry import get_registry
+from core.training import TARGET_LEAKS, bundle_exclusions
+
+from .utils import INPUTS, IsolatedTestCase
+
+
+class TargetBundleTests(SimpleTestCase):
+    def test_each_target_sees_only_its_columns(self):
+        rng = np.random.default_rng(0)
+        X = rng.normal(size=(50, 3))
+        y = np.column_stack([X[:, 0] * 2, X[:, 2] - 1])
+        bundle = TargetBundle(LinearRegression(), exclude=[[2], [0, 1]]).fit(X, y)
+
+        np.testing.assert_array_equal(bundle.columns_[0], [0, 1])
+        np.testing.assert_array_equal(bundle.columns_[1], [2])
+        np.testing.assert_allclose(bundle.predict(X), y, atol=1e-9)
+
+    def test_exclusions_must_match_the_targets(self):
+        with self.assertRaisesMessage(ValueError, 'exclude has 1 entries for 2 targets'):
+            TargetBundle(LinearRegression(), exclude=[[0]]).fit(np.ones((4, 2)), np.ones((4, 2)))
+
+    def test_leaking_inputs_are_excluded(self):
+        yield_columns, price_columns = bundle_exclusions(['yield', 'price'])
+        self.assertEqual([NUMERIC_FEATURES[i] for i in yield_columns], TARGET_LEAKS['yield'])
+        self.assertIn(NUMERIC_FEATURES.index('Price_USD_per_tonne'), price_columns)
+
+
+class MultiTargetScoringTests(IsolatedTestCase):
+    model_targets = ('production', 'price')
+
+    def test_outputs_follow_the_metadata_targets(self):
+        loaded = get_registry().get()
+        raw = loaded.estimator.predict(build_features(INPUTS))
+        outputs = score(INPUTS)
+        self.assertEqual(raw.shape, (1, 2))
+        self.assertEqual(outputs['production'][0], raw[0, 0])
+        self.assertEqual(outputs['price'][0], raw[0, 1])
+        # yield is derived from the predicted production
+        self.assertAlmostEqual(outputs['yield'][0], raw[0, 0] * 1000 / INPUTS['area_harvested_ha'])
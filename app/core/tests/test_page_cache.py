@@ -0,0 +1,69 @@
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import page_cache
+
+from .utils import make_row
+
+
+class PageCacheTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.user = User.objects.create_user('grower', password='pw')
+        self.other = User.objects.create_user('other', password='pw')
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return self.calls
+
+    def cached(self, namespace):
+        return page_cache.get_or_set(namespace, 'figure', self.compute)
+
+    def test_values_are_computed_once_per_version(self):
+        namespace = page_cache.user_namespace(self.user.pk)
+        self.assertEqual((self.cached(namespace), self.cached(namespace)), (1, 1))
+        with self.captureOnCommitCallbacks(execute=True):
+            page_cache.invalidate(namespace)
+        self.assertEqual(self.cached(namespace), 2)
+
+    def test_saving_a_row_invalidates_its_user_and_the_site(self):
+        mine, theirs = page_cache.user_namespace(self.user.pk), page_cache.user_namespace(self.other.pk)
+        before = [self.cached(ns) for ns in (mine, theirs, page_cache.GLOBAL)]
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            row = make_row(self.user)
+            # Nothing is bumped before the commit
+            self.assertEqual(self.cached(mine), before[0])
+        self.assertEqual(len(callbacks), 1)
+
+        self.assertNotEqual(self.cached(mine), before[0])
+        self.assertEqual(self.cached(theirs), before[1])
+        self.assertNotEqual(self.cached(page_cache.GLOBAL), before[2])
+
+        first = self.cached(mine)
+        with self.captureOnCommitCallbacks(execute=True):
+            row.delete()
+        self.assertNotEqual(self.cached(mine), first)
+
+    @override_settings(PAGE_CACHE={'ENABLED': False})
+    def test_disabled_cache_always_computes(self):
+        self.assertEqual((self.cached(page_cache.GLOBAL), self.cached(page_cache.GLOBAL)), (1, 2))
+        self.assertEqual(page_cache.ttl(), 0)
+
+
+class CachedPagesTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.user = User.objects.create_user('grower', password='pw')
+        self.client.force_login(self.user)
+
+    def test_dashboard_and_profile_show_new_predictions(self):
+        for name in ('dashboard', 'profile'):
+            with self.subTest(name):
+                self.client.get(reverse(name))
+                with self.captureOnCommitCallbacks(execute=True):
+                    make_row(self.user, crop=f'Crop for {name}')
+                self.assertContains(self.client.get(reverse(name)), f'Crop for {name}')
@@ -0,0 +1,88 @@
+import numpy as np
+from django.test import SimpleTestCase, override_settings
+
+from core.features import build_features
+from core.prediction_cache import (LocalLRUBackend, PredictionCache, feature_keys,
+                                   get_prediction_cache)
+from core.registry import get_registry
+
+from .utils import INPUTS, IsolatedTestCase
+
+
+def features(**changes):
+    return build_features(dict(INPUTS, **changes))
+
+
+class FeatureKeyTests(SimpleTestCase):
+    def test_categoricals_are_keyed_exactly(self):
+        key = feature_keys(features(), 'v1')
+        self.assertEqual(feature_keys(features(), 'v1'), key)
+        self.assertNotEqual(feature_keys(features(crop='maize (corn)'), 'v1'), key)
+        self.assertNotEqual(feature_keys(features(crop='Maize (corn) '), 'v1'), key)
+
+    def test_numbers_are_rounded_and_versions_separate_keys(self):
+        key = feature_keys(features(), 'v1')
+        block = features()
+        block['Year'] += 1e-9
+        self.assertEqual(feature_keys(block, 'v1'), key)
+        block['Year'] += 1e-3
+        self.assertNotEqual(feature_keys(block, 'v1'), key)
+        self.assertEqual(feature_keys(features(demand_supply_gap=0.0), 'v1'),
+                         feature_keys(features(demand_supply_gap=-0.0), 'v1'))
+        self.assertNotEqual(feature_keys(features(), 'v2'), key)
+
+
+class PredictionCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = PredictionCache(LocalLRUBackend())
+        self.scored = []
+
+    def predict(self, block):
+        self.scored.append(len(block))
+        n = len(block)
+        return {'production': np.full(n, 1.0), 'yield': block['Rainfall_mm'].to_numpy(),
+                'price': np.full(n, 3.0)}
+
+    def test_only_missing_rows_are_scored(self):
+        first = features(rainfall_mm=10.0)
+        self.cache.cached_predict(first, 'v1', self.predict)
+        block = build_features([dict(INPUTS, rainfall_mm=r) for r in (20.0, 10.0, 30.0)])
+
+        outputs = self.cache.cached_predict(block, 'v1', self.predict)
+
+        self.assertEqual(self.scored, [1, 2])
+        np.testing.assert_array_equal(outputs['yield'], [20.0, 10.0, 30.0])
+        np.testing.assert_array_equal(outputs['price'], [3.0] * 3)
+        metrics = self.cache.metrics()
+        self.assertEqual((metrics['hits'], metrics['misses']), (1, 3))
+
+    def test_case_variants_are_scored_separately(self):
+        self.cache.cached_predict(features(), 'v1', self.predict)
+        self.cache.cached_predict(features(crop='MAIZE (CORN)'), 'v1', self.predict)
+        self.assertEqual(self.scored, [1, 1])
+
+    def test_lru_evicts_oldest_and_entries_expire(self):
+        backend = LocalLRUBackend(max_entries=2, ttl=3600)
+        backend.set_many({'a': 1, 'b': 2})
+        backend.get_many(['a'])
+        backend.set_many({'c': 3})
+        self.assertEqual(backend.get_many(['a', 'b', 'c']), {'a': 1, 'c': 3})
+
+        backend = LocalLRUBackend(ttl=-1)
+        backend.set_many({'a': 1})
+        self.assertEqual(backend.get_many(['a']), {})
+
+
+class ProcessCacheTests(IsolatedTestCase):
+    def test_loading_a_new_model_clears_the_cache(self):
+        get_registry().publish('model', version='v1')
+        cache = get_prediction_cache()
+        get_registry().get()
+        cache.backend.set_many({'prediction:x': {'yield': 1.0}})
+        get_registry().publish('model', version='v2')
+        get_registry().get()
+        self.assertEqual(cache.backend.get_many(['prediction:x']), {})
+
+    @override_settings(PREDICTION_CACHE={'ENABLED': False})
+    def test_disabled_in_settings(self):
+        self.assertIsNone(get_prediction_cache())
@@ -0,0 +1,100 @@
+import json
+import os
+import shutil
+
+import joblib
+from django.urls import reverse
+
+from core.models import AgriculturalData
+from core.registry import (LEGACY_ARTIFACT, LEGACY_VERSION, ModelNotAvailable, ModelRegistry,
+                           get_registry)
+
+from .utils import INPUTS, IsolatedTestCase
+
+
+class ModelRegistryTests(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.registry = ModelRegistry(os.path.join(self.tmp, 'registry'), reload_interval=0)
+
+    def test_get_without_artifacts_raises(self):
+        with self.assertRaises(ModelNotAvailable):
+            self.registry.get()
+
+    def test_publish_activates_and_records_metadata(self):
+        version = self.registry.publish({'weights': [1, 2]}, {'targets': ['yield']}, version='v1')
+        loaded = self.registry.get()
+        self.assertEqual((version, loaded.version), ('v1', 'v1'))
+        self.assertEqual(loaded.estimator, {'weights': [1, 2]})
+        self.assertEqual(loaded.metadata['targets'], ['yield'])
+        self.assertIn('created_at', self.registry.read_metadata('v1'))
+        self.assertEqual([entry['version'] for entry in self.registry.stats()], ['v1'])
+
+    def test_activate_switches_the_served_version(self):
+        self.registry.publish('first', version='v1')
+        self.registry.publish('second', version='v2', activate=False)
+        self.assertEqual(self.registry.get().estimator, 'first')
+        seen = []
+        self.registry.on_change(lambda loaded: seen.append(loaded.version))
+
+        self.registry.activate('v2')
+
+        self.assertEqual(self.registry.get().estimator, 'second')
+        self.assertEqual(seen, ['v2'])
+        self.assertEqual(self.registry.versions(), ['v1', 'v2'])
+        self.assertEqual(self.registry.load('v1').estimator, 'first')
+
+    def test_other_processes_publishing_are_seen_after_the_interval(self):
+        registry = ModelRegistry(self.registry.root, reload_interval=3600)
+        self.registry.publish('first', version='v1')
+        first = registry.get()
+        self.registry.publish('second', version='v2')
+        self.assertIs(registry.get(), first)
+        self.assertEqual(registry.reload().estimator, 'second')
+
+    def test_legacy_artifact_is_a_fallback(self):
+        os.makedirs(self.registry.root)
+        joblib.dump('legacy model', os.path.join(self.registry.root, LEGACY_ARTIFACT))
+        loaded = self.registry.get()
+        self.assertEqual((loaded.version, loaded.estimator), (LEGACY_VERSION, 'legacy model'))
+
+    def test_duplicate_and_unknown_versions_are_rejected(self):
+        self.registry.publish('first', version='v1')
+        with self.assertRaises(ValueError):
+            self.registry.publish('again', version='v1')
+        with self.assertRaises(ValueError):
+            self.registry.activate('missing')
+        with self.assertRaises(ValueError):
+            self.registry.load('missing')
+
+    def test_deleted_current_version_is_not_available(self):
+        self.registry.publish('first', version='v1')
+        shutil.rmtree(self.registry.version_dir('v1'))
+        with self.assertRaisesMessage(ModelNotAvailable, "Model version 'v1' has no artifact"):
+            self.registry.get()
+
+    def test_deleted_new_version_keeps_the_loaded_one(self):
+        self.registry.publish('first', version='v1')
+        self.assertEqual(self.registry.get().estimator, 'first')
+        ModelRegistry(self.registry.root).publish('second', version='v2')
+        shutil.rmtree(self.registry.version_dir('v2'))
+        with self.assertLogs('core.registry', 'WARNING'):
+            self.assertEqual(self.registry.get().version, 'v1')
+
+
+class PredictWithoutModelTests(IsolatedTestCase):
+    def test_predict_view_reports_a_missing_model(self):
+        self.login()
+        response = self.client.post(reverse('predict'), INPUTS)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'not available yet')
+        self.assertFalse(AgriculturalData.objects.exists())
+
+    def test_deleted_current_version_answers_503(self):
+        self.login()
+        registry = get_registry()
+        registry.publish('first', version='v1')
+        shutil.rmtree(registry.version_dir('v1'))
+        response = self.client.post(reverse('predict_batch'), json.dumps([INPUTS]),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 503)
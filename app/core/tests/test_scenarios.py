@@ -0,0 +1,101 @@
+import json
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from core.inference import TARGETS, score
+from core.models import AgriculturalData
+from core.scenarios import (MAX_AXIS_POINTS, SweepError, expand_grid, grid_points, parse_axes,
+                            summarize)
+
+from .utils import INPUTS, IsolatedTestCase, make_row
+
+# 1000 ** 7 grid points, which np.prod wraps around in int64
+HUGE_AXES = {field: list(range(MAX_AXIS_POINTS)) for field in [
+    'rainfall_mm', 'temperature_c', 'year', 'price_usd_per_tonne', 'transport_cost_usd',
+    'demand_supply_gap', 'area_harvested_ha']}
+
+
+class SweepGridTests(SimpleTestCase):
+    def test_grid_is_the_cartesian_product_in_c_order(self):
+        axes = parse_axes({
+            'rainfall_mm': {'start': -50, 'stop': 0, 'num': 3},
+            'policy_flag': ['None', 'Subsidy'],
+            'temperature_c': [-1, 1],
+        })
+        grid = expand_grid(INPUTS, axes)
+        self.assertEqual(len(grid), 12)
+        np.testing.assert_array_equal(grid['rainfall_mm'][:4], [30.0] * 4)
+        self.assertEqual(list(grid['policy_flag'][:4]), ['None', 'None', 'Subsidy', 'Subsidy'])
+        np.testing.assert_array_equal(grid['temperature_c'][:2], [20.5, 22.5])
+        self.assertTrue((grid['crop'] == INPUTS['crop']).all())
+
+    def test_values_are_clipped_to_the_form_bounds(self):
+        grid = expand_grid(INPUTS, parse_axes({'rainfall_mm': {'values': [-300], 'mode': 'relative'},
+                                               'year': {'values': [3000], 'mode': 'value'}}))
+        self.assertEqual((grid['rainfall_mm'][0], grid['year'][0]), (0.0, 2100.0))
+
+    def test_invalid_axes(self):
+        for spec, message in [
+            ({}, '"axes" must be a non-empty object'),
+            ({'crop': ['Rice']}, 'crop cannot be swept'),
+            ({'rainfall_mm': {'start': 0}}, 'rainfall_mm: give "values"'),
+            ({'rainfall_mm': {'start': 0, 'stop': 1, 'num': 0}}, '"num" must be between'),
+            ({'rainfall_mm': {'values': [1], 'mode': 'log'}}, 'mode must be one of'),
+            ({'rainfall_mm': {'values': {'a': 1}}}, 'values must be a non-empty list'),
+            ({'rainfall_mm': list(range(MAX_AXIS_POINTS + 1))}, 'at most 1000 values per axis'),
+            ({'policy_flag': ['None'] * (MAX_AXIS_POINTS + 1)}, 'at most 1000 values per axis'),
+        ]:
+            with self.subTest(spec=spec), self.assertRaisesMessage(SweepError, message):
+                parse_axes(spec)
+
+    def test_grid_points_do_not_wrap_around(self):
+        self.assertEqual(grid_points(parse_axes(HUGE_AXES)), MAX_AXIS_POINTS ** 7)
+
+    def test_marginals_average_over_the_other_axes(self):
+        axes = parse_axes({'rainfall_mm': [0, 10], 'temperature_c': [0, 1, 2]})
+        values = np.arange(6.0)
+        summary = summarize({t: values for t in TARGETS}, axes)['yield']
+        self.assertEqual(summary['marginals'], {'rainfall_mm': [1.0, 4.0], 'temperature_c': [1.5, 2.5, 3.5]})
+        self.assertEqual(summary['quantiles']['50'], 2.5)
+
+
+class SweepApiTests(IsolatedTestCase):
+    model_targets = ('yield',)
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.login()
+
+    def post(self, payload):
+        return self.client.post(reverse('scenario_sweep_api'), json.dumps(payload),
+                                content_type='application/json')
+
+    def test_grid_points_match_single_predictions(self):
+        response = self.post({'base': INPUTS, 'axes': {'rainfall_mm': [-20, 0]}, 'output': 'grid'})
+        body = response.json()
+        self.assertEqual((body['points'], body['shape']), (2, [2]))
+        single = score(dict(INPUTS, rainfall_mm=48.0))
+        self.assertAlmostEqual(body['grid']['yield'][0], single['yield'][0], places=3)
+        self.assertFalse(AgriculturalData.objects.exists())
+
+    def test_binary_output_and_saved_base(self):
+        row = make_row(self.user)
+        response = self.post({'base': row.pk, 'axes': {'policy_flag': ['None', 'Subsidy']},
+                              'output': 'binary'})
+        self.assertEqual(response['X-Sweep-Shape'], '3,2')
+        self.assertEqual(len(response.content), 3 * 2 * 4)
+
+    def test_errors(self):
+        self.assertEqual(self.post({'base': INPUTS, 'axes': {'crop': ['x']}}).status_code, 400)
+        self.assertEqual(self.post({'base': dict(INPUTS, year=1), 'axes': {'year': [0]}}).status_code, 400)
+        other = make_row(User.objects.create_user('other', password='pw'))
+        self.assertEqual(self.post({'base': other.pk, 'axes': {'year': [0]}}).status_code, 404)
+        # true/false are not prediction ids
+        self.assertEqual(self.post({'base': True, 'axes': {'year': [0]}}).status_code, 400)
+        with self.settings(SCENARIO_SWEEP_MAX_POINTS=10):
+            response = self.post({'base': INPUTS, 'axes': {'rainfall_mm': {'start': 0, 'stop': 1, 'num': 11}}})
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(self.post({'base': INPUTS, 'axes': HUGE_AXES}).status_code, 413)
@@ -0,0 +1,51 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from core import stats
+from core.models import (AgriculturalData, CropPredictionStats, DailyPredictionStats,
+                         UserPredictionStats)
+
+from .utils import make_row
+
+
+class PredictionStatsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('grower', password='pw')
+
+    def assertMatchesRebuild(self):
+        incremental = list(UserPredictionStats.objects.values('user_id', 'count', 'scored_count',
+                                                              'sum_production'))
+        crops = set(CropPredictionStats.objects.filter(count__gt=0).values_list('crop', 'count'))
+        stats.rebuild()
+        self.assertEqual(incremental, list(UserPredictionStats.objects.values(
+            'user_id', 'count', 'scored_count', 'sum_production')))
+        self.assertEqual(crops, set(CropPredictionStats.objects.values_list('crop', 'count')))
+
+    def test_save_update_and_delete_are_recorded(self):
+        first = make_row(self.user)
+        make_row(self.user, crop='Rice', production=50.0)
+        make_row(self.user, production=None, predicted_yield=None, predicted_price=None)
+        summary = stats.user_summary(self.user)
+        self.assertEqual(summary['total_count'], 3)
+        self.assertAlmostEqual(summary['avg_production'], 75.0)
+
+        first.predicted_production = 300.0
+        first.save()
+        self.assertAlmostEqual(stats.user_summary(self.user)['avg_production'], 175.0)
+        first.delete()
+        self.assertEqual(stats.user_summary(self.user)['total_count'], 2)
+        self.assertEqual(stats.favorite_crop(self.user)['count'], 1)
+        self.assertMatchesRebuild()
+
+    def test_deleting_a_user_with_predictions(self):
+        make_row(self.user)
+        make_row(self.user, crop='Rice')
+        other = User.objects.create_user('neighbour', password='pw')
+        make_row(other)
+
+        self.user.delete()
+
+        self.assertFalse(AgriculturalData.objects.filter(user_id=self.user.pk).exists())
+        for model in (UserPredictionStats, CropPredictionStats, DailyPredictionStats):
+            self.assertFalse(model.objects.filter(user_id=self.user.pk).exists())
+        self.assertEqual(stats.user_summary(other)['total_count'], 1)
@@ -0,0 +1,66 @@
+import io
+
+import numpy as np
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase
+
+from core.features import MODEL_FEATURES, build_features
+from core.registry import get_registry
+from core.training import clean_dataset, features_and_targets, train, training_data_sha256
+from core.transformers import QuantileClipper
+
+from .utils import IsolatedTestCase, dataset_sample
+
+
+class CleaningTests(SimpleTestCase):
+    def test_rows_without_target_are_dropped_and_gaps_imputed(self):
+        frame = dataset_sample(100).dropna(subset=['Yield_kg_per_ha']).head(50).reset_index(drop=True)
+        frame.loc[0, 'Yield_kg_per_ha'] = np.nan
+        frame.loc[1, 'Rainfall_mm'] = np.nan
+        frame.loc[2, 'Policy_Flag'] = np.nan
+        cleaned = clean_dataset(frame)
+        self.assertEqual(len(cleaned), 49)
+        self.assertFalse(cleaned[['Rainfall_mm', 'Policy_Flag']].isna().any().any())
+
+    def test_features_and_targets_shapes(self):
+        X, y = features_and_targets(dataset_sample(50))
+        self.assertEqual(list(X.columns), MODEL_FEATURES)
+        self.assertEqual(y.shape, (len(X),))
+        X, y = features_and_targets(dataset_sample(50), ('yield', 'price'))
+        self.assertEqual(y.shape, (len(X), 2))
+
+    def test_quantile_clipper_uses_fitted_bounds(self):
+        clipper = QuantileClipper(0.25, 0.75).fit(np.arange(5.0)[:, None])
+        np.testing.assert_array_equal(clipper.transform([[-10.0], [2.0], [10.0]]).ravel(), [1.0, 2.0, 3.0])
+
+
+class TrainTests(IsolatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.data = f'{self.tmp}/train.csv'
+        self.frame = dataset_sample(300)
+        self.frame.to_csv(self.data, index=False)
+
+    def test_quick_search_is_reproducible_and_described(self):
+        first, metadata = train(self.data, n_jobs=1, cv=2, quick=True, log=lambda *_: None)
+        second, _ = train(self.data, n_jobs=1, cv=2, quick=True, log=lambda *_: None)
+
+        self.assertIsNone(first.memory)
+        X = build_features(self.frame.head(20))
+        np.testing.assert_array_equal(first.predict(X), second.predict(X))
+        self.assertEqual(metadata['data_sha256'], training_data_sha256(self.data))
+        self.assertEqual(len(metadata['candidates']), 3)
+        self.assertEqual(metadata['training_rows'] + metadata['test_rows'],
+                         self.frame['Yield_kg_per_ha'].notna().sum())
+        self.assertEqual(set(metadata['test_metrics']), {'mse', 'rmse', 'r2'})
+
+    def test_command_publishes_a_version(self):
+        out = io.StringIO()
+        call_command('train_model', data=self.data, n_jobs=1, cv=2, quick=True,
+                     model_version='trained', stdout=out)
+        self.assertIn('Published model version trained', out.getvalue())
+        self.assertEqual(get_registry().get().metadata['targets'], ['yield'])
+
+    def test_unknown_target_is_rejected(self):
+        with self.assertRaisesMessage(CommandError, 'Unknown target(s): weight'):
+            call_command('train_model', data=self.data, targets='yield,weight')
@@ -0,0 +1,110 @@
+"""
+Shared test fixtures: dataset samples, a small fitted pipeline, and a
+TestCase that points the model registry and every on-disk store at a
+temporary directory.
+"""
+import copy
+import shutil
+import tempfile
+from functools import lru_cache
+
+import pandas as pd
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+from core import autofill, batching, feature_store, forecasting, prediction_cache, registry
+from core.models import AgriculturalData
+from core.training import build_pipeline, features_and_targets
+
+DATA_PATH = settings.BASE_DIR.parent / 'data' / 'enhanced_agricultural_data.csv'
+FAO_PATH = settings.BASE_DIR.parent / 'data' / 'fao_data_cleaned.csv'
+
+# Form-shaped inputs of one prediction
+INPUTS = {
+    'country': 'Kenya', 'crop': 'Maize (corn)', 'year': 2022, 'area_harvested_ha': 2000.0,
+    'production_tonnes': 4500.0, 'rainfall_mm': 60.0, 'temperature_c': 21.5,
+    'price_usd_per_tonne': 480.0, 'policy_flag': 'Subsidy', 'transport_cost_usd': 900.0,
+    'demand_supply_gap': -120.0, 'productivity_index': 2.25,
+}
+
+
+def make_row(user, crop='Maize', production=100.0, **fields):
+    """Save a scored prediction for ``user``."""
+    values = dict(
+        user=user, country='Kenya', crop=crop, year=2021, area_harvested_ha=10.0,
+        production_tonnes=20.0, rainfall_mm=50.0, temperature_c=20.0, price_usd_per_tonne=300.0,
+        policy_flag='Subsidy', transport_cost_usd=100.0, demand_supply_gap=5.0,
+        predicted_production=production, predicted_yield=2000.0, predicted_price=300.0,
+    )
+    values.update(fields)
+    return AgriculturalData.objects.create(**values)
+
+
+@lru_cache(maxsize=None)
+def _dataset_sample(rows):
+    return pd.read_csv(DATA_PATH).sample(rows, random_state=0).reset_index(drop=True)
+
+
+def dataset_sample(rows=400):
+    """``rows`` random rows of the training CSV (a fresh copy per call)."""
+    return _dataset_sample(rows).copy()
+
+
+@lru_cache(maxsize=None)
+def _fitted_pipeline(targets):
+    X, y = features_and_targets(dataset_sample(), targets)
+    pipeline = build_pipeline(targets=targets)
+    name = 'model__estimator__n_estimators' if len(targets) > 1 else 'model__n_estimators'
+    pipeline.set_params(**{name: 10})
+    return pipeline.fit(X, y)
+
+
+def fitted_pipeline(targets=('yield',)):
+    """A 10-tree pipeline fitted on a sample of the training CSV (a fresh copy per call)."""
+    return copy.deepcopy(_fitted_pipeline(tuple(targets)))
+
+
+def reset_singletons():
+    registry._registry = None
+    prediction_cache._cache = None
+    batching._batcher = None
+    feature_store._store = None
+    autofill._index = None
+    forecasting._forecaster = None
+
+
+class IsolatedTestCase(TestCase):
+    """
+    Registry, feature store, job results and forecasts live in a temporary
+    directory, and process-wide singletons are rebuilt for every test. With
+    ``model_targets`` set, a pipeline for them is published as version ``test``.
+    """
+    model_targets = None
+
+    def setUp(self):
+        super().setUp()
+        self.tmp = tempfile.mkdtemp(prefix='agri-test-')
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        overrides = override_settings(
+            MODEL_REGISTRY_DIR=f'{self.tmp}/models',
+            MODEL_RELOAD_INTERVAL=0,
+            FEATURE_STORE_DIR=f'{self.tmp}/feature_store',
+            JOB_RESULTS_DIR=f'{self.tmp}/jobs',
+            FORECAST_DIR=f'{self.tmp}/forecasts',
+            DATASET_DIR=f'{self.tmp}/dataset',
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        reset_singletons()
+        self.addCleanup(reset_singletons)
+        caches['default'].clear()
+        if self.model_targets:
+            self.version = registry.get_registry().publish(
+                fitted_pipeline(self.model_targets), {'targets': list(self.model_targets)}, version='test')
+
+    def login(self, username='grower', **fields):
+        user = User.objects.create_user(username, password='pw', **fields)
+        self.client.force_login(user)
+        return user
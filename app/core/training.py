@@ -0,0 +1,284 @@
+# core/training.py
+"""
+Reproducible version of the training in ``Agricultural_product_model.ipynb``.
+
+Data cleaning follows the notebook (median/mode imputation, IQR capping of
+the raw numeric columns), except that rows without a target are dropped
+instead of being given the median yield. Features come from
+``core.features.build_features`` so training and serving share one
+definition, and the 1%/99% capping, scaling and one-hot encoding live inside
+the pipeline. The grid search runs on joblib's process-based ``loky``
+backend; ``Pipeline(memory=...)`` caches fitted preprocessors so candidates
+that share a CV fold reuse them instead of refitting.
+
+Training several ``targets`` at once fits a :class:`~core.multitarget.TargetBundle`
+behind the shared preprocessor; the search then scores candidates by R²
+averaged over the targets.
+"""
+import hashlib
+import os
+import platform
+import resource
+import shutil
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import sklearn
+from joblib import Memory, parallel_backend
+from joblib.externals.loky import get_reusable_executor
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+from sklearn.impute import SimpleImputer
+from sklearn.metrics import mean_squared_error, r2_score
+from sklearn.model_selection import GridSearchCV, train_test_split
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from .dataset import dataset_sha256, is_dataset, read_dataset
+from .features import (CATEGORICAL_FEATURES, INPUT_COLUMNS, NUMERIC_FEATURES,
+                       build_features)
+from .multitarget import TargetBundle
+from .transformers import QuantileClipper
+
+TARGET = 'Yield_kg_per_ha'
+# Served target name -> dataset column
+TARGET_COLUMNS = {
+    'production': 'Production_tonnes',
+    'yield': 'Yield_kg_per_ha',
+    'price': 'Price_USD_per_tonne',
+}
+# Input features that restate a target (yield is production / area); a
+# bundled target's model is fitted without them so it does not just echo the
+# values the user typed in.
+_PRODUCTION_INPUTS = ['Production_tonnes', 'log_Production_tonnes', 'Productivity_index',
+                      'Price_to_Yield_ratio', 'Demand_Supply_balance']
+TARGET_LEAKS = {
+    'production': _PRODUCTION_INPUTS,
+    'yield': _PRODUCTION_INPUTS,
+    'price': ['Price_USD_per_tonne', 'Price_to_Yield_ratio'],
+}
+RANDOM_STATE = 42
+TEST_SIZE = 0.3
+
+PARAM_GRID = [
+    {
+        'model': [RandomForestRegressor(random_state=RANDOM_STATE)],
+        'model__n_estimators': [100, 200],
+        'model__max_depth': [None, 20],
+        'model__min_samples_leaf': [1, 3],
+    },
+    {
+        'model': [GradientBoostingRegressor(random_state=RANDOM_STATE)],
+        'model__n_estimators': [100, 200],
+        'model__learning_rate': [0.05, 0.1],
+        'model__max_depth': [3, 5],
+    },
+]
+
+QUICK_PARAM_GRID = [
+    {
+        'model': [RandomForestRegressor(random_state=RANDOM_STATE)],
+        'model__n_estimators': [50],
+        'model__max_depth': [None, 20],
+    },
+    {
+        'model': [GradientBoostingRegressor(random_state=RANDOM_STATE)],
+        'model__n_estimators': [100],
+    },
+]
+
+
+def cap_outliers_iqr(frame, columns):
+    """The notebook's ``handle_outliers``: clip to 1.5 IQR beyond the quartiles."""
+    frame = frame.copy()
+    q1 = frame[columns].quantile(0.25)
+    q3 = frame[columns].quantile(0.75)
+    iqr = q3 - q1
+    frame[columns] = frame[columns].clip(q1 - 1.5 * iqr, q3 + 1.5 * iqr, axis=1)
+    return frame
+
+
+def clean_dataset(frame, target_columns=(TARGET,)):
+    """Impute and cap raw dataset rows the way the notebook does."""
+    frame = frame.dropna(subset=list(target_columns)).copy()
+    numeric = [c for c in INPUT_COLUMNS if c not in CATEGORICAL_FEATURES and c in frame]
+    numeric_with_target = numeric + [c for c in target_columns if c not in numeric]
+    frame[numeric_with_target] = frame[numeric_with_target].fillna(frame[numeric_with_target].median())
+    for column in CATEGORICAL_FEATURES:
+        if column in frame:
+            frame[column] = frame[column].fillna(frame[column].mode()[0]).astype(str)
+    capped = [c for c in numeric_with_target if c != 'Year']
+    return cap_outliers_iqr(frame, capped)
+
+
+def features_and_targets(frame, targets=('yield',)):
+    """
+    Clean dataset-shaped rows and split them into features and target values;
+    ``y`` is 2-D when more than one target is asked for.
+    """
+    columns = [TARGET_COLUMNS[t] for t in targets]
+    frame = clean_dataset(frame, columns)
+    y = frame[columns].to_numpy(dtype=np.float64)
+    return build_features(frame), (y[:, 0] if len(columns) == 1 else y)
+
+
+def read_training_frame(path):
+    """The dataset CSV at ``path``, or a dataset directory written by ``build_dataset``."""
+    if is_dataset(path):
+        frame = read_dataset(path, exact=True)
+        # The encoders were fitted on plain strings, not categoricals
+        return frame.astype({c: object for c in CATEGORICAL_FEATURES if c in frame})
+    return pd.read_csv(path)
+
+
+def training_data_sha256(path):
+    if is_dataset(path):
+        return dataset_sha256(path)
+    with open(path, 'rb') as fh:
+        return hashlib.sha256(fh.read()).hexdigest()
+
+
+def load_training_data(path, targets=('yield',)):
+    """Features and target values of the dataset at ``path``."""
+    return features_and_targets(read_training_frame(path), targets)
+
+
+def build_preprocessor():
+    numeric = Pipeline(steps=[
+        ('impute', SimpleImputer(strategy='median')),
+        ('cap', QuantileClipper(0.01, 0.99)),
+        ('scaler', StandardScaler()),
+    ])
+    categorical = Pipeline(steps=[
+        ('impute', SimpleImputer(strategy='most_frequent')),
+        ('onehot', OneHotEncoder(handle_unknown='ignore', sparse_output=False)),
+    ])
+    return ColumnTransformer(
+        transformers=[
+            ('num', numeric, NUMERIC_FEATURES),
+            ('cat', categorical, CATEGORICAL_FEATURES),
+        ],
+        remainder='drop',
+    )
+
+
+def bundle_exclusions(targets):
+    """Per target, positions of its leaking features in the preprocessor output (numeric block first)."""
+    return [[NUMERIC_FEATURES.index(f) for f in TARGET_LEAKS[t]] for t in targets]
+
+
+def build_pipeline(memory=None, targets=('yield',)):
+    model = RandomForestRegressor(random_state=RANDOM_STATE)
+    if len(targets) > 1:
+        model = TargetBundle(model, exclude=bundle_exclusions(targets))
+    return Pipeline(steps=[
+        ('preprocessor', build_preprocessor()),
+        ('model', model),
+    ], memory=memory)
+
+
+def bundle_param_grid(grid):
+    """Point a single-model grid at the estimator inside a TargetBundle."""
+    return [{key.replace('model', 'model__estimator', 1): value for key, value in params.items()}
+            for params in grid]
+
+
+def peak_memory_bytes():
+    """Peak RSS of this process and of its reaped child processes (Linux reports KiB)."""
+    scale = 1 if platform.system() == 'Darwin' else 1024
+    return {
+        'self': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+        'children': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale,
+    }
+
+
+def regression_metrics(y_true, y_pred):
+    mse = mean_squared_error(y_true, y_pred)
+    return {'mse': float(mse), 'rmse': float(np.sqrt(mse)), 'r2': float(r2_score(y_true, y_pred))}
+
+
+def _describe_params(params):
+    return {key.replace('model__estimator', 'model'): (
+                type(value).__name__ if key in ('model', 'model__estimator') else value)
+            for key, value in params.items()}
+
+
+def train(data_path, n_jobs=-1, cv=3, quick=False, cache_dir=None, targets=('yield',), log=print):
+    """
+    Run the search and refit the best pipeline on the training split.
+
+    Returns ``(pipeline, metadata)``; ``metadata`` holds the metrics, search
+    results, data hash, wall-clock time and peak memory of the run.
+    """
+    started = time.perf_counter()
+    data_sha256 = training_data_sha256(data_path)
+
+    targets = list(targets)
+    unknown = [t for t in targets if t not in TARGET_COLUMNS]
+    if unknown:
+        raise ValueError(f'Unknown target(s): {", ".join(unknown)}')
+    X, y = load_training_data(data_path, targets)
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=TEST_SIZE, random_state=RANDOM_STATE)
+    log(f'Loaded {len(X)} rows ({len(X_train)} train / {len(X_test)} test)')
+
+    own_cache = cache_dir is None
+    cache_dir = cache_dir or tempfile.mkdtemp(prefix='agri-train-cache-')
+    try:
+        grid = QUICK_PARAM_GRID if quick else PARAM_GRID
+        search = GridSearchCV(
+            build_pipeline(memory=Memory(cache_dir, verbose=0), targets=targets),
+            bundle_param_grid(grid) if len(targets) > 1 else grid,
+            scoring='r2', cv=cv, n_jobs=n_jobs, refit=True,
+        )
+        search_started = time.perf_counter()
+        with parallel_backend('loky', n_jobs=n_jobs):
+            search.fit(X_train, y_train)
+        search_seconds = time.perf_counter() - search_started
+        # Reap the worker processes so their peak RSS shows up in RUSAGE_CHILDREN
+        get_reusable_executor().shutdown(wait=True)
+    finally:
+        if own_cache:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+
+    best = search.best_estimator_
+    # Drop the cache reference so the published artifact does not point at a temp dir
+    best.set_params(memory=None)
+    y_pred = best.predict(X_test)
+    if len(targets) == 1:
+        metrics = regression_metrics(y_test, y_pred)
+    else:
+        metrics = {t: regression_metrics(y_test[:, j], y_pred[:, j]) for j, t in enumerate(targets)}
+    model = best.named_steps['model']
+    estimator = model.estimator if isinstance(model, TargetBundle) else model
+
+    candidates = [
+        {'params': _describe_params(params), 'mean_cv_r2': float(score), 'fit_seconds': float(fit)}
+        for params, score, fit in zip(search.cv_results_['params'],
+                                      search.cv_results_['mean_test_score'],
+                                      search.cv_results_['mean_fit_time'])
+    ]
+    metadata = {
+        'targets': targets,
+        'target_columns': [TARGET_COLUMNS[t] for t in targets],
+        'model_type': type(estimator).__name__,
+        'best_params': _describe_params(search.best_params_),
+        'cv_r2': float(search.best_score_),
+        'test_metrics': metrics,
+        'candidates': candidates,
+        'training_rows': int(len(X_train)),
+        'test_rows': int(len(X_test)),
+        'data_path': os.path.abspath(data_path),
+        'data_sha256': data_sha256,
+        'n_jobs': n_jobs,
+        'cv_folds': cv,
+        'search_seconds': round(search_seconds, 3),
+        'wall_seconds': round(time.perf_counter() - started, 3),
+        'peak_memory_bytes': peak_memory_bytes(),
+        'sklearn_version': sklearn.__version__,
+        'trained_at': datetime.now(timezone.utc).isoformat(),
+    }
+    return best, metadata
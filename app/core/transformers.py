@@ -0,0 +1,30 @@
+# core/transformers.py
+"""Custom scikit-learn transformers referenced by pickled pipelines."""
+import numpy as np
+from sklearn.base import BaseEstimator, TransformerMixin
+
+
+class QuantileClipper(BaseEstimator, TransformerMixin):
+    """
+    Clip each column to quantiles learned at fit time.
+
+    The pipeline equivalent of the notebook's ``cap_values`` step, so the
+    same bounds are applied when serving instead of only to training data.
+    """
+
+    def __init__(self, lower=0.01, upper=0.99):
+        self.lower = lower
+        self.upper = upper
+
+    def fit(self, X, y=None):
+        X = np.asarray(X, dtype=np.float64)
+        self.lower_bounds_ = np.nanquantile(X, self.lower, axis=0)
+        self.upper_bounds_ = np.nanquantile(X, self.upper, axis=0)
+        self.n_features_in_ = X.shape[1]
+        return self
+
+    def transform(self, X):
+        return np.clip(np.asarray(X, dtype=np.float64), self.lower_bounds_, self.upper_bounds_)
+
+    def get_feature_names_out(self, input_features=None):
+        return np.asarray(input_features, dtype=object)
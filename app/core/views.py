@@ -1,81 +1,108 @@
 # core/views.py
 from itertools import count
 from django import db
-from django.shortcuts import render, redirect, get_object_or_404
+from django.shortcuts import aget_object_or_404, render, redirect, get_object_or_404
+from django.template.loader import render_to_string
 from django.contrib.auth import login, authenticate, logout
-from django.contrib.auth.decorators import login_required
+from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import FileResponse, HttpResponse, JsonResponse, StreamingHttpResponse, Http404
 from django.views.decorators.http import require_http_methods
 from .forms import AgriculturalDataForm, SignUpForm, LoginForm, ProfileForm
-from .models import AgriculturalData
-import joblib
+from .models import AgriculturalData, CropPredictionStats, Job
+from .registry import get_registry, ModelNotAvailable
+from .features import INPUT_FIELDS, MODEL_FEATURES
+from .inference import TARGETS, apply_predictions
+from .batching import score_online_async, get_batcher
+from .prediction_cache import get_prediction_cache
+from .stats import auser_summary, favorite_crop
+from .exporters import EXPORTERS, gzip_stream, parquet_available
+from .autofill import get_autofill_index
+from .batch import apredict_batch, validate_frame
+from .importer import excel_available
+from .training import TARGET_COLUMNS
+from .forecasting import ForecastsNotAvailable, get_forecaster
+from .executors import ExecutorBusy, run_cpu
+from .scenarios import (CATEGORICAL_SWEEP_FIELDS, NUMERIC_SWEEP_FIELDS, SweepError,
+                        grid_points, grid_shape, parse_axes, run_sweep, summarize)
+from .instrumentation import REQUEST_METRICS
+from . import jobs, page_cache
+from .history import (MAX_PAGE_SIZE, HistoryQueryError, history_queryset, paginate,
+                      parse_filters)
+from .metrics import LabeledCounter, render_prometheus
 import numpy as np
 import pandas as pd
-from sklearn.preprocessing import StandardScaler, OneHotEncoder
-from sklearn.compose import ColumnTransformer
 import os
 from django.conf import settings
 from datetime import datetime, timedelta
 from django.db.models import Sum, Avg, Count
 import json
+import logging
 
+logger = logging.getLogger(__name__)
 
 
-# Constants for model features
-MODEL_FEATURES = [
-    'Country', 
-    'Crop', 
-    'Year', 
-    'Area_harvested_ha',
-    'Rainfall_mm', 
-    'Temperature_C', 
-    'Policy_Flag',
-    'Transport_Cost_USD', 
-    'Demand_Supply_Gap',
-    'Rainfall_Temp_interaction',
-    'Price_to_Yield_ratio',
-    'Production_tonnes',
-    'log_Area_harvested_ha',
-    'Demand_Supply_balance',
-    'log_Transport_Cost_USD',
-    'Price_USD_per_tonne',
-    'Productivity_index',
-    'log_Production_tonnes'
-]
-
-
-# Load the model and preprocessing pipeline
+# Load the model and preprocessing pipeline lazily through the registry so
+# importing this module (and running check/migrate) never unpickles anything.
 def load_model():
-    model_path = os.path.join(settings.BASE_DIR, 'core', 'models', 'agricultural_model.pkl')
-    return joblib.load(model_path)
+    return get_registry().get().estimator
+
+
+async def _auser(request):
+    # Swap the lazy (sync) request.user for the resolved user so templates
+    # rendered by async views do not hit the database from the event loop.
+    request.user = await request.auser()
+    return request.user
+
+def _history_page_size():
+    return getattr(settings, 'HISTORY_PAGE_SIZE', 50)
+
+def _fragment(namespace):
+    """Context for a ``{% cache %}`` block that is invalidated with ``namespace``."""
+    return {'alias': page_cache.alias(), 'ttl': page_cache.ttl(), 'version': page_cache.version(namespace)}
 
-model = load_model()
-print(model.feature_names_in_)
 @login_required
-def dashboard(request):
-    # Get user's prediction history
-    user_data = AgriculturalData.objects.filter(user=request.user).order_by('-created_at')
-    
-    # Get summary statistics for the dashboard
-    total_predictions = user_data.count()
-    recent_predictions = user_data[:5]
-    
-    # Calculate 30-day statistics
-    thirty_days_ago = datetime.now() - timedelta(days=30)
-    recent_data = user_data.filter(created_at__gte=thirty_days_ago)
+async def dashboard(request):
+    user = await _auser(request)
+    namespace = page_cache.user_namespace(user.pk)
+
+    # The first page of the history table is rendered once per change to the
+    # user's rows; further pages are fetched from prediction_history as the user scrolls
+    async def render_prediction_table():
+        limit = _history_page_size()
+        rows, next_cursor = paginate([row async for row in history_queryset(user, limit=limit)], limit)
+        crops = [crop async for crop in CropPredictionStats.objects.filter(user=user, count__gt=0)
+                 .order_by('crop').values_list('crop', flat=True)]
+        return render_to_string('core/prediction_table.html',
+                                {'rows': rows, 'next_cursor': next_cursor, 'crops': crops})
+
+    prediction_table = await page_cache.aget_or_set(namespace, 'prediction_table', render_prediction_table)
     
-    if recent_data.exists():
-        avg_production = recent_data.aggregate(Avg('predicted_production'))['predicted_production__avg']
-        avg_yield = recent_data.aggregate(Avg('predicted_yield'))['predicted_yield__avg']
-        avg_price = recent_data.aggregate(Avg('predicted_price'))['predicted_price__avg']
-    else:
-        avg_production = avg_yield = avg_price = 0
+    # Summary statistics come from the incrementally maintained aggregates
+    summary = await page_cache.aget_or_set(namespace, 'summary', lambda: auser_summary(user))
+    total_predictions = summary['total_count']
+    avg_production = summary['avg_production'] or 0
+    avg_yield = summary['avg_yield'] or 0
+    avg_price = summary['avg_price'] or 0
     
+    # Outlook card: the series choices, defaulting to the latest prediction's
+    try:
+        forecast_countries, forecast_crops = await run_cpu(_forecast_options)
+    except ExecutorBusy:
+        forecast_countries, forecast_crops = [], []
+    latest = await (AgriculturalData.objects.filter(user=user).order_by('-created_at', '-id')
+                    .values('country', 'crop').afirst())
+
     context = {
-        'user_data': user_data,
+        'jobs': [job async for job in user.jobs.all()[:10]],
+        'forecast_countries': forecast_countries,
+        'forecast_crops': forecast_crops,
+        'forecast_default': latest or {},
+        'forecast_max_years': _forecast_years(),
+        'export_formats': [f for f in EXPORTERS if f != 'parquet' or parquet_available()],
+        'upload_accept': '.csv,text/csv' + (',.xlsx,.xlsm' if excel_available() else ''),
+        'prediction_table': prediction_table,
         'total_predictions': total_predictions,
-        'recent_predictions': recent_predictions,
         'avg_production': avg_production,
         'avg_yield': avg_yield,
         'avg_price': avg_price,
@@ -84,58 +111,28 @@ def dashboard(request):
     return render(request, 'core/dashboard.html', context)
 
 @login_required
-def predict(request):
+async def predict(request):
+    user = await _auser(request)
     if request.method == 'POST':
         form = AgriculturalDataForm(request.POST)
         if form.is_valid():
             # Save form data to database
             data = form.save(commit=False)
-            data.user = request.user
-            
-            # Prepare input data
-            input_data = {
-                'Country': data.country,
-                'Crop': data.crop,
-                'Year': data.year,
-                'Area_harvested_ha': data.area_harvested_ha,
-                'Rainfall_mm': data.rainfall_mm,
-                'Temperature_C': data.temperature_c,
-                'Policy_Flag': data.policy_flag,
-                'Transport_Cost_USD': data.transport_cost_usd,
-                'Demand_Supply_Gap': data.demand_supply_gap,
-                'Rainfall_Temp_interaction': data.rainfall_temp_interaction,
-                'Price_to_Yield_ratio': data.price_to_yield_ratio,
-                'Production_tonnes': data.production_tonnes,
-                'log_Area_harvested_ha': data.log_area_harvested_ha,
-                'Demand_Supply_balance': data.demand_supply_balance,
-                'log_Transport_Cost_USD': data.log_transport_cost_usd,
-                'Price_USD_per_tonne': data.price_usd_per_tonne,
-                'Productivity_index': data.productivity_index,
-                'log_Production_tonnes': data.log_production_tonnes
-            }
-
-            # Debug: Print the input data
-            print("Input data before prediction:", input_data)
-            
-            # Convert Policy_Flag to numeric
-            policy_flag_numeric = 1 if input_data['Policy_Flag'] == 'Subsidy' else 0
+            data.user = user
             
-            # Direct prediction logic (mock example)
-            predicted_production = (
-                input_data['Area_harvested_ha'] * 
-                (input_data['Rainfall_mm'] / 100) * 
-                (input_data['Temperature_C'] / 20) * 
-                (1 + policy_flag_numeric)  # Use the numeric value for policy flag
-            )
-            predicted_yield = predicted_production / input_data['Area_harvested_ha'] if input_data['Area_harvested_ha'] > 0 else 0
-            predicted_price = input_data['Price_USD_per_tonne'] * (1 + input_data['Demand_Supply_Gap'] / 100)
-
-            # Save predictions to the data object
-            data.predicted_production = predicted_production
-            data.predicted_yield = predicted_yield
-            data.predicted_price = predicted_price
+            # Score the single row through the trained pipeline, coalesced
+            # with concurrent requests by the micro-batcher
+            try:
+                outputs = await score_online_async(data)
+            except ModelNotAvailable:
+                messages.error(request, 'The prediction model is not available yet. Please try again later.')
+                return render(request, 'core/predict.html', {
+                    'form': form,
+                    'model_features': MODEL_FEATURES
+                })
+            apply_predictions([data], outputs)
             
-            data.save()
+            await data.asave()
             
             # Prepare data for results page
             prediction_results = {
@@ -151,7 +148,7 @@ def predict(request):
             }
             
             # Store in session for results page
-            request.session['prediction_results'] = prediction_results
+            await request.session.aset('prediction_results', prediction_results)
             
             messages.success(request, 'Prediction successful!')
             return redirect('prediction_results', pk=data.id)
@@ -213,8 +210,8 @@ def delete_prediction(request, pk):
     return render(request, 'core/confirm_delete.html', {'prediction': prediction})
 
 @login_required
-def prediction_detail(request, pk):
-    prediction = get_object_or_404(AgriculturalData, pk=pk, user=request.user)
+async def prediction_detail(request, pk):
+    prediction = await aget_object_or_404(AgriculturalData, pk=pk, user=await _auser(request))
     return render(request, 'core/prediction_detail.html', {'prediction': prediction})
 
 @login_required
@@ -228,21 +225,24 @@ def profile(request):
     else:
         form = ProfileForm(instance=request.user)
     
-    # Get user statistics
-    user_stats = {
-        'total_predictions': AgriculturalData.objects.filter(user=request.user).count(),
-        'last_prediction': AgriculturalData.objects.filter(user=request.user)
-                            .order_by('-created_at').first(),
-        'favorite_crop': AgriculturalData.objects.filter(user=request.user)
-                            .values('crop').annotate(count=Count('crop'))
-                            .order_by('-count').first(),
-    }
+    # Get user statistics, cached until the user's predictions change
+    namespace = page_cache.user_namespace(request.user.pk)
+    user_stats = page_cache.get_or_set(namespace, 'profile_stats', lambda: _profile_stats(request.user))
     
     return render(request, 'core/profile.html', {
         'form': form,
-        'user_stats': user_stats
+        'user_stats': user_stats,
+        'fragment': _fragment(namespace),
     })
 
+def _profile_stats(user):
+    return {
+        'total_predictions': AgriculturalData.objects.filter(user=user).count(),
+        'last_prediction': AgriculturalData.objects.filter(user=user)
+                            .order_by('-created_at').values('crop', 'created_at').first(),
+        'favorite_crop': favorite_crop(user),
+    }
+
 def signup(request):
     if request.method == 'POST':
         form = SignUpForm(request.POST)
@@ -288,19 +288,21 @@ def user_logout(request):
     messages.success(request, 'You have been logged out successfully.')
     return redirect('home')
 
+def _home_stats():
+    return {
+        'top_crops': list(AgriculturalData.objects.values('crop').annotate(
+            count=db.models.Count('crop')
+        ).order_by('-count')[:5]),
+        'recent_predictions_count': AgriculturalData.objects.count(),
+    }
+
 def home(request):
     # Show featured crops or statistics for anonymous users
     if not request.user.is_authenticated:
-        top_crops = AgriculturalData.objects.values('crop').annotate(
-            count=db.models.Count('crop')
-        ).order_by('-count')[:5]
-        
-        recent_predictions_count = AgriculturalData.objects.count()
-        
-        context = {
-            'top_crops': top_crops,
-            'recent_predictions_count': recent_predictions_count,
-        }
+        # Site-wide figures are served from the page cache until a prediction
+        # is saved or deleted, so anonymous traffic does not reach the database
+        context = dict(page_cache.get_or_set(page_cache.GLOBAL, 'home_stats', _home_stats))
+        context['fragment'] = _fragment(page_cache.GLOBAL)
         return render(request, 'core/home.html', context)
     
     # For logged in users, redirect to dashboard
@@ -309,67 +311,315 @@ def home(request):
 # API Views for AJAX functionality
 @login_required
 @require_http_methods(["GET"])
-def get_prediction_stats(request):
-    # Get statistics for the last 30 days
-    thirty_days_ago = datetime.now() - timedelta(days=30)
-    user_data = AgriculturalData.objects.filter(
-        user=request.user,
-        created_at__gte=thirty_days_ago
-    )
-    
+async def get_prediction_stats(request):
+    # Statistics for the last 30 days from the per-user daily aggregates
+    summary = await auser_summary(await request.auser())
     stats = {
-        'count': user_data.count(),
-        'avg_production': user_data.aggregate(Avg('predicted_production'))['predicted_production__avg'],
-        'avg_yield': user_data.aggregate(Avg('predicted_yield'))['predicted_yield__avg'],
-        'avg_price': user_data.aggregate(Avg('predicted_price'))['predicted_price__avg'],
+        'count': summary['count'],
+        'avg_production': summary['avg_production'],
+        'avg_yield': summary['avg_yield'],
+        'avg_price': summary['avg_price'],
     }
     
     return JsonResponse(stats)
 
 @login_required
-def export_predictions(request, format='csv'):
-    predictions = AgriculturalData.objects.filter(user=request.user)
+@require_http_methods(["GET"])
+async def prediction_history(request):
+    """A page of the user's predictions, newest first, optionally filtered by crop/country/year."""
+    try:
+        limit = int(request.GET.get('limit', _history_page_size()))
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise HistoryQueryError(f'limit must be between 1 and {MAX_PAGE_SIZE}')
+        rows = history_queryset(await request.auser(), parse_filters(request.GET),
+                                request.GET.get('cursor'), limit)
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    page, next_cursor = paginate([row async for row in rows], limit)
+    return JsonResponse({'results': page, 'next_cursor': next_cursor})
+
+def _forecast_years():
+    return getattr(settings, 'FORECAST_MAX_YEARS', 10)
+
+def _forecast_options():
+    # The outlook card is optional: any failure leaves the dashboard without it
+    try:
+        return get_forecaster().options()
+    except Exception as exc:
+        logger.warning('Forecast options unavailable: %s', exc)
+        return [], []
+
+@login_required
+@require_http_methods(["GET"])
+def forecast(request):
+    """FAO history and the next ``years`` years of one country/crop series."""
+    country = request.GET.get('country', '').strip()
+    crop = request.GET.get('crop', '').strip()
+    if not country or not crop:
+        return JsonResponse({'error': 'country and crop are required'}, status=400)
+    try:
+        years = int(request.GET.get('years', 5))
+    except ValueError:
+        return JsonResponse({'error': 'years must be an integer'}, status=400)
+    if not 1 <= years <= _forecast_years():
+        return JsonResponse({'error': f'years must be between 1 and {_forecast_years()}'}, status=400)
+    try:
+        result = get_forecaster().forecast(country, crop, years)
+    except (ForecastsNotAvailable, FileNotFoundError):
+        return JsonResponse({'error': 'Forecasts are not available'}, status=503)
+    if result is None:
+        return JsonResponse({'error': f'No FAO history for {crop} in {country}'}, status=404)
+    return JsonResponse(result)
+
+@login_required
+@require_http_methods(["GET"])
+def autofill_suggestions(request):
+    country = request.GET.get('country', '')
+    crop = request.GET.get('crop', '')
+    if not country or not crop:
+        return JsonResponse({'error': 'country and crop are required'}, status=400)
+    try:
+        year = int(request.GET['year']) if request.GET.get('year') else None
+    except ValueError:
+        return JsonResponse({'error': 'year must be an integer'}, status=400)
     
-    if format == 'csv':
-        import csv
-        from django.http import HttpResponse
-        
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="agricultural_predictions.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow([
-            'Crop', 'Country', 'Year', 'Area Harvested (ha)', 
-            'Rainfall (mm)', 'Temperature (C)', 'Policy Flag',
-            'Transport Cost (USD)', 'Demand Supply Gap',
-            'Predicted Production', 'Predicted Yield', 'Predicted Price',
-            'Date Created'
-        ])
-        
-        for pred in predictions:
-            writer.writerow([
-                pred.crop, pred.country, pred.year, pred.area_harvested_ha,
-                pred.rainfall_mm, pred.temperature_c, pred.policy_flag,
-                pred.transport_cost_usd, pred.demand_supply_gap,
-                pred.predicted_production, pred.predicted_yield, pred.predicted_price,
-                pred.created_at.strftime("%Y-%m-%d %H:%M:%S")
-            ])
-        
+    try:
+        suggestion = get_autofill_index().suggest(country, crop, year)
+    except FileNotFoundError:
+        return JsonResponse({'error': 'Autofill history is not available'}, status=503)
+    return JsonResponse({'found': suggestion is not None, 'values': suggestion or {}})
+
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+@require_http_methods(["GET"])
+def model_status(request):
+    registry = get_registry()
+    cache = get_prediction_cache()
+    return JsonResponse({
+        'active_version': registry.active_version,
+        'loaded_versions': registry.stats(),
+        'micro_batching': get_batcher().metrics(),
+        'prediction_cache': cache.metrics() if cache is not None else None,
+    })
+
+def metrics(request):
+    """Prometheus scrape endpoint: staff users, or clients in METRICS_ALLOWED_IPS."""
+    allowed = request.META.get('REMOTE_ADDR') in getattr(settings, 'METRICS_ALLOWED_IPS', ())
+    if not (allowed or (request.user.is_authenticated and request.user.is_staff)):
+        return HttpResponse(status=403)
+    batcher = get_batcher()
+    exported = REQUEST_METRICS + [batcher.batch_size, batcher.queue_wait]
+    cache = get_prediction_cache()
+    if cache is not None:
+        for name, value in (('hits', cache.hits), ('misses', cache.misses)):
+            counter = LabeledCounter(f'prediction_cache_{name}_total', (),
+                                     f'Prediction cache {name}')
+            counter.inc(amount=value)
+            exported.append(counter)
+    return HttpResponse(render_prometheus(exported),
+                        content_type='text/plain; version=0.0.4; charset=utf-8')
+
+def _read_batch_rows(request):
+    """Parse a batch request body (JSON rows, CSV body or uploaded CSV file) into a DataFrame."""
+    if 'file' in request.FILES:
+        return pd.read_csv(request.FILES['file'])
+    content_type = request.content_type or ''
+    # Read from the stream rather than request.body so large batches are not
+    # rejected by DATA_UPLOAD_MAX_MEMORY_SIZE.
+    if content_type in ('text/csv', 'application/csv'):
+        return pd.read_csv(request)
+    payload = json.load(request)
+    if isinstance(payload, dict):
+        payload = payload.get('rows', [])
+    if not isinstance(payload, list):
+        raise ValueError('Expected a list of rows')
+    return pd.DataFrame.from_records(payload)
+
+@login_required
+@require_http_methods(["POST"])
+async def predict_batch_api(request):
+    user = await request.auser()
+    try:
+        frame = await run_cpu(_read_batch_rows, request)
+    except (ValueError, pd.errors.ParserError) as exc:
+        return JsonResponse({'error': f'Could not parse rows: {exc}'}, status=400)
+    except ExecutorBusy:
+        return JsonResponse({'error': 'Too many batches in progress, retry shortly.'}, status=503)
+
+    max_rows = getattr(settings, 'BATCH_PREDICT_MAX_ROWS', 100_000)
+    if len(frame) > max_rows:
+        return JsonResponse({'error': f'At most {max_rows} rows per request'}, status=413)
+
+    persist = request.GET.get('persist', '1').lower() not in ('0', 'false', 'no')
+    try:
+        valid, outputs, errors, instances = await apredict_batch(user, frame, persist=persist)
+    except ModelNotAvailable:
+        return JsonResponse({'error': 'The prediction model is not available yet.'}, status=503)
+    except ExecutorBusy:
+        return JsonResponse({'error': 'Too many batches in progress, retry shortly.'}, status=503)
+
+    return JsonResponse({
+        'received': len(frame),
+        'scored': len(valid),
+        'rejected': len(errors),
+        'errors': errors[:100],
+        'ids': [obj.pk for obj in instances],
+        'predictions': {name: values.tolist() for name, values in outputs.items()},
+    })
+
+def _sweep_base(request, base):
+    """Base record for a sweep: the id of one of the user's predictions or a dict of inputs."""
+    if isinstance(base, int) and not isinstance(base, bool):
+        prediction = get_object_or_404(AgriculturalData, pk=base, user=request.user)
+        return {field: getattr(prediction, field) for field in INPUT_FIELDS}
+    if not isinstance(base, dict):
+        raise SweepError('"base" must be a prediction id or an object of inputs')
+    valid, errors = validate_frame(pd.DataFrame([base]))
+    if errors:
+        raise SweepError(f"Invalid base record: {errors[0]['errors']}")
+    return valid.iloc[0].to_dict()
+
+@login_required
+@require_http_methods(["POST"])
+def scenario_sweep_api(request):
+    try:
+        payload = json.loads(request.body)
+        if not isinstance(payload, dict):
+            raise SweepError('Expected a JSON object')
+        base = _sweep_base(request, payload.get('base'))
+        axes = parse_axes(payload.get('axes'))
+    except (ValueError, SweepError) as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+
+    shape = grid_shape(axes)
+    points = grid_points(axes)
+    max_points = getattr(settings, 'SCENARIO_SWEEP_MAX_POINTS', 100_000)
+    if points > max_points:
+        return JsonResponse({'error': f'{points} grid points requested; at most {max_points}'}, status=413)
+
+    try:
+        outputs = run_sweep(base, axes)
+    except ModelNotAvailable:
+        return JsonResponse({'error': 'The prediction model is not available yet.'}, status=503)
+
+    output = payload.get('output', 'summary')
+    if output == 'binary':
+        # float32, shape (targets, *grid shape), C order
+        response = HttpResponse(
+            np.stack([outputs[t] for t in TARGETS]).astype('<f4').tobytes(),
+            content_type='application/octet-stream')
+        response['X-Sweep-Shape'] = ','.join(map(str, (len(TARGETS),) + shape))
+        response['X-Sweep-Targets'] = ','.join(TARGETS)
         return response
-    
-    elif format == 'json':
-        data = list(predictions.values(
-            'crop', 'country', 'year', 'area_harvested_ha',
-            'rainfall_mm', 'temperature_c', 'policy_flag',
-            'transport_cost_usd', 'demand_supply_gap',
-            'predicted_production', 'predicted_yield', 'predicted_price',
-            'created_at'
-        ))
-        return JsonResponse(data, safe=False)
-    
+
+    result = {
+        'points': points,
+        'shape': shape,
+        'axes': [axis.describe() for axis in axes],
+        'summary': summarize(outputs, axes),
+    }
+    if output == 'grid':
+        result['grid'] = {t: np.round(outputs[t], 4).tolist() for t in TARGETS}
+    return JsonResponse(result)
+
+@login_required
+def scenario_sweep(request, pk):
+    prediction = get_object_or_404(AgriculturalData, pk=pk, user=request.user)
+    return render(request, 'core/scenario_sweep.html', {
+        'prediction': prediction,
+        'numeric_fields': NUMERIC_SWEEP_FIELDS,
+        'categorical_fields': CATEGORICAL_SWEEP_FIELDS,
+    })
+
+@login_required
+@require_http_methods(["POST"])
+def submit_job(request):
+    kind = request.POST.get('kind')
+    params, upload = {}, None
+    if kind in ('batch_predict', 'import'):
+        upload = request.FILES.get('file')
+        if upload is None:
+            messages.error(request, 'Choose a CSV or Excel file.')
+            return redirect('dashboard')
+        if kind == 'batch_predict':
+            params['persist'] = bool(request.POST.get('persist'))
+    elif kind == 'export':
+        params['format'] = request.POST.get('format', 'csv')
+        params['gzip'] = bool(request.POST.get('gzip'))
+        if params['format'] not in EXPORTERS:
+            messages.error(request, 'Invalid export format requested')
+            return redirect('dashboard')
+    elif kind == 'train':
+        if not request.user.is_staff:
+            messages.error(request, 'Only staff can start model training.')
+            return redirect('dashboard')
+        params['quick'] = request.POST.get('quick') in ('1', 'on', 'true')
+        params['incremental'] = request.POST.get('incremental') in ('1', 'on', 'true')
+        # Without it the new version is published but not served until activated
+        params['activate'] = request.POST.get('activate') in ('1', 'on', 'true')
+        params['targets'] = request.POST.getlist('targets') or ['yield']
+        unknown = [t for t in params['targets'] if t not in TARGET_COLUMNS]
+        if unknown:
+            messages.error(request, f'Unknown target(s): {", ".join(unknown)}')
+            return redirect('dashboard')
     else:
+        messages.error(request, 'Unknown job type.')
+        return redirect('dashboard')
+
+    try:
+        job = jobs.submit(request.user, kind, params, upload=upload)
+    except ValueError as exc:
+        messages.error(request, str(exc))
+        return redirect('dashboard')
+    messages.success(request, f'{job.get_kind_display()} queued (job #{job.pk}).')
+    return redirect('dashboard')
+
+@login_required
+def job_list(request):
+    return JsonResponse({'jobs': [jobs.describe(job) for job in request.user.jobs.all()[:50]]})
+
+@login_required
+def job_detail(request, pk):
+    job = get_object_or_404(Job, pk=pk, user=request.user)
+    return JsonResponse(jobs.describe(job))
+
+@login_required
+def download_job_result(request, pk):
+    job = get_object_or_404(Job, pk=pk, user=request.user, status='done')
+    path = jobs.result_path(job)
+    if path is None or not os.path.exists(path):
+        raise Http404('Result file not found')
+    return FileResponse(open(path, 'rb'), as_attachment=True,
+                        filename=f'job-{job.pk}-{job.result_file}')
+
+@login_required
+def export_predictions(request, format='csv', pk=None):
+    predictions = AgriculturalData.objects.filter(user=request.user).order_by('-created_at', '-id')
+    filename = 'agricultural_predictions'
+    if pk is not None:
+        predictions = predictions.filter(pk=pk)
+        if not predictions.exists():
+            raise Http404('Prediction not found')
+        filename = f'agricultural_prediction_{pk}'
+    
+    if format not in EXPORTERS:
         messages.error(request, 'Invalid export format requested')
         return redirect('dashboard')
+    if format == 'parquet' and not parquet_available():
+        messages.error(request, 'Parquet export requires the pyarrow package')
+        return redirect('dashboard')
+    
+    stream, content_type, extension = EXPORTERS[format]
+    chunks = stream(predictions, chunk_size=getattr(settings, 'EXPORT_CHUNK_SIZE', 2000))
+    filename = f'{filename}.{extension}'
+    if request.GET.get('gzip', '').lower() in ('1', 'true', 'yes'):
+        chunks = gzip_stream(chunks)
+        filename += '.gz'
+        content_type = 'application/gzip'
+    
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
 
 def about(request):
     return render(request, 'core/about.html')